@@ -12,20 +12,22 @@ from flask_bcrypt import Bcrypt
 from flask_caching import Cache
 from flask_login import LoginManager
 from flask_mail import Mail
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf.csrf import CSRFError, CSRFProtect, generate_csrf
 from werkzeug.exceptions import HTTPException
 
-# Import des optimisations SQLite (side-effect au chargement)
-from app.utils.db_optimization import set_sqlite_pragma as set_sqlite_pragma
+# Profil SQLite (PRAGMA, recréation des moteurs après fork, checkpoint WAL)
+from app.utils.db_optimization import init_sqlite_engine
+from app.utils.db_routing import READ_ONLY_BIND, RoutingSession, configure_read_only_bind
 
 # Import des optimisations Python 3.13 (side-effect au chargement)
 from app.utils.python313_optimizations import get_python313_info as get_python313_info
 
+# Profil de démarrage (web / cli) : la CLI et le cron ne chargent pas la partie web
+from app.utils.startup import LazyGroup, defer_blueprints, import_models, register_blueprints, startup_profile
+
 # Initialisation des extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 login_manager.login_message = "Veuillez vous connecter pour accéder à cette page."
@@ -33,6 +35,9 @@ login_manager.login_message_category = "info"
 bcrypt = Bcrypt()
 mail = Mail()
 cache = Cache()
+# Fragments HTML des cartes du kanban (app/utils/task_cards.py), séparés du cache général : leur
+# volume ne doit pas évincer les compteurs de limitation des connexions
+card_cache = Cache()
 csrf = CSRFProtect()
 
 
@@ -42,6 +47,13 @@ def create_app(config_name):
     app.config.from_object(config_class)
     if hasattr(config_class, "init_app"):
         config_class.init_app(app)
+    profile = startup_profile(app)
+
+    if profile == "web":
+        # Pièces jointes reçues directement dans leur stockage, validées et hachées pendant la réception
+        from app.utils.task_attachments import StreamingUploadRequest
+
+        app.request_class = StreamingUploadRequest
 
     # Monkey patch désactivé temporairement
     # if not app.debug:
@@ -79,7 +91,8 @@ def create_app(config_name):
         app.logger.setLevel(logging.INFO)
         app.logger.info("ChronoTrak startup")
 
-        # Démarrer le worker email pour le traitement asynchrone
+    # Démarrer le worker email pour le traitement asynchrone (CLI : au premier envoi, voir send_email)
+    if not app.debug and not app.testing and profile == "web":
         try:
             from app.utils.email import start_email_worker
 
@@ -99,27 +112,45 @@ def create_app(config_name):
     app.config["WTF_CSRF_HEADERS"] = ["X-CSRF-Token", "X-CSRFToken"]
 
     # Initialiser les extensions avec l'app
+    configure_read_only_bind(app, app.config["SQLALCHEMY_ENGINE_OPTIONS"])
     db.init_app(app)
-    migrate.init_app(app, db)
 
-    # Configuration du pool de connexions pour éviter les timeouts
+    # Flask-Migrate importe alembic : chargé seulement à l'exécution de `flask db ...`
+    def load_migrate():
+        from flask_migrate import Migrate
+
+        Migrate(app, db)  # remplace ce groupe par celui de Flask-Migrate dans app.cli
+        return app.cli.commands["db"]
+
+    app.cli.add_command(LazyGroup("db", load_migrate, help="Migrations de la base de données (Flask-Migrate)."))
+
+    # Profil SQLite (PRAGMA, pool par processus, checkpoint WAL) : aucune connexion n'est ouverte ici
     with app.app_context():
-        # Configuration du pool de connexions
-        engine = db.engine
-        engine.pool._recycle = 3600  # Recycle les connexions après 1h
-        engine.pool._pre_ping = True  # Test les connexions avant utilisation
-        engine.pool._pool_size = 10  # Taille du pool
-        engine.pool._max_overflow = 20  # Connexions supplémentaires
-    login_manager.init_app(app)
+        init_sqlite_engine(app, db.engine)
+        if READ_ONLY_BIND in db.engines:
+            init_sqlite_engine(app, db.engines[READ_ONLY_BIND], read_only=True)
     bcrypt.init_app(app)
     mail.init_app(app)
     cache.init_app(app)
-    csrf.init_app(app)
+    # Extensions propres aux requêtes HTTP
+    if profile == "web":
+        login_manager.init_app(app)
+        card_cache.init_app(
+            app,
+            config={
+                **{key: value for key, value in app.config.items() if key.startswith("CACHE_")},
+                "CACHE_THRESHOLD": app.config["TASK_CARD_CACHE_THRESHOLD"],
+                "CACHE_DEFAULT_TIMEOUT": app.config["TASK_CARD_CACHE_TIMEOUT"],
+                "CACHE_KEY_PREFIX": f"{app.config.get('CACHE_KEY_PREFIX', '')}card_",
+            },
+        )
+        csrf.init_app(app)
 
     # Importer ici pour éviter les imports circulaires
     from app.utils.csp import build_content_security_policy
     from app.utils.error_handler import send_error_email
     from app.utils.page_timer import get_elapsed_time, log_request_time, start_timer
+    from app.utils.template_cache import init_template_cache, precompile_templates
     from app.utils.version import get_build_info, get_version
 
     # Middleware pour les en-têtes de sécurité
@@ -130,8 +161,11 @@ def create_app(config_name):
         response.headers["X-XSS-Protection"] = "1; mode=block"
         if not app.debug and not app.testing:
             response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        nonce = getattr(g, "csp_nonce", "")
-        response.headers["Content-Security-Policy"] = build_content_security_policy(app, nonce)
+        # 304 (GET conditionnel) : le navigateur met à jour les en-têtes de la page en cache avec ceux de
+        # la réponse ; une nouvelle CSP (autre nonce) bloquerait les scripts inline de la page conservée
+        if response.status_code != 304:
+            nonce = getattr(g, "csp_nonce", "")
+            response.headers["Content-Security-Policy"] = build_content_security_policy(app, nonce)
         # Configuration CORS sécurisée - uniquement pour les domaines autorisés
         origin = request.headers.get("Origin")
         allowed_origins = ["https://chronotrak.com", "https://www.chronotrak.com", "https://app.chronotrak.com"]
@@ -157,6 +191,13 @@ def create_app(config_name):
             g.csrf_token = generate_csrf()
         start_timer()
 
+        # Thread des travaux de récurrence : démarré au premier passage dans chaque processus (après fork),
+        # il reprend les travaux laissés en attente par un redémarrage
+        if app.config.get("RECURRENCE_JOBS_ASYNC") and not app.testing:
+            from app.utils.recurrence import start_recurrence_worker
+
+            start_recurrence_worker(app)
+
         # Timeout global pour éviter les requêtes qui traînent (uniquement en production)
         if not app.debug:
             import signal
@@ -414,6 +455,12 @@ def create_app(config_name):
         priority_colors = {"basse": "secondary", "normale": "primary", "haute": "warning", "urgente": "danger"}
         return priority_colors.get(priority, "secondary")
 
+    # Cartes du kanban rendues depuis le cache de fragments
+    if profile == "web":
+        from app.utils.task_cards import kanban_card
+
+        app.add_template_global(kanban_card)
+
     # Filtre pour gérer les comparaisons avec None
     @app.template_filter("safe_compare")
     def safe_compare_filter(value, operator, threshold):
@@ -442,26 +489,12 @@ def create_app(config_name):
         """Retourne une valeur par défaut si la valeur est None"""
         return value if value is not None else default
 
-    # Enregistrement des blueprints
-    from app.routes.admin import admin
-    from app.routes.api import api
-    from app.routes.auth import auth
-    from app.routes.clients import clients
-    from app.routes.communications import communications
-    from app.routes.main import main
-    from app.routes.optimization import optimization
-    from app.routes.projects import projects
-    from app.routes.tasks import tasks
-
-    app.register_blueprint(auth)
-    app.register_blueprint(clients)
-    app.register_blueprint(projects)
-    app.register_blueprint(tasks)
-    app.register_blueprint(main)
-    app.register_blueprint(admin)
-    app.register_blueprint(communications)
-    app.register_blueprint(api)
-    app.register_blueprint(optimization)
+    # Enregistrement des blueprints (profil cli : modèles seulement, routes au premier url_for)
+    if profile == "web":
+        register_blueprints(app)
+    else:
+        import_models()
+        defer_blueprints(app)
 
     # Route pour le favicon
     @app.route("/favicon.ico")
@@ -524,7 +557,10 @@ def create_app(config_name):
     # Commandes CLI
     @app.cli.command()
     @click.option("--force", is_flag=True, help="Forcer l'archivage même en environnement de développement")
-    def auto_archive(force):
+    @click.option("--dry-run", is_flag=True, help="Compter les tâches à archiver sans rien modifier")
+    @click.option("--batch-size", default=1000, show_default=True, help="Tâches archivées par UPDATE (et transaction)")
+    @click.option("--time-budget", type=float, default=None, help="Durée maximale (s) ; le reste au prochain passage")
+    def auto_archive(force, dry_run, batch_size, time_budget):
         """Archive automatiquement les tâches terminées depuis plus de 2 semaines"""
         import os
 
@@ -550,23 +586,228 @@ def create_app(config_name):
 
         from app.models.task import Task
 
-        tasks_to_archive = Task.should_be_archived()
+        result = Task.archive_in_batches(batch_size=batch_size, time_budget=time_budget, dry_run=dry_run)
 
-        if not tasks_to_archive:
-            print("Aucune tâche à archiver.")
+        if not result["archived"]:
+            print("Aucune tâche à archiver." if result["complete"] else "Budget de temps écoulé, rien archivé.")
             return
 
-        print(f"{len(tasks_to_archive)} tâche(s) à archiver...")
+        for project_name, count in result["by_project"]:
+            print(f"  ✓ {project_name} : {count} tâche(s)")
+        if dry_run:
+            print(f"{result['archived']} tâche(s) à archiver (simulation, rien n'a été modifié).")
+            return
+        print(f"{result['archived']} tâche(s) archivée(s) avec succès.")
+        if not result["complete"]:
+            print("⚠️  Budget de temps écoulé : les tâches restantes seront archivées au prochain passage.")
+
+    @app.cli.command("rebuild-time-rollups")
+    def rebuild_time_rollups():
+        """Reconstruit les cumuls quotidiens des saisies de temps (table time_rollup_daily)"""
+        from app.models.task import TimeRollupDaily
+
+        print("Reconstruction des cumuls de temps...")
+        count = TimeRollupDaily.rebuild()
+        print(f"✓ {count} cumul(s) quotidien(s) projet × utilisateur.")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """Reconstruit l'index de recherche plein texte (table search_document)"""
+        from app.models.search import SearchDocument
+
+        print("Reconstruction de l'index de recherche...")
+        count = SearchDocument.rebuild()
+        print(f"✓ {count} document(s) indexé(s).")
+
+    @app.cli.command("process-recurrence-jobs")
+    def process_recurrence_jobs():
+        """Crée les occurrences en attente des tâches récurrentes (si RECURRENCE_JOBS_ASYNC est désactivé)"""
+        from app.utils.recurrence import process_jobs
+
+        count = process_jobs()
+        print(f"✓ {count} travail(aux) de récurrence traité(s).")
+
+    @app.cli.command("import-attachment-manifests")
+    def import_attachment_manifests():
+        """Importe les anciens manifest.json des pièces jointes dans la table task_attachment (une seule fois)"""
+        from app.utils.task_attachments import import_manifests
+
+        print("Import des manifestes de pièces jointes...")
+        imported, skipped = import_manifests()
+        print(f"✓ {imported} pièce(s) jointe(s) importée(s), {skipped} entrée(s) ignorée(s).")
+
+    @app.cli.command("attachments-gc")
+    @click.option("--grace", default=3600, show_default=True, help="Âge minimal (s) d'un fichier orphelin supprimé")
+    def attachments_gc(grace):
+        """Recalcule les références des pièces jointes et supprime les contenus et fichiers inutilisés"""
+        from app.utils.task_attachments import collect_garbage
+
+        stats = collect_garbage(grace_seconds=grace)
+        print(
+            f"✓ {stats['recounted']} compteur(s) corrigé(s), {stats['released']} contenu(s) et "
+            f"{stats['orphans']} fichier(s) orphelin(s) supprimé(s), {stats['freed_bytes'] / 1048576:.1f} Mo libéré(s)."
+        )
+
+    @app.cli.command("attachments-usage")
+    def attachments_usage():
+        """Affiche l'occupation disque des pièces jointes (taille logique, stockée, économisée)"""
+        from app.utils.task_attachments import disk_usage
+
+        usage = disk_usage()
+        print(f"Pièces jointes : {usage['attachments']} ({usage['logical_bytes'] / 1048576:.1f} Mo)")
+        print(
+            f"Contenus stockés : {usage['blobs']} dont {usage['shared_blobs']} partagé(s) "
+            f"({usage['stored_bytes'] / 1048576:.1f} Mo)"
+        )
+        print(f"✓ Économisé par la déduplication : {usage['saved_bytes'] / 1048576:.1f} Mo")
+
+    @app.cli.command("cold-storage")
+    @click.option(
+        "--months", type=int, default=None, help="Ancienneté d'archivage (défaut : COLD_STORAGE_AFTER_MONTHS)"
+    )
+    @click.option("--batch-size", default=500, show_default=True, help="Tâches déplacées par transaction")
+    @click.option("--dry-run", is_flag=True, help="Compter les tâches à déplacer sans rien modifier")
+    def cold_storage_command(months, batch_size, dry_run):
+        """Déplace les tâches archivées depuis longtemps (et leurs dépendances) vers le stockage froid"""
+        from app.utils import cold_storage
+
+        if not cold_storage.enabled():
+            print("✗ Stockage froid non configuré (COLD_STORAGE_PATH, base SQLite uniquement).")
+            return
+        try:
+            count = cold_storage.freeze(months=months, batch_size=batch_size, dry_run=dry_run)
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            raise SystemExit(1)
+        if dry_run:
+            print(f"{count} tâche(s) à déplacer (simulation, rien n'a été modifié).")
+        else:
+            print(f"✓ {count} tâche(s) déplacée(s) vers le stockage froid.")
+
+    @app.cli.command("reencrypt")
+    @click.option("--table", "tables", multiple=True, help="Table à traiter (répétable ; toutes par défaut)")
+    @click.option("--chunk-size", default=500, show_default=True, help="Nombre de lignes par lot")
+    @click.option("--workers", type=int, default=None, help="Processus de chiffrement (défaut : nombre de CPU)")
+    @click.option("--state-file", type=click.Path(dir_okay=False), help="Fichier d'état pour la reprise")
+    @click.option("--restart", is_flag=True, help="Ignorer la progression enregistrée")
+    @click.option("--dry-run", is_flag=True, help="Compter sans rien écrire")
+    def reencrypt_command(tables, chunk_size, workers, state_file, restart, dry_run):
+        """Chiffre les données en clair et rechiffre avec ENCRYPTION_KEY celles des anciennes clés (reprenable)"""
+        from app.models.search import CommentSearchToken
+        from app.utils.reencryption import reencrypt
 
-        archived_count = 0
-        for task in tasks_to_archive:
+        try:
+            results = reencrypt(
+                tables=tables,
+                chunk_size=chunk_size,
+                workers=workers,
+                state_path=state_file,
+                restart=restart,
+                dry_run=dry_run,
+                log=print,
+            )
+        except ValueError as e:
+            print(f"✗ {e}")
+            raise SystemExit(1)
+
+        changed = sum(stats["encrypted"] + stats["rotated"] for stats in results.values())
+        errors = sum(stats["errors"] for stats in results.values())
+        prefix = "Simulation" if dry_run else "✓ Terminé"
+        print(f"{prefix} : {changed} valeur(s) (re)chiffrée(s), {errors} illisible(s).")
+
+        # Sans BLIND_INDEX_KEY, l'index aveugle dépend de la clé principale : reconstruit dès que sa clé
+        # a changé, même si cette exécution n'a rotaté aucun commentaire (reprise, --table)
+        if not dry_run and CommentSearchToken.is_stale():
+            comments, tokens = CommentSearchToken.rebuild()
+            print(f"✓ Index des commentaires reconstruit ({tokens} jetons pour {comments} commentaires).")
+
+    @app.cli.command("import-timesheet")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", default=1000, show_default=True, help="Nombre de lignes par transaction")
+    @click.option("--dry-run", is_flag=True, help="Valider le fichier sans rien enregistrer")
+    @click.option("--notify", is_flag=True, help="Envoyer les notifications (une par tâche et par lot)")
+    def import_timesheet_command(path, batch_size, dry_run, notify):
+        """Importe des tâches, saisies de temps et crédits depuis un fichier CSV ou JSON (lu en flux)"""
+        from app.utils.timesheet_import import import_timesheet, iter_records
+
+        with open(path, "rb") as f:
             try:
-                task.archive()
-                archived_count += 1
-                print(f"  ✓ Archivée: {task.title} (Projet: {task.project.name})")
-            except Exception as e:
-                print(f"  ✗ Erreur lors de l'archivage de '{task.title}': {e}")
+                records = iter_records(f, path)
+                stats = import_timesheet(records, batch_size=batch_size, dry_run=dry_run, notify=notify, log=print)
+            except ValueError as e:
+                print(f"✗ {e}")
+                raise SystemExit(1)
+
+        for line, message in stats["error_details"]:
+            print(f"  ligne {line} : {message}")
+        prefix = "Simulation" if dry_run else "✓ Import"
+        print(
+            f"{prefix} : {stats['time_entries']} saisie(s), {stats['credits']} crédit(s), "
+            f"{stats['tasks_created']} tâche(s) créée(s), {stats['errors']} ligne(s) rejetée(s) sur {stats['rows']}."
+        )
+
+    @app.cli.command("migrate-to-postgres")
+    @click.argument("target_url")
+    @click.option("--batch-size", default=1000, show_default=True, help="Nombre de lignes copiées par lot")
+    def migrate_to_postgres(target_url, batch_size):
+        """Copie la base courante (SQLite) vers une base PostgreSQL vide (ex: postgresql+psycopg://...)"""
+        from sqlalchemy import create_engine
 
-        print(f"{archived_count} tâche(s) archivée(s) avec succès.")
+        from app.utils.db_transfer import copy_database
+
+        target_engine = create_engine(target_url)
+        print(f"Copie de {db.engine.url.render_as_string(hide_password=True)} vers {target_engine.url!r}...")
+        try:
+            counts = copy_database(db.metadata, db.engine, target_engine, batch_size=batch_size)
+        except Exception as e:
+            print(f"✗ Échec de la copie (aucune donnée n'a été écrite) : {e}")
+            raise SystemExit(1)
+        finally:
+            target_engine.dispose()
+
+        print(f"✓ {sum(counts.values())} ligne(s) copiée(s) dans {len(counts)} table(s).")
+        print("Pensez à mettre à jour DATABASE_URL puis à lancer `flask db upgrade`.")
+
+    @app.cli.command("precompile-templates")
+    def precompile_templates_command():
+        """Compile tous les templates Jinja dans le cache de bytecode (JINJA_BYTECODE_CACHE_DIR)"""
+        if app.jinja_env.bytecode_cache is None:
+            print("✗ Cache du bytecode des templates désactivé (JINJA_BYTECODE_CACHE_DIR).")
+            return
+        count = precompile_templates(app)
+        print(f"✓ {count} template(s) compilé(s).")
+
+    @app.cli.command("startup-profile")
+    @click.option(
+        "--profile",
+        "profiles",
+        multiple=True,
+        type=click.Choice(["web", "cli"]),
+        help="Profil mesuré (défaut : les deux)",
+    )
+    @click.option("--limit", default=15, show_default=True, help="Nombre d'imports les plus lents affichés")
+    def startup_profile_command(profiles, limit):
+        """Mesure le démarrage à froid (python -X importtime) des profils web (workers) et cli (cron)"""
+        from app.utils.startup import measure_startup
+
+        for profile in profiles or ("web", "cli"):
+            try:
+                total, imports = measure_startup(app.config["FLASK_ENV"], profile)
+            except RuntimeError as e:
+                print(f"✗ Profil {profile} : {e}")
+                raise SystemExit(1)
+            imported = sum(duration for duration, depth, _ in imports if depth == 0)
+            print(f"Profil {profile} : démarrage en {total:.0f} ms (imports : {imported:.0f} ms)")
+            for duration, depth, module in sorted(imports, reverse=True)[:limit]:
+                print(f"  {duration:8.1f} ms  {'  ' * depth}{module}")
+
+    # Templates compilés au démarrage, une fois les filtres enregistrés : avec gunicorn --preload,
+    # dans le processus maître, avant le fork des workers
+    init_template_cache(app)
+    if app.config.get("TEMPLATE_WARMUP") and not app.debug and not app.testing and profile == "web":
+        try:
+            precompile_templates(app)
+        except Exception as e:
+            app.logger.error(f"Préchargement des templates échoué: {e}")
 
     return app
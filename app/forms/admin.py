@@ -1,6 +1,8 @@
 from app.utils.time_format import generate_hour_options
+from app.utils.timesheet_import import IMPORT_EXTENSIONS
 from flask_wtf import FlaskForm
-from wtforms import SelectField, StringField, SubmitField, TextAreaField
+from flask_wtf.file import FileAllowed, FileField, FileRequired
+from wtforms import BooleanField, SelectField, StringField, SubmitField, TextAreaField
 from wtforms.validators import DataRequired, Email, Optional
 
 
@@ -24,3 +26,13 @@ class TimeTransferForm(FlaskForm):
         self.amount.choices = generate_hour_options(
             extra_blocks=[(10.0, "10h"), (20.0, "20h"), (50.0, "50h"), (100.0, "100h")]
         )
+
+
+class TimesheetImportForm(FlaskForm):
+    file = FileField(
+        "Fichier (CSV ou JSON)",
+        validators=[FileRequired(), FileAllowed(IMPORT_EXTENSIONS, "Formats acceptés : CSV, JSON, JSON Lines")],
+    )
+    dry_run = BooleanField("Simulation (valider sans enregistrer)")
+    notify = BooleanField("Envoyer les notifications (une par tâche et par lot)")
+    submit = SubmitField("Importer")
@@ -1,25 +1,10 @@
 from datetime import UTC, datetime
 
 from app import db
-from app.utils.encryption import EncryptedType
-from app.utils.slug_utils import update_slug
-from cryptography.fernet import Fernet
+from app.utils.encryption import EncryptedType, get_fernet
+from app.utils.slug_utils import slug_needs_update, update_slug
 from flask import current_app
 
-# Cache pour l'instance Fernet
-_fernet_instance = None
-
-
-def get_fernet():
-    global _fernet_instance
-    if _fernet_instance is None:
-        key = current_app.config.get("ENCRYPTION_KEY")
-        if not key:
-            current_app.logger.error("Clé de chiffrement manquante dans la configuration")
-            return None
-        _fernet_instance = Fernet(key)
-    return _fernet_instance
-
 
 class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -50,7 +35,7 @@ class Client(db.Model):
 
     def save(self):
         """Sauvegarde l'instance et met à jour le slug si nécessaire"""
-        if self.name and (not self.slug or self.name != self.slug):
+        if self.name and slug_needs_update(self):
             update_slug(self)
         db.session.add(self)
         db.session.commit()
@@ -63,6 +48,7 @@ class Client(db.Model):
         try:
             f = get_fernet()
             if f is None:
+                current_app.logger.error("Clé de chiffrement manquante dans la configuration")
                 return "[Erreur: Clé de chiffrement manquante]"
 
             decrypted_data = f.decrypt(encrypted_value.encode("utf-8"))
@@ -2,7 +2,7 @@
 
 from app import db
 from app.utils import get_utc_now
-from app.utils.encryption import EncryptedType
+from app.utils.encryption import EncryptedType, get_fernet
 
 
 class Communication(db.Model):
@@ -38,14 +38,10 @@ class Communication(db.Model):
             return encrypted_value
 
         try:
-            from cryptography.fernet import Fernet
-            from flask import current_app
-
-            key = current_app.config.get("ENCRYPTION_KEY")
-            if not key:
+            f = get_fernet()
+            if f is None:
                 return "[Erreur: Clé de chiffrement manquante]"
 
-            f = Fernet(key)
             decrypted_data = f.decrypt(encrypted_value.encode("utf-8"))
             return decrypted_data.decode("utf-8")
         except Exception as e:
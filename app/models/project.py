@@ -1,7 +1,7 @@
 from datetime import UTC, datetime
 
 from app import db
-from app.utils.slug_utils import update_slug
+from app.utils.slug_utils import slug_needs_update, update_slug
 
 
 class Project(db.Model):
@@ -34,7 +34,7 @@ class Project(db.Model):
 
     def save(self):
         """Sauvegarde l'instance et met à jour le slug si nécessaire"""
-        if self.name and (not self.slug or self.name != self.slug):
+        if self.name and slug_needs_update(self):
             update_slug(self)
         db.session.add(self)
         db.session.commit()
@@ -0,0 +1,449 @@
+import re
+from datetime import UTC, datetime
+
+from app import db
+from app.models.client import Client
+from app.models.project import Project
+from app.models.task import ChecklistItem, Comment, Task
+from app.utils.blind_index import blind_index_fingerprint, blind_tokens
+from sqlalchemy import DDL, event
+from unidecode import unidecode
+
+# Nombre maximal de mots pris en compte dans une recherche
+MAX_SEARCH_TERMS = 8
+
+# Poids du titre par rapport au corps dans le classement bm25 (SQLite)
+TITLE_WEIGHT = 10.0
+
+# Vecteur PostgreSQL indexé (GIN) : le titre pèse 'A', le corps 'B'. Écrit en SQL littéral pour que
+# la requête reprenne exactement l'expression de l'index (des paramètres liés l'en empêcheraient).
+PG_TSVECTOR = (
+    "setweight(to_tsvector('simple', search_document.title), 'A') || "
+    "setweight(to_tsvector('simple', search_document.body), 'B')"
+)
+
+# SQLite : table FTS5 à contenu externe (les textes ne sont stockés qu'une fois, dans search_document),
+# synchronisée par triggers. Les textes sont déjà normalisés ; remove_diacritics couvre les requêtes brutes.
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+    "title, body, content='search_document', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+)
+
+
+def normalize_search_text(text):
+    """Texte indexable : minuscules sans accents, comme slugify ('Équipe' -> 'equipe')"""
+    return unidecode((text or "").lower())
+
+
+def search_terms(text):
+    """Mots d'une recherche (lettres et chiffres), limités à MAX_SEARCH_TERMS"""
+    return re.findall(r"[a-z0-9]+", normalize_search_text(text))[:MAX_SEARCH_TERMS]
+
+
+class SearchDocument(db.Model):
+    """Index plein texte : un document par tâche, élément de checklist, projet et client.
+
+    Maintenu au fil de l'eau par les événements des modèles indexés ; `flask rebuild-search-index`
+    le reconstruit entièrement. task_id, project_id et client_id servent au filtrage des droits.
+    """
+
+    __tablename__ = "search_document"
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # nom de table : task, checklist_item, project...
+    entity_id = db.Column(db.Integer, nullable=False)
+    task_id = db.Column(db.Integer, nullable=True, index=True)
+    project_id = db.Column(db.Integer, nullable=True, index=True)
+    client_id = db.Column(db.Integer, nullable=True, index=True)
+    title = db.Column(db.Text, nullable=False, default="")
+    body = db.Column(db.Text, nullable=False, default="")
+
+    __table_args__ = (
+        db.UniqueConstraint("entity_type", "entity_id", name="uq_search_document_entity"),
+        db.Index("ix_search_document_tsv", db.text(f"({PG_TSVECTOR})"), postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+        {"sqlite_autoincrement": True},
+    )
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Réindexe toutes les entités par lots ; retourne le nombre de documents."""
+        db.session.execute(cls.__table__.delete())
+        count = 0
+        batch = []
+        for document in _iter_all_documents():
+            batch.append(document)
+            if len(batch) >= batch_size:
+                db.session.execute(cls.__table__.insert(), batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(cls.__table__.insert(), batch)
+            count += len(batch)
+        if db.engine.dialect.name == "sqlite":
+            db.session.execute(db.text("INSERT INTO search_fts(search_fts) VALUES ('rebuild')"))
+        db.session.commit()
+        return count
+
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    SearchDocument.__table__, "before_drop", DDL("DROP TABLE IF EXISTS search_fts").execute_if(dialect="sqlite")
+)
+
+
+class CommentSearchToken(db.Model):
+    """Index aveugle des commentaires (chiffrés en base) : un jeton HMAC par mot distinct.
+
+    Le texte clair n'est jamais stocké ; une recherche calcule les jetons de ses mots et les cherche
+    dans l'index (mots entiers uniquement). Maintenu par les événements de Comment ;
+    `scripts/index_comments.py` le reconstruit.
+    """
+
+    __tablename__ = "comment_search_token"
+    token = db.Column(db.String(32), primary_key=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comment.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (db.Index("ix_comment_search_token_comment", "comment_id"),)
+
+    @classmethod
+    def is_stale(cls):
+        """Vrai si l'index n'a pas été reconstruit avec la clé actuelle (clé changée, ou index jamais reconstruit)"""
+        built_with = db.session.execute(db.select(CommentSearchIndex.key_fingerprint)).scalar()
+        return built_with != blind_index_fingerprint()
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recalcule les jetons de tous les commentaires (déchiffrés un par un) ; retourne (commentaires, jetons)."""
+        db.session.execute(cls.__table__.delete())
+        comments = tokens = 0
+        batch = []
+        for comment in db.session.execute(db.select(Comment)).scalars().yield_per(batch_size):
+            batch.extend({"token": token, "comment_id": comment.id} for token in blind_tokens(comment.content))
+            comments += 1
+            if len(batch) >= batch_size:
+                db.session.execute(cls.__table__.insert(), batch)
+                tokens += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(cls.__table__.insert(), batch)
+            tokens += len(batch)
+        db.session.execute(CommentSearchIndex.__table__.delete())
+        db.session.add(CommentSearchIndex(key_fingerprint=blind_index_fingerprint()))
+        db.session.commit()
+        return comments, tokens
+
+
+class CommentSearchIndex(db.Model):
+    """Clé avec laquelle l'index aveugle a été reconstruit (une seule ligne, empreinte de blind_index_key()).
+
+    Sans BLIND_INDEX_KEY la clé suit ENCRYPTION_KEY : `flask reencrypt` compare les empreintes et
+    reconstruit l'index dès qu'elles diffèrent, quelle que soit la table traitée par la commande.
+    """
+
+    __tablename__ = "comment_search_index"
+    id = db.Column(db.Integer, primary_key=True)
+    key_fingerprint = db.Column(db.String(16), nullable=True)
+    built_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+
+def matching_comments(text):
+    """Requête des id de commentaires contenant tous les mots (entiers) de la recherche ; None si aucun mot"""
+    tokens = blind_tokens(" ".join(search_terms(text)))
+    if not tokens:
+        return None
+    return (
+        db.select(CommentSearchToken.comment_id)
+        .where(CommentSearchToken.token.in_(tokens))
+        .group_by(CommentSearchToken.comment_id)
+        .having(db.func.count(CommentSearchToken.token) == len(tokens))
+    )
+
+
+def matching_documents(text):
+    """Sous-requête (doc_id, score) des documents contenant tous les mots (préfixes) ; None si aucun mot.
+
+    Score croissant avec la pertinence : -bm25 sous SQLite, ts_rank sous PostgreSQL.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+
+    if db.engine.dialect.name == "postgresql":
+        tsvector = db.literal_column(PG_TSVECTOR)
+        tsquery = db.func.to_tsquery(db.literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        return (
+            db.select(SearchDocument.id.label("doc_id"), db.func.ts_rank(tsvector, tsquery).label("score"))
+            .where(tsvector.op("@@")(tsquery))
+            .subquery("search_match")
+        )
+
+    fts_query = " ".join(f'"{term}"*' for term in terms)
+    return (
+        db.text(
+            f"SELECT rowid AS doc_id, -bm25(search_fts, {TITLE_WEIGHT}, 1.0) AS score "
+            "FROM search_fts WHERE search_fts MATCH :fts_query"
+        )
+        .bindparams(db.bindparam("fts_query", fts_query, unique=True))
+        .columns(doc_id=db.Integer, score=db.Float)
+        .subquery("search_match")
+    )
+
+
+def task_search_filter(text):
+    """Filtre des tâches dont le titre, la description, la checklist (ou un commentaire) correspond"""
+    match = matching_documents(text)
+    if match is None:
+        return db.true()
+    task_ids = (
+        db.select(SearchDocument.task_id)
+        .join(match, match.c.doc_id == SearchDocument.id)
+        .where(SearchDocument.task_id.isnot(None))
+    )
+    comment_ids = matching_comments(text)
+    if comment_ids is None:
+        return Task.id.in_(task_ids)
+    comment_task_ids = db.select(Comment.task_id).where(Comment.id.in_(comment_ids))
+    return db.or_(Task.id.in_(task_ids), Task.id.in_(comment_task_ids))
+
+
+def entity_search_filter(model, text):
+    """Filtre des projets ou clients dont le nom (ou la description) correspond"""
+    match = matching_documents(text)
+    if match is None:
+        return db.true()
+    entity_ids = (
+        db.select(SearchDocument.entity_id)
+        .join(match, match.c.doc_id == SearchDocument.id)
+        .where(SearchDocument.entity_type == model.__tablename__)
+    )
+    return model.id.in_(entity_ids)
+
+
+def ranked_documents(text, client_ids=None):
+    """Requête des documents correspondants, du plus pertinent au moins pertinent ; None si aucun mot.
+
+    client_ids restreint aux documents des clients donnés (utilisateurs clients).
+    """
+    match = matching_documents(text)
+    if match is None:
+        return None
+    query = db.select(SearchDocument).join(match, match.c.doc_id == SearchDocument.id)
+    if client_ids is not None:
+        query = query.where(SearchDocument.client_id.in_(client_ids))
+    return query.order_by(match.c.score.desc(), SearchDocument.id.desc())
+
+
+# --- Construction des documents ------------------------------------------------------------------
+
+
+def _document(entity_type, entity_id, title="", body="", task_id=None, project_id=None, client_id=None):
+    return {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "task_id": task_id,
+        "project_id": project_id,
+        "client_id": client_id,
+        "title": normalize_search_text(title),
+        "body": normalize_search_text(body),
+    }
+
+
+def _iter_all_documents():
+    """Documents de toutes les entités indexées, lus en flux"""
+    for client in db.session.execute(db.select(Client.id, Client.name, Client.contact_name)).yield_per(1000):
+        yield _document("client", client.id, client.name, client.contact_name, client_id=client.id)
+
+    projects = db.select(Project.id, Project.name, Project.description, Project.client_id)
+    for project in db.session.execute(projects).yield_per(1000):
+        yield _document(
+            "project", project.id, project.name, project.description, project_id=project.id, client_id=project.client_id
+        )
+
+    tasks = db.select(Task.id, Task.title, Task.description, Task.project_id, Project.client_id).join(
+        Project, Project.id == Task.project_id
+    )
+    for task in db.session.execute(tasks).yield_per(1000):
+        yield _document("task", task.id, task.title, task.description, task.id, task.project_id, task.client_id)
+
+    items = (
+        db.select(ChecklistItem.id, ChecklistItem.content, ChecklistItem.task_id, Task.project_id, Project.client_id)
+        .join(Task, Task.id == ChecklistItem.task_id)
+        .join(Project, Project.id == Task.project_id)
+    )
+    for item in db.session.execute(items).yield_per(1000):
+        yield _document(
+            "checklist_item",
+            item.id,
+            body=item.content,
+            task_id=item.task_id,
+            project_id=item.project_id,
+            client_id=item.client_id,
+        )
+
+
+# --- Maintenance incrémentale (événements ORM) ---------------------------------------------------
+
+
+def _put_document(connection, document):
+    """Remplace le document d'une entité"""
+    table = SearchDocument.__table__
+    connection.execute(
+        table.delete().where(table.c.entity_type == document["entity_type"], table.c.entity_id == document["entity_id"])
+    )
+    connection.execute(table.insert(), document)
+
+
+def _delete_documents(connection, *criteria):
+    table = SearchDocument.__table__
+    connection.execute(table.delete().where(db.or_(*criteria)))
+
+
+def _changed(target, *fields):
+    state = db.inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _task_scope(connection, task_id):
+    """(project_id, client_id) d'une tâche, lus sur la connexion du flush"""
+    row = connection.execute(
+        db.select(Task.project_id, Project.client_id)
+        .join(Project, Project.id == Task.project_id)
+        .where(Task.id == task_id)
+    ).first()
+    return (row.project_id, row.client_id) if row else (None, None)
+
+
+@event.listens_for(Client, "after_insert")
+@event.listens_for(Client, "after_update")
+def _index_client(mapper, connection, target):
+    if not _changed(target, "name", "contact_name"):
+        return
+    _put_document(connection, _document("client", target.id, target.name, target.contact_name, client_id=target.id))
+
+
+@event.listens_for(Client, "after_delete")
+def _unindex_client(mapper, connection, target):
+    _delete_documents(connection, SearchDocument.__table__.c.client_id == target.id)
+
+
+@event.listens_for(Project, "after_insert")
+@event.listens_for(Project, "after_update")
+def _index_project(mapper, connection, target):
+    if not _changed(target, "name", "description", "client_id"):
+        return
+    _put_document(
+        connection,
+        _document(
+            "project", target.id, target.name, target.description, project_id=target.id, client_id=target.client_id
+        ),
+    )
+    if _changed(target, "client_id"):
+        table = SearchDocument.__table__
+        connection.execute(table.update().where(table.c.project_id == target.id).values(client_id=target.client_id))
+
+
+@event.listens_for(Project, "after_delete")
+def _unindex_project(mapper, connection, target):
+    _delete_documents(connection, SearchDocument.__table__.c.project_id == target.id)
+
+
+@event.listens_for(Task, "after_insert")
+@event.listens_for(Task, "after_update")
+def _index_task(mapper, connection, target):
+    if not _changed(target, "title", "description", "project_id"):
+        return
+    project_id, client_id = _task_scope(connection, target.id)
+    _put_document(
+        connection, _document("task", target.id, target.title, target.description, target.id, project_id, client_id)
+    )
+    if _changed(target, "project_id"):
+        table = SearchDocument.__table__
+        connection.execute(
+            table.update().where(table.c.task_id == target.id).values(project_id=project_id, client_id=client_id)
+        )
+
+
+@event.listens_for(Task, "after_delete")
+def _unindex_task(mapper, connection, target):
+    _delete_documents(connection, SearchDocument.__table__.c.task_id == target.id)
+
+
+@event.listens_for(ChecklistItem, "after_insert")
+@event.listens_for(ChecklistItem, "after_update")
+def _index_checklist_item(mapper, connection, target):
+    if not _changed(target, "content", "task_id"):
+        return
+    project_id, client_id = _task_scope(connection, target.task_id)
+    _put_document(
+        connection,
+        _document(
+            "checklist_item",
+            target.id,
+            body=target.content,
+            task_id=target.task_id,
+            project_id=project_id,
+            client_id=client_id,
+        ),
+    )
+
+
+def index_checklist_items(items):
+    """Indexe des éléments de checklist insérés en masse (sans événements ORM) : lignes (id, task_id, content)"""
+    if not items:
+        return
+    scopes = {
+        row.id: row
+        for row in db.session.execute(
+            db.select(Task.id, Task.project_id, Project.client_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(Task.id.in_({item.task_id for item in items}))
+        )
+    }
+    db.session.execute(
+        SearchDocument.__table__.insert(),
+        [
+            _document(
+                "checklist_item",
+                item.id,
+                body=item.content,
+                task_id=item.task_id,
+                project_id=scopes[item.task_id].project_id,
+                client_id=scopes[item.task_id].client_id,
+            )
+            for item in items
+        ],
+    )
+
+
+@event.listens_for(ChecklistItem, "after_delete")
+def _unindex_checklist_item(mapper, connection, target):
+    table = SearchDocument.__table__
+    _delete_documents(connection, db.and_(table.c.entity_type == "checklist_item", table.c.entity_id == target.id))
+
+
+@event.listens_for(Comment, "after_insert")
+@event.listens_for(Comment, "after_update")
+def _index_comment_tokens(mapper, connection, target):
+    """Jetons aveugles d'un commentaire créé, modifié (edit_comment) ou d'une réponse (add_reply)"""
+    if not _changed(target, "_content"):
+        return
+    table = CommentSearchToken.__table__
+    connection.execute(table.delete().where(table.c.comment_id == target.id))
+    tokens = blind_tokens(target.content)
+    if tokens:
+        connection.execute(table.insert(), [{"token": token, "comment_id": target.id} for token in tokens])
+
+
+@event.listens_for(Comment, "after_delete")
+def _unindex_comment_tokens(mapper, connection, target):
+    table = CommentSearchToken.__table__
+    connection.execute(table.delete().where(table.c.comment_id == target.id))
@@ -1,11 +1,13 @@
 import calendar
+import uuid
 from datetime import UTC, date, datetime, timedelta
 
 from app import db
-from app.utils.encryption import EncryptedType
-from app.utils.slug_utils import update_slug
-from cryptography.fernet import Fernet
+from app.utils.encryption import EncryptedType, get_fernet
+from app.utils.slug_utils import slug_needs_update, update_slug
+from app.utils.sql_compat import insert_or_increment, truncate_date
 from flask import current_app
+from sqlalchemy import event
 
 
 class TaskRecurrenceSeries(db.Model):
@@ -170,7 +172,44 @@ class TaskRecurrenceSeries(db.Model):
         return "Récurrence"
 
 
+class RecurrenceJob(db.Model):
+    """
+    Matérialisation en tâche de fond des occurrences futures d'une série (voir app/utils/recurrence.py).
+
+    status : pending -> running -> done | failed ; cancelled si remplacé par un travail plus récent.
+    replace : supprimer d'abord les occurrences futures existantes (série créée ou modifiée).
+    """
+
+    __tablename__ = "recurrence_job"
+    id = db.Column(db.Integer, primary_key=True)
+    series_id = db.Column(db.Integer, db.ForeignKey("task_recurrence_series.id", ondelete="CASCADE"), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    replace = db.Column(db.Boolean, nullable=False, default=False)
+    horizon_days = db.Column(db.Integer, nullable=False, default=180)
+    total = db.Column(db.Integer, nullable=True)  # Occurrences à créer (connu au démarrage)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_recurrence_job_status_id", "status", "id"),
+        db.Index("ix_recurrence_job_series_id", "series_id", "id"),
+    )
+
+    def progress(self):
+        """Avancement exposé par GET /tasks/<slug>/recurrence"""
+        return {
+            "status": self.status,
+            "created": self.created_count,
+            "total": self.total,
+            "error": self.error,
+        }
+
+
 class ChecklistItem(db.Model):
+    __table_args__ = {"sqlite_autoincrement": True}
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String(255), nullable=False)
     is_checked = db.Column(db.Boolean, default=False)
@@ -196,6 +235,10 @@ class Task(db.Model):
     actual_minutes = db.Column(db.Integer, nullable=True)  # en minutes
     # Date "d'apparition" (utilisée pour masquer les occurrences futures des tâches récurrentes)
     scheduled_for = db.Column(db.Date, nullable=True)
+    # Date à partir de laquelle la tâche est visible : scheduled_for, ou date de created_at à défaut.
+    # Colonne dérivée (maintenue par _sync_task_visible_from) pour remplacer le prédicat
+    # "scheduled_for IS NULL OR scheduled_for <= aujourd'hui", que SQLite ne sait pas indexer.
+    visible_from = db.Column(db.Date, nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     completed_at = db.Column(db.DateTime, nullable=True)
@@ -219,14 +262,47 @@ class Task(db.Model):
         cascade="all, delete-orphan",
         order_by="ChecklistItem.position, ChecklistItem.id",
     )
+    # Suppression par l'ORM (et non par ON DELETE CASCADE seul) : les événements de TaskAttachment
+    # décrémentent les références des contenus partagés (AttachmentBlob)
+    attachments = db.relationship("TaskAttachment", backref="task", lazy=True, cascade="all, delete-orphan")
     recurrence_series = db.relationship("TaskRecurrenceSeries", foreign_keys=[recurrence_series_id], lazy=True)
     recurrence_template = db.relationship(
         "TaskRecurrenceSeries", foreign_keys=[TaskRecurrenceSeries.template_task_id], uselist=False, lazy=True
     )
 
+    __table_args__ = (
+        db.Index("ix_task_visible_from", "visible_from"),
+        db.Index("ix_task_project_visible_from", "project_id", "visible_from"),
+        db.Index("ix_task_status_visible_from", "status", "visible_from"),
+        # PostgreSQL uniquement : index partiel sur les tâches actives (kanban, tableau de bord)
+        db.Index(
+            "ix_task_active_project_visible_from",
+            "project_id",
+            "visible_from",
+            postgresql_where=db.text("NOT is_archived"),
+        ).ddl_if(dialect="postgresql"),
+        {"sqlite_autoincrement": True},
+    )
+
     def __repr__(self):
         return f"Task('{self.title}', Status: '{self.status}', Project: '{self.project.name}')"
 
+    @staticmethod
+    def visible_on(day: date):
+        """Clause SQL (indexable) des tâches visibles au jour donné (pas planifiées dans le futur)."""
+        return Task.visible_from <= day
+
+    def is_visible_on(self, day: date) -> bool:
+        """Équivalent Python de visible_on() pour une tâche déjà chargée."""
+        return self.scheduled_for is None or self.scheduled_for <= day
+
+    def compute_visible_from(self) -> date:
+        """Calcule visible_from : scheduled_for si défini, sinon la date de création."""
+        if self.scheduled_for is not None:
+            return self.scheduled_for
+        created_at = self.created_at or datetime.now(UTC)
+        return created_at.date()
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if self.title and not self.slug:
@@ -234,19 +310,20 @@ class Task(db.Model):
 
     def save(self):
         """Sauvegarde l'instance et met à jour le slug si nécessaire"""
-        # Toujours mettre à jour le slug si le titre existe
-        if self.title:
+        # Régénérer le slug uniquement si le titre a changé (sinon aucune requête d'unicité)
+        if self.title and slug_needs_update(self):
             update_slug(self)
         db.session.add(self)
         db.session.commit()
 
-    def clone(self, clone_checklist_items: bool = True):
+    def clone(self, clone_checklist_items: bool = True, clone_attachments: bool = True):
         """
         Crée une copie de la tâche sans les commentaires et le temps passé.
 
         Par défaut, la checklist (sous-tâches) est aussi clonée, mais:
         - l'état d'avancement des éléments est réinitialisé (is_checked = False)
         - aucun historique de temps n'est cloné (TimeEntry n'est pas dupliqué)
+        Les pièces jointes sont partagées avec la tâche d'origine (voir AttachmentBlob).
         """
         cloned_task = Task(
             title=f"Copie de {self.title}",
@@ -267,15 +344,22 @@ class Task(db.Model):
                     ChecklistItem(content=item.content, is_checked=False, position=item.position)
                 )
 
+        if clone_attachments:
+            # Stockage par contenu : nouvelle référence vers le même fichier, aucun octet copié
+            for attachment in self.attachments:
+                cloned_task.attachments.append(attachment.copy())
+
         return cloned_task
 
-    def clone_for_recurrence(self, scheduled_for: date, clone_checklist_items: bool = True):
+    def clone_for_recurrence(self, scheduled_for: date, clone_checklist_items: bool = True, slug: str | None = None):
         """
         Copie "propre" pour la récurrence (même titre, même contenu),
         sans commentaires ni temps passé, statut remis à "à faire".
+        `slug` permet de fournir un slug pré-calculé en lot (generate_slugs) pour éviter une requête par copie.
         """
         cloned_task = Task(
             title=self.title,
+            slug=slug,
             description=self.description,
             status="à faire",
             priority=self.priority,
@@ -400,32 +484,108 @@ class Task(db.Model):
         db.session.commit()
 
     @staticmethod
-    def should_be_archived():
-        """Retourne les tâches qui devraient être archivées (terminées depuis plus de 2 semaines)"""
-        from datetime import timedelta
-
-        two_weeks_ago = datetime.now(UTC) - timedelta(weeks=2)
+    def archivable_filter(now=None):
+        """Critère des tâches à archiver (terminées depuis plus de 2 semaines)"""
+        two_weeks_ago = (now or datetime.now(UTC)) - timedelta(weeks=2)
 
         # Utiliser completed_at si disponible, sinon updated_at comme fallback
         # Cela gère les cas où des tâches ont été marquées comme terminées avant l'implémentation de completed_at
-        return Task.query.filter(
+        return db.and_(
             Task.status == "terminé",
             Task.is_archived == False,
             db.or_(
                 db.and_(Task.completed_at.isnot(None), Task.completed_at < two_weeks_ago),
                 db.and_(Task.completed_at.is_(None), Task.updated_at < two_weeks_ago),
             ),
-        ).all()
+        )
+
+    @staticmethod
+    def should_be_archived():
+        """Retourne les tâches qui devraient être archivées (terminées depuis plus de 2 semaines)"""
+        return Task.query.filter(Task.archivable_filter()).all()
+
+    @staticmethod
+    def archive_in_batches(batch_size=1000, time_budget=None, dry_run=False):
+        """
+        Archive les tâches à archiver par lots d'UPDATE sur des plages de clés primaires.
+
+        Chaque lot est une transaction courte (la base n'est pas verrouillée pendant tout l'archivage) ;
+        time_budget (secondes) arrête l'archivage entre deux lots, le reste est traité au passage suivant.
+        Les événements ORM ne sont pas déclenchés : archive() ne modifie aucune donnée indexée.
+
+        Returns:
+            dict: archived (nombre de tâches), by_project [(nom du projet, nombre)],
+                complete (False si le budget de temps a interrompu l'archivage)
+        """
+        import time
+
+        from app.models.project import Project
+
+        started = time.monotonic()
+        now = datetime.now(UTC)
+        archivable = Task.archivable_filter(now)
+        # Horodatage commun à tout le passage : le rapport par projet le retrouve en une requête groupée
+        archived_at = now.replace(tzinfo=None)
+
+        def by_project(criterion):
+            rows = db.session.execute(
+                db.select(Project.name, db.func.count(Task.id))
+                .join(Project, Project.id == Task.project_id)
+                .where(criterion)
+                .group_by(Project.id, Project.name)
+                .order_by(Project.name)
+            ).all()
+            return [(name, count) for name, count in rows]
+
+        if dry_run:
+            report = by_project(archivable)
+            return {"archived": sum(count for _, count in report), "by_project": report, "complete": True}
+
+        table = Task.__table__
+        archived = 0
+        complete = True
+        cursor = 0
+        while True:
+            if time_budget is not None and time.monotonic() - started >= time_budget:
+                complete = False
+                break
+            # Borne haute du lot : batch_size-ième tâche à archiver après le curseur (aucune : dernier lot)
+            upper = db.session.execute(
+                db.select(Task.id).where(archivable, Task.id > cursor).order_by(Task.id).offset(batch_size - 1).limit(1)
+            ).scalar()
+            id_range = db.and_(Task.id > cursor, Task.id <= upper) if upper is not None else Task.id > cursor
+            result = db.session.execute(
+                table.update()
+                .where(archivable, id_range)
+                .values(
+                    is_archived=True,
+                    archived_at=archived_at,
+                    # S'assurer que completed_at est défini pour les tâches terminées (comme archive())
+                    completed_at=db.func.coalesce(Task.completed_at, Task.updated_at),
+                )
+            )
+            db.session.commit()
+            archived += result.rowcount
+            if upper is None:
+                break
+            cursor = upper
+
+        report = by_project(Task.archived_at == archived_at) if archived else []
+        return {"archived": archived, "by_project": report, "complete": complete}
 
     @staticmethod
     def auto_archive_old_tasks():
         """Archive automatiquement les tâches terminées depuis plus de 2 semaines"""
-        tasks_to_archive = Task.should_be_archived()
-        archived_count = 0
-        for task in tasks_to_archive:
-            task.archive()
-            archived_count += 1
-        return archived_count
+        return Task.archive_in_batches()["archived"]
+
+
+@event.listens_for(Task, "before_insert")
+@event.listens_for(Task, "before_update")
+def _sync_task_visible_from(mapper, connection, target):
+    """Maintient visible_from à jour à chaque flush d'une tâche."""
+    if target.created_at is None:
+        target.created_at = datetime.now(UTC)
+    target.visible_from = target.compute_visible_from()
 
 
 class TimeEntry(db.Model):
@@ -439,6 +599,12 @@ class TimeEntry(db.Model):
     # Relation
     user = db.relationship("User", backref="time_entries", lazy=True)
 
+    __table_args__ = (
+        # PostgreSQL uniquement : table en ajout seul, un index BRIN suffit pour les rapports par période
+        db.Index("ix_time_entry_created_at_brin", "created_at", postgresql_using="brin").ddl_if(dialect="postgresql"),
+        {"sqlite_autoincrement": True},
+    )
+
     def __repr__(self):
         return f"TimeEntry(Task: {self.task_id}, User: {self.user.name}, Minutes: {self.minutes})"
 
@@ -448,7 +614,160 @@ class TimeEntry(db.Model):
         return self.minutes / 60
 
 
+class TimeRollupDaily(db.Model):
+    """Cumul quotidien des saisies de temps par projet et par utilisateur (source des rapports).
+
+    Maintenu au fil de l'eau par les événements de TimeEntry ; `flask rebuild-time-rollups`
+    le reconstruit entièrement à partir des saisies.
+    """
+
+    __tablename__ = "time_rollup_daily"
+    day = db.Column(db.Date, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_time_rollup_daily_project_day", "project_id", "day"),
+        db.Index("ix_time_rollup_daily_user_day", "user_id", "day"),
+    )
+
+    @classmethod
+    def rebuild(cls):
+        """Reconstruit les cumuls quotidiens puis mensuels en requêtes ensemblistes ; retourne le nombre de jours."""
+        table = cls.__table__
+        day = db.func.date(TimeEntry.created_at)
+        source = (
+            db.select(
+                day,
+                Task.project_id,
+                TimeEntry.user_id,
+                db.func.sum(TimeEntry.minutes),
+                db.func.count(TimeEntry.id),
+            )
+            .join(Task, Task.id == TimeEntry.task_id)
+            .group_by(day, Task.project_id, TimeEntry.user_id)
+        )
+        from app.utils import cold_storage
+
+        if cold_storage.is_ready():
+            # Saisies des tâches déplacées dans le stockage froid : toujours comptées dans les cumuls
+            cold_entries, cold_tasks = cold_storage.cold_table(TimeEntry), cold_storage.cold_table(Task)
+            cold_day = db.func.date(cold_entries.c.created_at)
+            cold_source = (
+                db.select(
+                    cold_day,
+                    cold_tasks.c.project_id,
+                    cold_entries.c.user_id,
+                    db.func.sum(cold_entries.c.minutes),
+                    db.func.count(cold_entries.c.id),
+                )
+                .join(cold_tasks, cold_tasks.c.id == cold_entries.c.task_id)
+                .group_by(cold_day, cold_tasks.c.project_id, cold_entries.c.user_id)
+            )
+            both = db.union_all(source, cold_source).subquery()
+            day_col, project_col, user_col, minutes_col, count_col = both.c
+            source = db.select(
+                day_col, project_col, user_col, db.func.sum(minutes_col), db.func.sum(count_col)
+            ).group_by(day_col, project_col, user_col)
+        db.session.execute(table.delete())
+        db.session.execute(
+            table.insert().from_select(["day", "project_id", "user_id", "minutes", "entry_count"], source)
+        )
+        TimeRollupMonthly.rebuild_from_daily()
+        db.session.commit()
+        return db.session.query(db.func.count()).select_from(table).scalar()
+
+
+class TimeRollupMonthly(db.Model):
+    """Cumul mensuel ('AAAA-MM') par projet et par utilisateur : rapports sur des mois entiers."""
+
+    __tablename__ = "time_rollup_monthly"
+    month = db.Column(db.String(7), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_time_rollup_monthly_project_month", "project_id", "month"),
+        db.Index("ix_time_rollup_monthly_user_month", "user_id", "month"),
+    )
+
+    @classmethod
+    def rebuild_from_daily(cls):
+        """Recalcule les cumuls mensuels à partir des cumuls quotidiens (sans commit)."""
+        table = cls.__table__
+        month = truncate_date(TimeRollupDaily.day, "month")
+        source = db.select(
+            month,
+            TimeRollupDaily.project_id,
+            TimeRollupDaily.user_id,
+            db.func.sum(TimeRollupDaily.minutes),
+            db.func.sum(TimeRollupDaily.entry_count),
+        ).group_by(month, TimeRollupDaily.project_id, TimeRollupDaily.user_id)
+        db.session.execute(table.delete())
+        db.session.execute(
+            table.insert().from_select(["month", "project_id", "user_id", "minutes", "entry_count"], source)
+        )
+
+
+def apply_time_rollup_totals(connection, totals):
+    """Ajoute des totaux {(jour, project_id, user_id): (minutes, nb_saisies)} aux cumuls quotidiens et mensuels.
+
+    Utilisé tel quel par les imports en masse (insertions groupées, sans événements ORM).
+    """
+    for (day, project_id, user_id), (minutes, count) in totals.items():
+        increments = {"minutes": minutes, "entry_count": count}
+        for table, period in (
+            (TimeRollupDaily.__table__, {"day": day}),
+            (TimeRollupMonthly.__table__, {"month": day.strftime("%Y-%m")}),
+        ):
+            keys = {**period, "project_id": project_id, "user_id": user_id}
+            insert_or_increment(connection, table, keys, increments)
+            if count < 0:
+                connection.execute(
+                    table.delete().where(*(table.c[k] == v for k, v in keys.items()), table.c.entry_count <= 0)
+                )
+
+
+def _apply_time_rollup(connection, task_id, user_id, created_at, minutes, sign):
+    """Répercute l'ajout (sign=1) ou le retrait (sign=-1) d'une saisie sur les cumuls quotidiens et mensuels."""
+    project_id = connection.execute(db.select(Task.project_id).where(Task.id == task_id)).scalar()
+    if project_id is None or not minutes:
+        return
+    day = (created_at or datetime.now(UTC)).date()
+    apply_time_rollup_totals(connection, {(day, project_id, user_id): (sign * minutes, sign)})
+
+
+@event.listens_for(TimeEntry, "after_insert")
+def _rollup_time_entry_insert(mapper, connection, target):
+    _apply_time_rollup(connection, target.task_id, target.user_id, target.created_at, target.minutes, 1)
+
+
+@event.listens_for(TimeEntry, "after_delete")
+def _rollup_time_entry_delete(mapper, connection, target):
+    _apply_time_rollup(connection, target.task_id, target.user_id, target.created_at, target.minutes, -1)
+
+
+@event.listens_for(TimeEntry, "before_update")
+def _rollup_time_entry_update(mapper, connection, target):
+    fields = ("task_id", "user_id", "created_at", "minutes")
+    state = db.inspect(target)
+    if not any(state.attrs[f].history.has_changes() for f in fields):
+        return
+
+    # Anciennes valeurs lues en base (l'historique ORM est vide si l'attribut avait expiré)
+    previous = connection.execute(
+        db.select(*(getattr(TimeEntry, f) for f in fields)).where(TimeEntry.id == target.id)
+    ).one()
+    _apply_time_rollup(connection, *previous, -1)
+    _apply_time_rollup(connection, target.task_id, target.user_id, target.created_at, target.minutes, 1)
+
+
 class Comment(db.Model):
+    __table_args__ = {"sqlite_autoincrement": True}
     id = db.Column(db.Integer, primary_key=True)
     _content = db.Column("content", EncryptedType, nullable=False)  # Contenu chiffré (nom interne)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
@@ -472,10 +791,9 @@ class Comment(db.Model):
             return self._content
 
         try:
-            key = current_app.config.get("ENCRYPTION_KEY")
-            if not key:
+            f = get_fernet()
+            if f is None:
                 return "[Erreur: Clé de chiffrement manquante]"
-            f = Fernet(key)
             return f.decrypt(self._content.encode("utf-8")).decode("utf-8")
         except Exception as e:
             current_app.logger.error(f"Erreur lors du déchiffrement d'un commentaire: {e}")
@@ -496,3 +814,87 @@ class UserPinnedTask(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey("task.id"), primary_key=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+
+
+class AttachmentBlob(db.Model):
+    """Contenu d'une pièce jointe, stocké une seule fois sous son empreinte SHA-256.
+
+    ref_count (nombre de TaskAttachment qui le référencent) est maintenu par les événements de
+    TaskAttachment ; un contenu sans référence est supprimé avec son fichier
+    (voir app/utils/task_attachments.py et `flask attachments-gc`).
+    """
+
+    __tablename__ = "attachment_blob"
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (db.Index("ix_attachment_blob_ref_count", "ref_count"),)
+
+
+class TaskAttachment(db.Model):
+    """Métadonnées d'une pièce jointe de tâche ; le contenu est un AttachmentBlob partagé.
+
+    Remplace les fichiers manifest.json par tâche : `flask import-attachment-manifests` importe les anciens.
+    """
+
+    __tablename__ = "task_attachment"
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey("task.id", ondelete="CASCADE"), nullable=False)
+    file_id = db.Column(db.String(36), unique=True, nullable=False)  # UUID (identifiant public, URLs)
+    name = db.Column(db.String(200), nullable=False)  # Nom d'origine (assaini)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), db.ForeignKey("attachment_blob.sha256"), nullable=False)
+    uploaded_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        db.Index("ix_task_attachment_task_uploaded", "task_id", "uploaded_at"),
+        db.Index("ix_task_attachment_sha256", "sha256"),
+        {"sqlite_autoincrement": True},
+    )
+
+    def copy(self):
+        """Nouvelle pièce jointe (nouvel identifiant) pointant vers le même contenu"""
+        from app.utils.task_attachments import store_legacy_file
+
+        store_legacy_file(self)
+        return TaskAttachment(file_id=str(uuid.uuid4()), name=self.name, size=self.size, sha256=self.sha256)
+
+    def to_dict(self):
+        """Format historique du manifest (API JSON et page de détail)"""
+        return {
+            "id": self.file_id,
+            "name": self.name,
+            "size": self.size,
+            "uploaded_at": self.uploaded_at.strftime("%Y-%m-%dT%H:%M:%SZ") if self.uploaded_at else "",
+        }
+
+    @classmethod
+    def counts_for(cls, task_ids):
+        """Nombre de pièces jointes par tâche, en une requête : {task_id: nombre} (tâches sans pièce jointe absentes)"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+        rows = db.session.execute(
+            db.select(cls.task_id, db.func.count(cls.id)).where(cls.task_id.in_(task_ids)).group_by(cls.task_id)
+        )
+        return dict(rows.all())
+
+
+@event.listens_for(TaskAttachment, "before_insert")
+def _reference_attachment_blob(mapper, connection, target):
+    # Avant l'insertion (clé étrangère) : crée le contenu ou incrémente ses références
+    insert_or_increment(
+        connection,
+        AttachmentBlob.__table__,
+        {"sha256": target.sha256},
+        {"ref_count": 1},
+        defaults={"size": target.size, "created_at": datetime.now(UTC)},
+    )
+
+
+@event.listens_for(TaskAttachment, "after_delete")
+def _release_attachment_blob(mapper, connection, target):
+    table = AttachmentBlob.__table__
+    connection.execute(table.update().where(table.c.sha256 == target.sha256).values(ref_count=table.c.ref_count - 1))
@@ -1,10 +1,11 @@
 from app import db
-from app.forms.admin import TestEmailForm, TimeTransferForm
+from app.forms.admin import TestEmailForm, TimesheetImportForm, TimeTransferForm
 from app.models.project import Project
 from app.models.task import Task
 from app.models.user import User
 from app.utils.decorators import login_and_admin_required
 from app.utils.email import send_email
+from app.utils.timesheet_import import import_timesheet, iter_records
 from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
 from flask_login import current_user
 
@@ -188,3 +189,32 @@ def time_transfer():
             return render_template("admin/time_transfer.html", form=form, title="Transfert de temps")
 
     return render_template("admin/time_transfer.html", form=form, title="Transfert de temps")
+
+
+@admin.route("/timesheet-import", methods=["GET", "POST"])
+@login_and_admin_required
+def timesheet_import():
+    """Import en masse de tâches, saisies de temps et crédits depuis un fichier CSV/JSON"""
+    form = TimesheetImportForm()
+    stats = None
+
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            # Le fichier est lu en flux depuis le stockage temporaire de Werkzeug
+            records = iter_records(upload.stream, upload.filename)
+            stats = import_timesheet(records, dry_run=form.dry_run.data, notify=form.notify.data)
+        except ValueError as e:
+            flash(f"Fichier invalide : {e}", "danger")
+        except Exception as e:
+            current_app.logger.exception("Import de feuille de temps échoué")
+            flash(f"Une erreur est survenue lors de l'import : {str(e)}", "danger")
+        else:
+            label = "Simulation terminée" if form.dry_run.data else "Import terminé"
+            flash(
+                f"{label} : {stats['time_entries']} saisie(s), {stats['credits']} crédit(s), "
+                f"{stats['tasks_created']} tâche(s) créée(s), {stats['errors']} ligne(s) rejetée(s).",
+                "warning" if stats["errors"] else "success",
+            )
+
+    return render_template("admin/timesheet_import.html", form=form, stats=stats, title="Import de feuilles de temps")
@@ -1,6 +1,5 @@
 from urllib.parse import urljoin, urlparse
 
-import requests
 from app import db
 from app.forms.auth import (
     LoginForm,
@@ -48,6 +47,9 @@ def verify_turnstile_token(token):
     if not token:
         return False
 
+    # Import différé : requests n'est utile qu'à la connexion avec Turnstile activé
+    import requests
+
     response = requests.post(
         "https://challenges.cloudflare.com/turnstile/v0/siteverify",
         {"secret": current_app.config["TURNSTILE_SECRET_KEY"], "response": token},
@@ -1,6 +1,7 @@
 from app import db
 from app.forms.client import ClientForm
 from app.models.client import Client
+from app.utils import cold_storage
 from app.utils.decorators import login_and_admin_required
 from app.utils.route_utils import (
     apply_filters,
@@ -106,6 +107,7 @@ def edit_client(slug_or_id):
 @login_and_admin_required
 def delete_client(slug_or_id):
     client = get_client_by_slug_or_id(slug_or_id)
+    cold_storage.purge_projects(project.id for project in client.projects)
     delete_from_db(client)
     flash(f'Client "{client.name}" supprimé!', "success")
     return redirect(url_for("clients.list_clients"))
@@ -3,7 +3,7 @@ from datetime import timedelta
 from app import db
 from app.models.communication import Communication
 from app.utils import get_utc_now
-from app.utils.decorators import login_and_admin_required
+from app.utils.decorators import login_and_admin_required, read_only_db
 from app.utils.route_utils import (
     apply_filters,
     get_communication_by_id,
@@ -30,6 +30,7 @@ def get_communication_stats():
 
 @communications.route("/admin/communications")
 @login_and_admin_required
+@read_only_db
 def list_communications():
     """Liste des communications envoyées"""
     page = request.args.get("page", 1, type=int)
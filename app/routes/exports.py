@@ -0,0 +1,149 @@
+"""
+Exports comptables en flux : saisies de temps, journal des crédits et historique unifié d'un projet.
+
+Les requêtes sont exécutées avec `yield_per` (curseur côté serveur) et la réponse est un générateur :
+la mémoire reste constante quel que soit le volume. Les données sont limitées aux projets
+accessibles à l'utilisateur (`get_accessible_projects`).
+"""
+
+import heapq
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.client import Client
+from app.models.project import CreditLog, Project
+from app.models.task import Task, TimeEntry
+from app.models.user import User
+from app.utils import parse_iso_date
+from app.utils.decorators import read_only_db
+from app.utils.export import EXPORT_FORMATS, stream_export
+from app.utils.route_utils import get_accessible_projects
+from flask import Blueprint, abort, request
+from flask_login import login_required
+from sqlalchemy import select
+
+exports = Blueprint("exports", __name__)
+
+# Taille des lots lus depuis le curseur
+EXPORT_YIELD_PER = 1000
+
+TIME_ENTRY_HEADER = ["Date", "Client", "Projet", "Tâche", "Utilisateur", "Minutes", "Description"]
+CREDIT_LOG_HEADER = ["Date", "Client", "Projet", "Tâche", "Minutes", "Note"]
+HISTORY_HEADER = ["Date", "Type", "Client", "Projet", "Tâche", "Utilisateur", "Minutes", "Note"]
+
+
+def _export_params():
+    """Format et filtres communs (projet, client, utilisateur, période) lus dans la requête"""
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    return export_format, {
+        "project_id": request.args.get("project_id", type=int),
+        "client_id": request.args.get("client_id", type=int),
+        "user_id": request.args.get("user_id", type=int),
+        "start": parse_iso_date(request.args.get("start")),
+        "end": parse_iso_date(request.args.get("end")),
+    }
+
+
+def _scoped(stmt, created_at, filters):
+    """Restreint une requête aux projets accessibles, aux filtres projet/client et à la période"""
+    accessible = get_accessible_projects().with_entities(Project.id).scalar_subquery()
+    stmt = stmt.where(Project.id.in_(accessible))
+    if filters["project_id"]:
+        stmt = stmt.where(Project.id == filters["project_id"])
+    if filters["client_id"]:
+        stmt = stmt.where(Project.client_id == filters["client_id"])
+    if filters["start"]:
+        stmt = stmt.where(created_at >= datetime.combine(filters["start"], datetime.min.time()))
+    if filters["end"]:
+        stmt = stmt.where(created_at < datetime.combine(filters["end"] + timedelta(days=1), datetime.min.time()))
+    return stmt
+
+
+def _stream(stmt):
+    """Exécute la requête avec un curseur côté serveur (lots de EXPORT_YIELD_PER lignes)"""
+    return db.session.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
+
+
+def _time_entry_rows(filters, newest_first=False):
+    stmt = (
+        select(
+            TimeEntry.created_at,
+            Client.name,
+            Project.name,
+            Task.title,
+            User.name,
+            TimeEntry.minutes,
+            TimeEntry.description,
+        )
+        .join(Task, TimeEntry.task_id == Task.id)
+        .join(Project, Task.project_id == Project.id)
+        .join(Client, Project.client_id == Client.id)
+        .join(User, TimeEntry.user_id == User.id)
+    )
+    stmt = _scoped(stmt, TimeEntry.created_at, filters)
+    if filters["user_id"]:
+        stmt = stmt.where(TimeEntry.user_id == filters["user_id"])
+    if newest_first:
+        return _stream(stmt.order_by(TimeEntry.created_at.desc().nulls_last(), TimeEntry.id.desc()))
+    return _stream(stmt.order_by(TimeEntry.created_at, TimeEntry.id))
+
+
+def _credit_log_rows(filters, newest_first=False):
+    stmt = (
+        select(CreditLog.created_at, Client.name, Project.name, Task.title, CreditLog.amount, CreditLog.note)
+        .join(Project, CreditLog.project_id == Project.id)
+        .join(Client, Project.client_id == Client.id)
+        .outerjoin(Task, CreditLog.task_id == Task.id)
+    )
+    stmt = _scoped(stmt, CreditLog.created_at, filters)
+    if newest_first:
+        return _stream(stmt.order_by(CreditLog.created_at.desc().nulls_last(), CreditLog.id.desc()))
+    return _stream(stmt.order_by(CreditLog.created_at, CreditLog.id))
+
+
+@exports.route("/exports/time-entries")
+@login_required
+@read_only_db
+def export_time_entries():
+    """Export des saisies de temps"""
+    export_format, filters = _export_params()
+    return stream_export(export_format, "saisies-temps", TIME_ENTRY_HEADER, _time_entry_rows(filters), "Saisies")
+
+
+@exports.route("/exports/credit-logs")
+@login_required
+@read_only_db
+def export_credit_logs():
+    """Export du journal des crédits (sans utilisateur : le filtre user_id ne s'applique pas)"""
+    export_format, filters = _export_params()
+    return stream_export(export_format, "journal-credits", CREDIT_LOG_HEADER, _credit_log_rows(filters), "Crédits")
+
+
+@exports.route("/exports/history")
+@login_required
+@read_only_db
+def export_history():
+    """Export de l'historique unifié (crédits et temps consommés), du plus récent au plus ancien.
+
+    Les deux flux triés sont fusionnés au fil de l'eau ; avec un filtre utilisateur, seuls les temps
+    sont exportés puisque les crédits ne sont rattachés à aucun utilisateur.
+    """
+    export_format, filters = _export_params()
+
+    # Requêtes exécutées ici, pendant que @read_only_db est actif ; seule la lecture est différée
+    time_entries = _time_entry_rows(filters, newest_first=True)
+    credit_logs = None if filters["user_id"] else _credit_log_rows(filters, newest_first=True)
+
+    def time_items():
+        for created_at, client, project, task, user, minutes, description in time_entries:
+            yield (created_at, "Temps", client, project, task, user, -minutes, description)
+
+    def credit_items():
+        for created_at, client, project, task, amount, note in credit_logs:
+            yield (created_at, "Crédit", client, project, task, None, amount, note)
+
+    streams = [time_items()] if credit_logs is None else [credit_items(), time_items()]
+    rows = heapq.merge(*streams, key=lambda row: row[0] or datetime.min, reverse=True)
+    return stream_export(export_format, "historique", HISTORY_HEADER, rows, "Historique")
@@ -1,12 +1,17 @@
+from datetime import timedelta
+
 from app import db
 from app.models.client import Client
 from app.models.project import Project
-from app.models.task import Task, TimeEntry
+from app.models.search import matching_comments, ranked_documents
+from app.models.task import ChecklistItem, Comment, Task, TimeRollupDaily, TimeRollupMonthly
 from app.models.user import User
-from app.utils import get_utc_now
+from app.utils import get_utc_now, hot_queries, parse_iso_date
+from app.utils.decorators import read_only_db
 from app.utils.release_notes import get_release_notes
-from app.utils.route_utils import get_accessible_clients
-from flask import Blueprint, current_app, redirect, render_template, url_for
+from app.utils.route_utils import get_accessible_clients, get_accessible_projects
+from app.utils.sql_compat import truncate_date
+from flask import Blueprint, abort, current_app, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy import func
 
@@ -19,6 +24,9 @@ def get_dashboard_stats():
     credit_threshold_minutes = current_app.config["CREDIT_THRESHOLD"] * 60
     today = get_utc_now().date()
 
+    def scalar(statement):
+        return db.session.execute(statement).scalar() or 0
+
     if current_user.is_client():
         # Pour les clients, montrer uniquement les données de leurs clients associés
         clients_query = get_accessible_clients()
@@ -27,30 +35,10 @@ def get_dashboard_stats():
         # Optimisation : requêtes séparées pour éviter les JOINs complexes
         try:
             # Requêtes séparées pour de meilleures performances
-            total_clients = db.session.query(func.count(Client.id)).filter(Client.id.in_(client_ids)).scalar() or 0
-
-            total_projects = (
-                db.session.query(func.count(Project.id)).filter(Project.client_id.in_(client_ids)).scalar() or 0
-            )
-
-            total_tasks = (
-                db.session.query(func.count(Task.id))
-                .join(Project)
-                .filter(
-                    Project.client_id.in_(client_ids), db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today)
-                )
-                .scalar()
-                or 0
-            )
-
-            total_time = (
-                db.session.query(func.sum(TimeEntry.minutes))
-                .join(Task)
-                .join(Project)
-                .filter(Project.client_id.in_(client_ids))
-                .scalar()
-                or 0
-            )
+            total_clients = scalar(hot_queries.count_clients(client_ids))
+            total_projects = scalar(hot_queries.count_projects(client_ids))
+            total_tasks = scalar(hot_queries.count_visible_tasks(today, client_ids=client_ids))
+            total_time = scalar(hot_queries.total_minutes(client_ids))
 
             stats = type(
                 "Stats",
@@ -68,57 +56,20 @@ def get_dashboard_stats():
             stats = type("Stats", (), {"total_clients": 0, "total_projects": 0, "total_tasks": 0, "total_time": 0})()
 
         # Requête séparée pour les projets en crédit faible
-        projects_low_credit = (
-            db.session.query(func.count(Project.id))
-            .filter(
-                Project.client_id.in_(client_ids),
-                Project.remaining_credit < credit_threshold_minutes,
-                Project.remaining_credit > 0,
-            )
-            .scalar()
-            or 0
-        )
+        projects_low_credit = scalar(hot_queries.count_low_credit_projects(credit_threshold_minutes, client_ids))
 
         # Requête séparée pour les tâches par statut
-        tasks_todo = (
-            db.session.query(func.count(Task.id))
-            .join(Project)
-            .filter(
-                Project.client_id.in_(client_ids),
-                Task.status == "à faire",
-                db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today),
-            )
-            .scalar()
-            or 0
-        )
-
-        tasks_in_progress = (
-            db.session.query(func.count(Task.id))
-            .join(Project)
-            .filter(
-                Project.client_id.in_(client_ids),
-                Task.status == "en cours",
-                db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today),
-            )
-            .scalar()
-            or 0
-        )
+        tasks_todo = scalar(hot_queries.count_visible_tasks(today, "à faire", client_ids))
+        tasks_in_progress = scalar(hot_queries.count_visible_tasks(today, "en cours", client_ids))
 
         # S'assurer que les valeurs ne sont pas None
         if stats is None:
             stats = type("Stats", (), {"total_clients": 0, "total_projects": 0, "total_tasks": 0, "total_time": 0})()
 
         # Récupérer les projets avec crédit faible
-        low_credit_projects = (
-            Project.query.filter(
-                Project.client_id.in_(client_ids),
-                Project.remaining_credit < credit_threshold_minutes,
-                Project.remaining_credit > 0,
-            )
-            .order_by(Project.remaining_credit)
-            .limit(5)
-            .all()
-        )
+        low_credit_projects = db.session.scalars(
+            hot_queries.low_credit_projects(credit_threshold_minutes, client_ids)
+        ).all()
 
         return {
             "total_clients": stats.total_clients or 0,
@@ -134,14 +85,9 @@ def get_dashboard_stats():
         # Pour les admins et techniciens - requêtes séparées optimisées
         try:
             # Requêtes séparées pour de meilleures performances
-            total_clients = db.session.query(func.count(Client.id)).scalar() or 0
-            total_projects = db.session.query(func.count(Project.id)).scalar() or 0
-            total_tasks = (
-                db.session.query(func.count(Task.id))
-                .filter(db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
-                .scalar()
-                or 0
-            )
+            total_clients = scalar(hot_queries.count_clients())
+            total_projects = scalar(hot_queries.count_projects())
+            total_tasks = scalar(hot_queries.count_visible_tasks(today))
 
             stats = type(
                 "Stats",
@@ -154,66 +100,22 @@ def get_dashboard_stats():
             stats = type("Stats", (), {"total_clients": 0, "total_projects": 0, "total_tasks": 0})()
 
         # Requête séparée pour les projets en crédit faible
-        projects_low_credit = (
-            db.session.query(func.count(Project.id))
-            .filter(Project.remaining_credit < credit_threshold_minutes, Project.remaining_credit > 0)
-            .scalar()
-            or 0
-        )
+        projects_low_credit = scalar(hot_queries.count_low_credit_projects(credit_threshold_minutes))
 
         # Requêtes séparées pour les tâches par statut
-        tasks_todo = (
-            db.session.query(func.count(Task.id))
-            .filter(Task.status == "à faire", db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
-            .scalar()
-            or 0
-        )
-
-        tasks_in_progress = (
-            db.session.query(func.count(Task.id))
-            .filter(Task.status == "en cours", db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
-            .scalar()
-            or 0
-        )
-
-        tasks_done = (
-            db.session.query(func.count(Task.id))
-            .filter(Task.status == "terminé", db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
-            .scalar()
-            or 0
-        )
+        tasks_todo = scalar(hot_queries.count_visible_tasks(today, "à faire"))
+        tasks_in_progress = scalar(hot_queries.count_visible_tasks(today, "en cours"))
+        tasks_done = scalar(hot_queries.count_visible_tasks(today, "terminé"))
 
         # S'assurer que les valeurs ne sont pas None
         if stats is None:
             stats = type("Stats", (), {"total_clients": 0, "total_projects": 0, "total_tasks": 0})()
 
         # Requêtes séparées pour les données détaillées (limitées)
-        low_credit_projects = (
-            Project.query.filter(Project.remaining_credit < credit_threshold_minutes, Project.remaining_credit > 0)
-            .order_by(Project.remaining_credit)
-            .limit(5)
-            .all()
-        )
-
-        urgent_tasks = (
-            Task.query.filter(
-                Task.priority == "urgente",
-                Task.status == "à faire",
-                db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today),
-            )
-            .limit(10)
-            .all()
-        )
-        my_tasks = (
-            Task.query.filter(
-                Task.user_id == current_user.id,
-                Task.status == "en cours",
-                db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today),
-            )
-            .limit(10)
-            .all()
-        )
-        recent_time_entries = TimeEntry.query.order_by(TimeEntry.created_at.desc()).limit(10).all()
+        low_credit_projects = db.session.scalars(hot_queries.low_credit_projects(credit_threshold_minutes)).all()
+        urgent_tasks = db.session.scalars(hot_queries.urgent_tasks(today)).all()
+        my_tasks = db.session.scalars(hot_queries.user_tasks_in_progress(current_user.id, today)).all()
+        recent_time_entries = db.session.scalars(hot_queries.recent_time_entries()).all()
 
         return {
             "total_clients": stats.total_clients or 0,
@@ -240,6 +142,7 @@ def index():
 
 @main.route("/dashboard")
 @login_required
+@read_only_db
 def dashboard():
     """Tableau de bord principal"""
     stats = get_dashboard_stats()
@@ -248,45 +151,176 @@ def dashboard():
 
 @main.route("/reports")
 @login_required
+@read_only_db
 def reports():
-    """Page des rapports"""
+    """Page des rapports (lue depuis les cumuls quotidiens time_rollup_daily)"""
+    start_date = parse_iso_date(request.args.get("start"))
+    end_date = parse_iso_date(request.args.get("end"))
+    project_id = request.args.get("project_id", type=int)
+    user_id = request.args.get("user_id", type=int)
+
+    # Filtres affichés avec leur nom : un client ne peut viser que ses projets et les utilisateurs
+    # ayant saisi du temps sur ceux-ci
+    selected_project = get_accessible_projects().filter(Project.id == project_id).first() if project_id else None
+    selected_user = None
+    if user_id:
+        users = User.query.filter(User.id == user_id)
+        if current_user.is_client():
+            accessible_ids = get_accessible_projects().with_entities(Project.id).scalar_subquery()
+            users = users.filter(
+                User.id.in_(
+                    db.session.query(TimeRollupDaily.user_id).filter(TimeRollupDaily.project_id.in_(accessible_ids))
+                )
+            )
+        selected_user = users.first()
+    if (project_id and selected_project is None) or (user_id and selected_user is None):
+        abort(404)
+
+    # Mois entiers (ou aucune borne) : cumuls mensuels, bien plus compacts ; sinon cumuls quotidiens
+    if _covers_whole_months(start_date, end_date):
+        rollup, period = TimeRollupMonthly, TimeRollupMonthly.month
+        bounds = (start_date and start_date.strftime("%Y-%m"), end_date and end_date.strftime("%Y-%m"))
+        month = TimeRollupMonthly.month.label("month")
+    else:
+        rollup, period = TimeRollupDaily, TimeRollupDaily.day
+        bounds = (start_date, end_date)
+        month = truncate_date(TimeRollupDaily.day, "month").label("month")
+
+    def scoped(query):
+        """Applique période, exploration (projet/utilisateur) et périmètre d'accès"""
+        if bounds[0]:
+            query = query.filter(period >= bounds[0])
+        if bounds[1]:
+            query = query.filter(period <= bounds[1])
+        if project_id:
+            query = query.filter(rollup.project_id == project_id)
+        if user_id:
+            query = query.filter(rollup.user_id == user_id)
+        if current_user.is_client():
+            accessible_ids = get_accessible_projects().with_entities(Project.id).scalar_subquery()
+            query = query.filter(rollup.project_id.in_(accessible_ids))
+        return query
+
+    total_minutes = func.sum(rollup.minutes).label("total_minutes")
+
     # Temps total enregistré par projet
     project_times = (
-        db.session.query(Project.name, func.sum(TimeEntry.minutes / 60.0).label("total_hours"))
-        .join(Task, Task.project_id == Project.id)
-        .join(TimeEntry, TimeEntry.task_id == Task.id)
-        .group_by(Project.name)
+        scoped(db.session.query(Project.id, Project.name, total_minutes))
+        .join(Project, Project.id == rollup.project_id)
+        .group_by(Project.id, Project.name)
+        .order_by(total_minutes.desc())
         .all()
     )
 
     # Temps enregistré par utilisateur
     user_times = (
-        db.session.query(User.name, func.sum(TimeEntry.minutes / 60.0).label("total_hours"))
-        .join(TimeEntry, TimeEntry.user_id == User.id)
-        .group_by(User.name)
+        scoped(db.session.query(User.id, User.name, total_minutes))
+        .join(User, User.id == rollup.user_id)
+        .group_by(User.id, User.name)
+        .order_by(total_minutes.desc())
         .all()
     )
 
     # Temps enregistré par mois
-    monthly_times = (
-        db.session.query(
-            func.strftime("%Y-%m", TimeEntry.created_at).label("month"),
-            func.sum(TimeEntry.minutes / 60.0).label("total_hours"),
-        )
-        .group_by("month")
-        .order_by("month")
-        .all()
-    )
+    monthly_times = scoped(db.session.query(month, total_minutes)).group_by(month).order_by(month).all()
 
     return render_template(
         "reports.html",
         project_times=project_times,
         user_times=user_times,
         monthly_times=monthly_times,
+        start_date=start_date,
+        end_date=end_date,
+        selected_project=selected_project,
+        selected_user=selected_user,
         title="Rapports",
     )
 
 
+def _covers_whole_months(start_date, end_date):
+    """Vrai si la période commence un 1er et finit un dernier jour de mois (bornes absentes acceptées)"""
+    starts_on_month = start_date is None or start_date.day == 1
+    ends_on_month = end_date is None or (end_date + timedelta(days=1)).day == 1
+    return starts_on_month and ends_on_month
+
+
+# Nombre de résultats par page de la recherche globale
+SEARCH_PER_PAGE = 20
+# Commentaires affichés (les plus récents) en première page de la recherche globale
+SEARCH_COMMENTS_LIMIT = 10
+
+
+@main.route("/search")
+@login_required
+@read_only_db
+def search():
+    """Recherche globale (tâches, checklists, projets, clients), classée par pertinence et paginée.
+
+    Les commentaires, chiffrés, sont trouvés par leur index aveugle (mots entiers) et listés à part.
+    """
+    q = request.args.get("q", "").strip()
+    page = request.args.get("page", 1, type=int)
+
+    client_ids = [client.id for client in current_user.clients] if current_user.is_client() else None
+    documents = ranked_documents(q, client_ids=client_ids)
+    pagination = None
+    results = []
+    if documents is not None:
+        pagination = db.paginate(documents, page=page, per_page=SEARCH_PER_PAGE, error_out=False)
+        results = _search_results(pagination.items)
+
+    comments = []
+    comment_ids = matching_comments(q)
+    if comment_ids is not None and page == 1:
+        query = Comment.query.join(Task).join(Project).filter(Comment.id.in_(comment_ids))
+        if client_ids is not None:
+            query = query.filter(Project.client_id.in_(client_ids))
+        comments = query.order_by(Comment.created_at.desc()).limit(SEARCH_COMMENTS_LIMIT).all()
+
+    return render_template(
+        "search.html", q=q, results=results, pagination=pagination, comments=comments, title="Recherche"
+    )
+
+
+def _search_results(documents):
+    """Charge les entités d'une page de résultats (une requête par type) dans l'ordre de pertinence"""
+    ids_by_type = {}
+    for document in documents:
+        ids_by_type.setdefault(document.entity_type, set()).add(document.entity_id)
+    task_ids = {document.task_id for document in documents if document.task_id is not None}
+
+    def load(model, ids):
+        return {obj.id: obj for obj in model.query.filter(model.id.in_(ids))} if ids else {}
+
+    clients = load(Client, ids_by_type.get("client"))
+    projects = load(Project, ids_by_type.get("project"))
+    tasks = load(Task, task_ids)
+    items = load(ChecklistItem, ids_by_type.get("checklist_item"))
+
+    results = []
+    for document in documents:
+        if document.entity_type == "client" and document.entity_id in clients:
+            client = clients[document.entity_id]
+            url = url_for("clients.client_details", slug_or_id=client.slug)
+            results.append({"kind": "Client", "icon": "building", "title": client.name, "context": "", "url": url})
+        elif document.entity_type == "project" and document.entity_id in projects:
+            project = projects[document.entity_id]
+            url = url_for("projects.project_details", slug_or_id=project.slug)
+            results.append(
+                {"kind": "Projet", "icon": "folder", "title": project.name, "context": project.client.name, "url": url}
+            )
+        elif document.task_id in tasks:
+            task = tasks[document.task_id]
+            url = url_for("tasks.task_details", slug_or_id=task.slug)
+            if document.entity_type == "checklist_item" and document.entity_id in items:
+                title, kind, icon = items[document.entity_id].content, "Checklist", "check-square"
+            else:
+                title, kind, icon = task.title, "Tâche", "tasks"
+            context = task.title if kind == "Checklist" else task.project.name
+            results.append({"kind": kind, "icon": icon, "title": title, "context": context, "url": url})
+    return results
+
+
 @main.route("/version")
 def version_info():
     """Page d'information sur la version et les notes de mise à jour (accessible à tous)."""
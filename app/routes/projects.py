@@ -4,9 +4,10 @@ from app import db
 from app.forms.project import AddCreditForm, DeleteProjectForm, ProjectForm
 from app.models.client import Client
 from app.models.project import CreditLog, Project
-from app.models.task import Task
-from app.utils import get_utc_now
-from app.utils.decorators import login_and_admin_required
+from app.models.task import Task, TaskAttachment
+from app.utils import cold_storage, get_utc_now
+from app.utils.decorators import conditional_get, login_and_admin_required, read_only_db
+from app.utils.hot_queries import project_next_occurrences, project_time_entries, project_visible_tasks
 from app.utils.route_utils import (
     apply_filters,
     apply_sorting,
@@ -18,13 +19,14 @@ from app.utils.route_utils import (
 )
 from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import and_, func, or_
+from sqlalchemy import func
 
 projects = Blueprint("projects", __name__)
 
 
 @projects.route("/projects")
 @login_required
+@read_only_db
 def list_projects():
     page = request.args.get("page", 1, type=int)
     per_page = 10
@@ -55,7 +57,7 @@ def list_projects():
         today = get_utc_now().date()
         last_activity_subquery = (
             db.session.query(Task.project_id, func.max(Task.updated_at).label("last_activity"))
-            .filter(or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
+            .filter(Task.visible_on(today))
             .group_by(Task.project_id)
             .subquery()
         )
@@ -92,9 +94,7 @@ def list_projects():
     for project in projects.items:
         # Déterminer la dernière activité du projet
         last_activity = None
-        visible_tasks = [
-            t for t in project.tasks if (not t.is_archived) and (t.scheduled_for is None or t.scheduled_for <= today)
-        ]
+        visible_tasks = [t for t in project.tasks if (not t.is_archived) and t.is_visible_on(today)]
 
         project.visible_tasks_total = len(visible_tasks)
         project.visible_tasks_todo = sum(1 for t in visible_tasks if t.status == "à faire")
@@ -169,10 +169,45 @@ def new_project(client_id):
     return render_template("projects/project_form.html", form=form, client=client, title="Nouveau projet")
 
 
+def _project_details_stamp(slug_or_id):
+    """Empreinte du kanban projet : projet, tâches, temps passé, crédits et pièces jointes (une requête)"""
+    from app.models.task import TimeEntry
+
+    project = get_project_by_slug_or_id(slug_or_id)
+    task_ids = db.select(Task.id).where(Task.project_id == project.id)
+    counters = db.session.execute(
+        db.select(
+            *(
+                query.scalar_subquery()
+                for query in (
+                    db.select(Client.name).where(Client.id == project.client_id),
+                    db.select(func.count(Task.id)).where(Task.project_id == project.id),
+                    db.select(func.max(Task.updated_at)).where(Task.project_id == project.id),
+                    db.select(func.count(TimeEntry.id)).where(TimeEntry.task_id.in_(task_ids)),
+                    db.select(func.max(TimeEntry.id)).where(TimeEntry.task_id.in_(task_ids)),
+                    db.select(func.max(CreditLog.id)).where(CreditLog.project_id == project.id),
+                    db.select(func.count(TaskAttachment.id)).where(TaskAttachment.task_id.in_(task_ids)),
+                    db.select(func.max(TaskAttachment.id)).where(TaskAttachment.task_id.in_(task_ids)),
+                )
+            )
+        )
+    ).one()
+    return (
+        project.id,
+        project.name,
+        project.description,
+        project.remaining_credit,
+        project.time_tracking_enabled,
+        project.is_favorite,
+        *counters,
+    )
+
+
 @projects.route("/projects/<slug_or_id>")
 @login_required
+@conditional_get(_project_details_stamp)
 def project_details(slug_or_id):
-    from app.models.task import Task, TimeEntry
+    from app.models.task import Task
 
     project = get_project_by_slug_or_id(slug_or_id)
     form = DeleteProjectForm()
@@ -181,39 +216,8 @@ def project_details(slug_or_id):
 
     # Inclure toutes les tâches "visibles" (scheduled_for <= aujourd'hui),
     # + uniquement LA prochaine occurrence future par série (pour afficher "à venir" dans À faire).
-    visible_tasks = Task.query.filter(
-        Task.project_id == project.id,
-        db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today),
-    ).all()
-
-    next_subq = (
-        db.session.query(
-            Task.recurrence_series_id.label("sid"),
-            func.min(Task.scheduled_for).label("next_date"),
-        )
-        .filter(
-            Task.project_id == project.id,
-            Task.is_archived == False,
-            Task.recurrence_series_id.isnot(None),
-            Task.scheduled_for.isnot(None),
-            Task.scheduled_for > today,
-            Task.status == "à faire",
-        )
-        .group_by(Task.recurrence_series_id)
-        .subquery()
-    )
-
-    upcoming_next_tasks = (
-        db.session.query(Task)
-        .join(
-            next_subq,
-            and_(
-                Task.recurrence_series_id == next_subq.c.sid,
-                Task.scheduled_for == next_subq.c.next_date,
-            ),
-        )
-        .all()
-    )
+    visible_tasks = db.session.scalars(project_visible_tasks(project.id, today)).all()
+    upcoming_next_tasks = db.session.scalars(project_next_occurrences(project.id, today)).all()
 
     tasks = visible_tasks + upcoming_next_tasks
 
@@ -255,7 +259,7 @@ def project_details(slug_or_id):
         )
 
     # Ajouter les temps consommés
-    time_entries = db.session.query(TimeEntry).join(Task).filter(Task.project_id == project.id).all()
+    time_entries = db.session.scalars(project_time_entries(project.id)).all()
 
     for entry in time_entries:
         history_items.append(
@@ -282,6 +286,7 @@ def project_details(slug_or_id):
         tasks_todo=tasks_todo,
         tasks_in_progress=tasks_in_progress,
         tasks_done=tasks_done,
+        attachment_counts=TaskAttachment.counts_for(task.id for task in tasks),
         history_items=history_items_preview,
         history_items_total=history_items_total,
         form=form,
@@ -293,7 +298,6 @@ def project_details(slug_or_id):
 @login_required
 def project_history(slug_or_id):
     """Affiche l'historique complet des crédits et débits d'un projet"""
-    from app.models.task import Task, TimeEntry
 
     project = get_project_by_slug_or_id(slug_or_id)
 
@@ -318,7 +322,7 @@ def project_history(slug_or_id):
         )
 
     # Ajouter les temps consommés
-    time_entries = db.session.query(TimeEntry).join(Task).filter(Task.project_id == project.id).all()
+    time_entries = db.session.scalars(project_time_entries(project.id)).all()
 
     for entry in time_entries:
         history_items.append(
@@ -447,6 +451,7 @@ def add_credit(slug_or_id):
 @login_and_admin_required
 def delete_project(slug_or_id):
     project = get_project_by_slug_or_id(slug_or_id)
+    cold_storage.purge_projects([project.id])
     delete_from_db(project)
     flash(f'Projet "{project.name}" supprimé!', "success")
     return redirect(url_for("projects.list_projects"))
@@ -1,21 +1,39 @@
 import json
-from datetime import UTC, datetime, timedelta
+from datetime import UTC, datetime
 
 from app import db
 from app.forms.task import CommentForm, DeleteTaskForm, EditCommentForm, TaskForm, TimeEntryForm
 from app.models.project import Project
-from app.models.task import ChecklistItem, Comment, Task, TaskRecurrenceSeries, TimeEntry, UserPinnedTask
+from app.models.search import index_checklist_items, task_search_filter
+from app.models.task import (
+    ChecklistItem,
+    Comment,
+    Task,
+    TaskAttachment,
+    TaskRecurrenceSeries,
+    TimeEntry,
+    UserPinnedTask,
+)
 from app.models.user import User
 from app.utils import get_utc_now
 from app.utils import task_attachments as attachments_util
-from app.utils.decorators import login_and_client_required
+from app.utils.cold_storage import archived_tasks_query
+from app.utils.decorators import conditional_get, login_and_client_required, read_only_db
+from app.utils.hot_queries import (
+    task_checklist_items,
+    task_root_comments,
+    task_time_entries,
+    user_next_occurrences,
+    user_visible_tasks,
+)
+from app.utils.recurrence import delete_future_instances, enqueue_materialization, job_progress, notify_worker
 from app.utils.route_utils import (
     delete_from_db,
     get_project_by_slug_or_id,
     get_task_by_slug_or_id,
     save_to_db,
 )
-from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, send_file, url_for
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy import func
 from werkzeug.exceptions import BadRequest
@@ -25,64 +43,6 @@ def _today_utc_date():
     return get_utc_now().date()
 
 
-def _delete_future_recurrence_instances(series_id: int, keep_task_id: int | None = None):
-    """
-    Supprime les occurrences futures (planifiées dans le futur) d'une série.
-    On reste conservateur: on ne supprime que les tâches "à faire" sans temps passé.
-    """
-    today = _today_utc_date()
-    q = Task.query.filter(
-        Task.recurrence_series_id == series_id,
-        Task.scheduled_for.isnot(None),
-        Task.scheduled_for > today,
-        Task.status == "à faire",
-        Task.is_archived == False,
-    )
-    if keep_task_id:
-        q = q.filter(Task.id != keep_task_id)
-
-    tasks_to_delete = q.all()
-    for t in tasks_to_delete:
-        if t.time_entries:
-            # sécurité: ne pas supprimer si du temps a été enregistré
-            continue
-        db.session.delete(t)
-
-
-def _ensure_recurrence_instances(template_task: Task, series: TaskRecurrenceSeries, horizon_days: int = 180):
-    """
-    Matérialise les occurrences futures (jusqu'à horizon_days) pour une tâche récurrente.
-    Idempotent grâce au couple (recurrence_series_id, scheduled_for) unique en base.
-    """
-    today = _today_utc_date()
-    horizon_end = today + timedelta(days=horizon_days)
-
-    # S'assurer que la tâche "template" est correctement attachée
-    template_task.recurrence_series_id = series.id
-    if template_task.scheduled_for is None:
-        template_task.scheduled_for = series.start_date
-
-    existing_dates = {
-        d[0]
-        for d in db.session.query(Task.scheduled_for)
-        .filter(
-            Task.recurrence_series_id == series.id,
-            Task.scheduled_for.isnot(None),
-            Task.scheduled_for <= horizon_end,
-        )
-        .all()
-    }
-
-    # Créer uniquement les occurrences >= aujourd'hui
-    for d in series.iter_dates(horizon_end):
-        if d < today:
-            continue
-        if d in existing_dates:
-            continue
-        cloned = template_task.clone_for_recurrence(scheduled_for=d, clone_checklist_items=True)
-        db.session.add(cloned)
-
-
 def _recurrence_payload(series: TaskRecurrenceSeries | None):
     if not series:
         return None
@@ -146,7 +106,7 @@ def list_tasks():
     # NOTE: on continue de masquer les tâches planifiées dans le futur sur la liste globale,
     # pour éviter du bruit. L'affichage "à venir" est géré sur les vues Kanban (projet / mes tâches).
     today = get_utc_now().date()
-    query = query.filter(db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
+    query = query.filter(Task.visible_on(today))
 
     # Filtres
     if status:
@@ -158,7 +118,7 @@ def list_tasks():
     if user_id:
         query = query.filter(Task.user_id == user_id)
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
+        query = query.filter(task_search_filter(search))
 
     # Tri par défaut : date de création décroissante
     query = query.order_by(Task.created_at.desc())
@@ -267,13 +227,14 @@ def new_task(slug_or_id):
                 template_task_id=task.id,
             )
             db.session.add(series)
-            db.session.commit()
+            db.session.flush()
 
+            # Seule la première occurrence (cette tâche) est créée ici, les suivantes en tâche de fond
             task.recurrence_series_id = series.id
             task.scheduled_for = start_date
-            _delete_future_recurrence_instances(series.id, keep_task_id=task.id)
-            _ensure_recurrence_instances(task, series, horizon_days=180)
+            enqueue_materialization(series)
             db.session.commit()
+            notify_worker()
             current_app.logger.info(f"Récurrence créée pour la tâche {task.id}: {series.frequency}")
         else:
             # Tâche non récurrente: pas de scheduled_for pour éviter de la masquer un jour
@@ -306,10 +267,10 @@ def task_details(slug_or_id):
             flash("Vous n'avez pas accès à cette tâche.", "danger")
             return redirect(url_for("main.dashboard"))
 
-    time_entries = TimeEntry.query.filter_by(task_id=task.id).order_by(TimeEntry.created_at.desc()).all()
+    time_entries = db.session.scalars(task_time_entries(task.id)).all()
 
     # Récupérer les commentaires liés à cette tâche (sans les réponses)
-    comments = Comment.query.filter_by(task_id=task.id, parent_id=None).order_by(Comment.created_at.desc()).all()
+    comments = db.session.scalars(task_root_comments(task.id)).all()
 
     # Formulaire pour ajouter du temps
     time_form = TimeEntryForm()
@@ -391,16 +352,11 @@ def upload_task_attachments(slug_or_id):
         flash("Aucun fichier sélectionné.", "warning")
         return redirect(url_for("tasks.task_details", slug_or_id=task.slug))
 
-    saved = []
-    errors = []
-    for f in uploaded:
-        if not f or not f.filename:
-            continue
-        try:
-            meta = attachments_util.save_attachment(task.id, f.stream, f.filename)
-            saved.append(meta)
-        except ValueError as e:
-            errors.append(f"{f.filename}: {e}")
+    # Fichiers déjà reçus, hachés et validés pendant l'analyse de la requête (StreamingUploadRequest)
+    saved, rejected = attachments_util.save_attachments(
+        task.id, [(f.filename, f.stream) for f in uploaded if f and f.filename]
+    )
+    errors = [f"{filename}: {error}" for filename, error in rejected]
 
     if errors and not saved:
         if request.is_json or request.headers.get("X-Requested-With") == "XMLHttpRequest":
@@ -436,17 +392,10 @@ def download_task_attachment(slug_or_id, file_id):
     if not _check_task_access_for_attachments(task):
         return jsonify({"error": "Accès non autorisé"}), 403
 
-    result = attachments_util.get_attachment_path_and_name(task.id, file_id)
-    if not result:
+    response = attachments_util.send_attachment(task.id, file_id)
+    if response is None:
         return jsonify({"error": "Fichier introuvable"}), 404
-
-    path, display_name = result
-    return send_file(
-        path,
-        as_attachment=True,
-        download_name=display_name,
-        mimetype="application/octet-stream",
-    )
+    return response
 
 
 @tasks.route("/tasks/<slug_or_id>/attachments/<file_id>", methods=["DELETE", "POST"])
@@ -484,6 +433,7 @@ def get_task_recurrence(slug_or_id):
             "recurrence": _recurrence_payload(task.recurrence_series),
             "summary": info["summary"],
             "next_date": info["next_date"],
+            "materialization": job_progress(task.recurrence_series_id) if task.recurrence_series_id else None,
         }
     )
 
@@ -555,7 +505,7 @@ def upsert_task_recurrence(slug_or_id):
             template_task_id=task.id, start_date=start_date, frequency=frequency, interval=interval
         )
         db.session.add(series)
-        db.session.commit()
+        db.session.flush()
         task.recurrence_series_id = series.id
         template_task = task
 
@@ -574,11 +524,11 @@ def upsert_task_recurrence(slug_or_id):
         template_task.recurrence_series_id = series.id
         template_task.scheduled_for = start_date
 
-        # En cas de changement: supprimer/recréer les occurrences futures
-        _delete_future_recurrence_instances(series.id, keep_task_id=template_task.id)
-        _ensure_recurrence_instances(template_task, series, horizon_days=180)
+        # En cas de changement: supprimer/recréer les occurrences futures (en tâche de fond)
+        enqueue_materialization(series, replace=True)
 
         db.session.commit()
+        notify_worker()
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erreur upsert récurrence: {e}")
@@ -593,6 +543,7 @@ def upsert_task_recurrence(slug_or_id):
             "recurrence": _recurrence_payload(task.recurrence_series),
             "summary": info["summary"],
             "next_date": info["next_date"],
+            "materialization": job_progress(series.id),
         }
     )
 
@@ -607,7 +558,7 @@ def delete_task_recurrence(slug_or_id):
 
     try:
         # Supprimer les occurrences futures, puis détacher la série des tâches restantes
-        _delete_future_recurrence_instances(series.id, keep_task_id=series.template_task_id)
+        delete_future_instances(series.id, keep_task_id=series.template_task_id)
 
         remaining_tasks = Task.query.filter(Task.recurrence_series_id == series.id).all()
         for t in remaining_tasks:
@@ -654,64 +605,72 @@ def sync_recurrence_checklist_to_future(slug_or_id):
 
     template_task = Task.query.get(series.template_task_id) or task
 
-    # S'assurer que les occurrences futures existent (horizon glissant)
-    try:
-        _ensure_recurrence_instances(template_task, series, horizon_days=180)
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+    # Occurrences manquantes (horizon glissant) créées en tâche de fond, avec la checklist de référence
+    enqueue_materialization(series)
+    db.session.commit()
+    notify_worker()
 
-    source_items = (
-        ChecklistItem.query.filter(ChecklistItem.task_id == template_task.id)
+    source_contents = []
+    for (content,) in db.session.execute(
+        db.select(ChecklistItem.content)
+        .where(ChecklistItem.task_id == template_task.id)
         .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-        .all()
-    )
+    ):
+        content = (content or "").strip()
+        if content and content not in source_contents:
+            source_contents.append(content)
 
-    if not source_items:
+    if not source_contents:
         return jsonify({"success": True, "message": "Checklist de référence vide: rien à appliquer."})
 
-    targets = Task.query.filter(
-        Task.recurrence_series_id == series.id,
-        Task.is_archived == False,
-        Task.status == "à faire",
-        Task.scheduled_for.isnot(None),
-        Task.scheduled_for > today,
+    # Requêtes ensemblistes (nombre constant quel que soit l'horizon) : occurrences cibles avec un
+    # indicateur "temps enregistré", contenus existants de leurs checklists, puis insertion groupée
+    has_time_entries = db.exists().where(TimeEntry.task_id == Task.id)
+    targets = db.session.execute(
+        db.select(Task.id, has_time_entries.label("has_time_entries")).where(
+            Task.recurrence_series_id == series.id,
+            Task.is_archived == False,
+            Task.status == "à faire",
+            Task.scheduled_for.isnot(None),
+            Task.scheduled_for > today,
+        )
     ).all()
 
-    updated_tasks = 0
-    skipped_time_logged = 0
-    added_items_total = 0
-
-    for t in targets:
-        # Sécurité: ne pas toucher aux occurrences sur lesquelles du temps a été enregistré
-        if t.time_entries:
-            skipped_time_logged += 1
-            continue
+    # Sécurité: ne pas toucher aux occurrences sur lesquelles du temps a été enregistré
+    eligible_ids = [t.id for t in targets if not t.has_time_entries]
+    skipped_time_logged = len(targets) - len(eligible_ids)
 
-        existing_items = (
-            ChecklistItem.query.filter(ChecklistItem.task_id == t.id)
-            .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-            .all()
+    existing_contents = {task_id: set() for task_id in eligible_ids}
+    max_positions = dict.fromkeys(eligible_ids, -1)
+    if eligible_ids:
+        existing = db.session.execute(
+            db.select(ChecklistItem.task_id, ChecklistItem.content, ChecklistItem.position).where(
+                ChecklistItem.task_id.in_(eligible_ids)
+            )
         )
-
-        existing_contents = {(i.content or "").strip() for i in existing_items}
-        max_pos = max([i.position for i in existing_items], default=-1)
-
-        added_here = 0
-        for src in source_items:
-            content = (src.content or "").strip()
-            if not content:
+        for task_id, content, position in existing:
+            existing_contents[task_id].add((content or "").strip())
+            max_positions[task_id] = max(max_positions[task_id], position or 0)
+
+    new_items = []
+    for task_id in eligible_ids:
+        position = max_positions[task_id]
+        for content in source_contents:
+            if content in existing_contents[task_id]:
                 continue
-            if content in existing_contents:
-                continue
-            max_pos += 1
-            db.session.add(ChecklistItem(content=content, is_checked=False, position=max_pos, task_id=t.id))
-            existing_contents.add(content)
-            added_here += 1
+            position += 1
+            new_items.append({"content": content, "is_checked": False, "position": position, "task_id": task_id})
+
+    updated_tasks = len({item["task_id"] for item in new_items})
+    added_items_total = len(new_items)
 
-        if added_here:
-            updated_tasks += 1
-            added_items_total += added_here
+    if new_items:
+        # Insertion groupée : les événements ORM ne sont pas déclenchés, l'index de recherche est mis à jour en lot
+        inserted = db.session.execute(
+            db.insert(ChecklistItem).returning(ChecklistItem.id, ChecklistItem.task_id, ChecklistItem.content),
+            new_items,
+        ).all()
+        index_checklist_items(inserted)
 
     db.session.commit()
 
@@ -983,7 +942,7 @@ def log_time(slug_or_id):
 @login_required
 def get_time_entries(slug_or_id):
     task = get_task_by_slug_or_id(slug_or_id)
-    time_entries = TimeEntry.query.filter_by(task_id=task.id).order_by(TimeEntry.created_at.desc()).all()
+    time_entries = db.session.scalars(task_time_entries(task.id)).all()
 
     return jsonify(
         {
@@ -1173,8 +1132,36 @@ def update_positions():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _my_tasks_stamp():
+    """Empreinte de la page Mes tâches : tâches assignées, leurs pièces jointes, projets et clients affichés"""
+    from app.models.client import Client
+
+    my_task_ids = db.select(Task.id).where(Task.user_id == current_user.id)
+    counters = db.session.execute(
+        db.select(
+            *(
+                query.scalar_subquery()
+                for query in (
+                    db.select(func.count(Task.id)).where(Task.user_id == current_user.id),
+                    db.select(func.max(Task.updated_at)).where(Task.user_id == current_user.id),
+                    db.select(func.count(TaskAttachment.id)).where(TaskAttachment.task_id.in_(my_task_ids)),
+                    db.select(func.max(TaskAttachment.id)).where(TaskAttachment.task_id.in_(my_task_ids)),
+                )
+            )
+        )
+    ).one()
+    # Noms affichés sur les cartes (projet, client) et dans le filtre des projets
+    names = db.session.execute(
+        db.select(Project.id, Project.name, Client.name)
+        .join(Client, Project.client_id == Client.id)
+        .order_by(Project.id)
+    ).all()
+    return (*counters, *(tuple(row) for row in names))
+
+
 @tasks.route("/my-tasks")
 @login_required
+@conditional_get(_my_tasks_stamp)
 def my_tasks():
     """Affiche les tâches assignées à l'utilisateur courant avec filtres"""
     # Récupération des paramètres de filtrage
@@ -1182,67 +1169,34 @@ def my_tasks():
     priority = request.args.get("priority")
     project_id = request.args.get("project_id", type=int)
     search = request.args.get("search")
-
-    # Construction de la requête de base (exclure les tâches archivées)
-    query = Task.query.filter_by(user_id=current_user.id, is_archived=False)
+    search_criteria = task_search_filter(search) if search else None
     today = get_utc_now().date()
 
-    # Filtres
-    if status:
-        query = query.filter(Task.status.in_(status))
-    if priority:
-        query = query.filter(Task.priority == priority)
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
-    if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
-
     # On veut:
-    # - toutes les tâches visibles (scheduled_for <= aujourd'hui)
+    # - toutes les tâches visibles (scheduled_for <= aujourd'hui), hors tâches archivées
     # - + uniquement la prochaine occurrence future par série (scheduled_for > aujourd'hui)
     #   pour pouvoir la montrer "à venir" dans À faire.
-
-    visible_query = query.filter(db.or_(Task.scheduled_for.is_(None), Task.scheduled_for <= today))
-    visible_query = visible_query.order_by(Task.position.asc(), Task.created_at.desc())
-    all_tasks = visible_query.all()
+    all_tasks = list(
+        db.session.scalars(
+            user_visible_tasks(
+                current_user.id,
+                today,
+                statuses=status,
+                priority=priority,
+                project_id=project_id,
+                search_criteria=search_criteria,
+            )
+        )
+    )
 
     include_upcoming = (not status) or ("à faire" in status)
     if include_upcoming:
-        # Sous-requête "prochaine date" par série
-        next_subq = (
-            db.session.query(
-                Task.recurrence_series_id.label("sid"),
-                func.min(Task.scheduled_for).label("next_date"),
-            )
-            .filter(
-                Task.user_id == current_user.id,
-                Task.is_archived == False,
-                Task.recurrence_series_id.isnot(None),
-                Task.scheduled_for.isnot(None),
-                Task.scheduled_for > today,
-                Task.status == "à faire",
+        # Filtres optionnels (priority/project/search) réappliqués sur la prochaine occurrence
+        upcoming_next_tasks = db.session.scalars(
+            user_next_occurrences(
+                current_user.id, today, priority=priority, project_id=project_id, search_criteria=search_criteria
             )
-            .group_by(Task.recurrence_series_id)
-            .subquery()
-        )
-
-        upcoming_next_q = db.session.query(Task).join(
-            next_subq,
-            db.and_(
-                Task.recurrence_series_id == next_subq.c.sid,
-                Task.scheduled_for == next_subq.c.next_date,
-            ),
-        )
-
-        # Réappliquer les filtres optionnels (priority/project/search) sur la prochaine occurrence
-        if priority:
-            upcoming_next_q = upcoming_next_q.filter(Task.priority == priority)
-        if project_id:
-            upcoming_next_q = upcoming_next_q.filter(Task.project_id == project_id)
-        if search:
-            upcoming_next_q = upcoming_next_q.filter(Task.title.ilike(f"%{search}%"))
-
-        upcoming_next_tasks = upcoming_next_q.all()
+        ).all()
         all_tasks.extend(upcoming_next_tasks)
 
     # Tri des tâches par statut et par position
@@ -1275,6 +1229,7 @@ def my_tasks():
         tasks_todo=tasks_todo,
         tasks_in_progress=tasks_in_progress,
         tasks_completed=tasks_completed,
+        attachment_counts=TaskAttachment.counts_for(task.id for task in all_tasks),
         projects=projects,
         query_params=query_params,
         filters_active=filters_active,
@@ -1283,6 +1238,7 @@ def my_tasks():
 
 @tasks.route("/archives")
 @login_required
+@read_only_db
 def archives():
     """Affiche les tâches archivées"""
     # Récupération des paramètres de filtrage
@@ -1291,17 +1247,8 @@ def archives():
     page = request.args.get("page", 1, type=int)
     per_page = 20
 
-    # Construction de la requête de base pour les tâches archivées
-    query = Task.query.filter_by(is_archived=True)
-
-    # Filtres
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
-    if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
-
-    # Tri par date d'archivage décroissante
-    query = query.order_by(Task.archived_at.desc())
+    # Tâches archivées (base principale et stockage froid), par date d'archivage décroissante
+    query = archived_tasks_query(project_id=project_id, search=search)
 
     # Pagination
     archived_tasks = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -1530,11 +1477,7 @@ def get_checklist(slug_or_id):
             return jsonify({"error": "Accès non autorisé"}), 403
 
     # Retourner la checklist complète
-    all_checklist_items = (
-        ChecklistItem.query.filter(ChecklistItem.task_id == task.id)
-        .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-        .all()
-    )
+    all_checklist_items = db.session.scalars(task_checklist_items(task.id)).all()
 
     checklist = [
         {"id": item.id, "content": item.content, "is_checked": item.is_checked, "position": item.position}
@@ -1570,11 +1513,7 @@ def add_checklist_item(slug_or_id):
     task.add_checklist_item(data["content"])
 
     # Retourner la checklist complète mise à jour, triée par position
-    all_checklist_items = (
-        ChecklistItem.query.filter(ChecklistItem.task_id == task.id)
-        .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-        .all()
-    )
+    all_checklist_items = db.session.scalars(task_checklist_items(task.id)).all()
 
     checklist = [
         {"id": item.id, "content": item.content, "is_checked": item.is_checked, "position": item.position}
@@ -1634,11 +1573,7 @@ def update_checklist_item(slug_or_id, item_id):
 
         # Retourner la checklist complète mise à jour, triée par position
         # Récupérer tous les éléments de la tâche triés par position
-        all_checklist_items = (
-            ChecklistItem.query.filter(ChecklistItem.task_id == task.id)
-            .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-            .all()
-        )
+        all_checklist_items = db.session.scalars(task_checklist_items(task.id)).all()
 
         checklist = [
             {"id": item.id, "content": item.content, "is_checked": item.is_checked, "position": item.position}
@@ -1680,11 +1615,7 @@ def delete_checklist_item(slug_or_id, item_id):
     db.session.commit()
 
     # Normaliser les positions pour éviter les doublons / gaps
-    remaining = (
-        ChecklistItem.query.filter(ChecklistItem.task_id == task.id)
-        .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-        .all()
-    )
+    remaining = db.session.scalars(task_checklist_items(task.id)).all()
     for pos, it in enumerate(remaining):
         it.position = pos
     db.session.commit()
@@ -1741,11 +1672,7 @@ def reorder_checklist(slug_or_id):
     db.session.commit()
 
     # Retourner la checklist complète mise à jour
-    all_checklist_items = (
-        ChecklistItem.query.filter(ChecklistItem.task_id == task.id)
-        .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
-        .all()
-    )
+    all_checklist_items = db.session.scalars(task_checklist_items(task.id)).all()
 
     checklist = [
         {"id": item.id, "content": item.content, "is_checked": item.is_checked, "position": item.position}
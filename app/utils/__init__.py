@@ -1,4 +1,4 @@
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
 
 from flask import flash
 
@@ -10,6 +10,16 @@ def get_utc_now():
     return datetime.now(UTC)
 
 
+def parse_iso_date(value):
+    """Convertit un paramètre AAAA-MM-JJ en date (None si absent ou invalide)"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
 def get_client_choices():
     """Retourne la liste des clients pour un SelectField."""
     from app.models.client import Client
@@ -0,0 +1,40 @@
+import hashlib
+import hmac
+import re
+
+from flask import current_app
+from unidecode import unidecode
+
+# Contexte de dérivation : la clé d'index aveugle n'est jamais la clé de chiffrement elle-même
+_KEY_CONTEXT = b"chronotrak:comment-blind-index:v1"
+
+# Longueur des jetons (hexadécimal) : 128 bits de HMAC-SHA256 suffisent pour un index sans collision utile
+TOKEN_LENGTH = 32
+
+# Les mots d'une lettre ne sont pas indexés (trop fréquents, peu discriminants)
+MIN_WORD_LENGTH = 2
+
+
+def blind_index_key():
+    """Clé HMAC de l'index aveugle : BLIND_INDEX_KEY, ou dérivée de ENCRYPTION_KEY ; None si aucune clé"""
+    secret = current_app.config.get("BLIND_INDEX_KEY") or current_app.config.get("ENCRYPTION_KEY")
+    if not secret:
+        return None
+    if isinstance(secret, str):
+        secret = secret.encode("utf-8")
+    return hmac.new(secret, _KEY_CONTEXT, hashlib.sha256).digest()
+
+
+def blind_index_fingerprint():
+    """Empreinte courte (non réversible) de la clé de l'index aveugle ; None si aucune clé"""
+    key = blind_index_key()
+    return hashlib.sha256(key).hexdigest()[:16] if key else None
+
+
+def blind_tokens(text):
+    """Jetons HMAC des mots distincts d'un texte (minuscules, sans accents) ; ensemble vide sans clé"""
+    key = blind_index_key()
+    if not key or not text:
+        return set()
+    words = {word for word in re.findall(r"[a-z0-9]+", unidecode(text.lower())) if len(word) >= MIN_WORD_LENGTH}
+    return {hmac.new(key, word.encode("utf-8"), hashlib.sha256).hexdigest()[:TOKEN_LENGTH] for word in words}
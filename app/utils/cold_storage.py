@@ -0,0 +1,390 @@
+"""
+Stockage froid des tâches archivées depuis longtemps (SQLite uniquement).
+
+Un second fichier SQLite (COLD_STORAGE_PATH) est attaché à chaque connexion (ATTACH ... AS cold).
+`flask cold-storage` y déplace, par lots, les tâches archivées depuis plus de COLD_STORAGE_AFTER_MONTHS
+mois avec leurs dépendances (checklist, commentaires et leurs jetons de recherche, temps, pièces jointes,
+épingles, documents de recherche) : la table task et ses index restent limités aux tâches vivantes.
+
+Les identifiants sont conservés : les références restées dans la base principale (credit_log,
+communication, task_recurrence_series) redeviennent valides quand la tâche est restaurée. Les tables
+déplacées sont en AUTOINCREMENT (compteur au-delà des id du stockage froid) : un id déplacé n'est jamais
+réattribué à une nouvelle ligne. Une restauration n'écrase rien (INSERT simple, conflit vérifié avant).
+Un déplacement écrit dans un fichier à la fois (copie validée, puis suppression de la source) : en WAL,
+le COMMIT d'une transaction sur deux fichiers attachés n'est pas atomique.
+  - la page des archives lit les deux bases (UNION ALL) ;
+  - get_task_by_slug_or_id restaure à la demande une tâche du stockage froid (détail, désarchivage) ;
+  - la suppression d'un projet ou d'un client supprime d'abord ses tâches du stockage froid (purge_projects).
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.project import Project
+from app.models.search import SearchDocument, search_terms, task_search_filter
+from app.models.task import (
+    AttachmentBlob,
+    ChecklistItem,
+    Comment,
+    Task,
+    TaskAttachment,
+    TaskRecurrenceSeries,
+    TimeEntry,
+)
+from app.utils.slug_utils import generate_slug
+
+COLD_SCHEMA = "cold"
+
+# Tables déplacées avec une tâche (parents d'abord) et sélection de leurs lignes pour un lot d'id de tâches
+COLD_TABLES = {
+    "task": "id IN ({ids})",
+    "checklist_item": "task_id IN ({ids})",
+    "comment": "task_id IN ({ids})",
+    "comment_search_token": "comment_id IN (SELECT id FROM {schema}.comment WHERE task_id IN ({ids}))",
+    "time_entry": "task_id IN ({ids})",
+    "task_attachment": "task_id IN ({ids})",
+    "user_pinned_task": "task_id IN ({ids})",
+    "search_document": "task_id IN ({ids})",
+}
+
+# Index du stockage froid (CREATE TABLE ... AS ne reprend ni clés primaires ni index)
+COLD_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_task_id ON task (id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_task_archived_at ON task (archived_at)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_checklist_item_id ON checklist_item (id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_checklist_item_task_id ON checklist_item (task_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_comment_id ON comment (id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_comment_task_id ON comment (task_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_comment_search_token ON comment_search_token (comment_id, token)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_time_entry_id ON time_entry (id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_time_entry_task_id ON time_entry (task_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_task_attachment_id ON task_attachment (id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_task_attachment_task_id ON task_attachment (task_id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_task_attachment_sha256 ON task_attachment (sha256)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_user_pinned_task ON user_pinned_task (user_id, task_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS cold.ux_search_document_id ON search_document (id)",
+    "CREATE INDEX IF NOT EXISTS cold.ix_search_document_task_id ON search_document (task_id)",
+)
+
+# Tables à clé entière id, déclarées avec sqlite_autoincrement sur les modèles (migration 9d2c4b7e1f30).
+# Sans AUTOINCREMENT, SQLite réattribue le plus grand id après sa suppression : l'id d'une ligne déplacée
+# ici irait à une nouvelle ligne, en conflit à la restauration. _reserve_ids place en plus les compteurs
+# au-delà des id du stockage froid.
+_ID_TABLES = tuple(
+    model.__tablename__ for model in (Task, ChecklistItem, Comment, TimeEntry, TaskAttachment, SearchDocument)
+)
+
+
+def enabled():
+    """Vrai si un stockage froid est configuré (base SQLite)"""
+    return bool(current_app.config.get("COLD_STORAGE_PATH")) and db.engine.dialect.name == "sqlite"
+
+
+def cold_table(model):
+    """Table du stockage froid d'un modèle (mêmes colonnes et types, schéma cold)"""
+    table = model.__table__
+    return sa.table(table.name, *(sa.column(column.name, column.type) for column in table.columns), schema=COLD_SCHEMA)
+
+
+def is_ready(connection=None):
+    """Vrai si le stockage froid est attaché et initialisé (au moins un passage de `flask cold-storage`)"""
+    if not enabled():
+        return False
+    statement = sa.text("SELECT 1 FROM cold.sqlite_master WHERE type = 'table' AND name = 'task'")
+    try:
+        return (connection or db.session).execute(statement).first() is not None
+    except OperationalError:
+        # Moteur de lecture : fichier froid absent, non attaché
+        return False
+
+
+def _columns(connection, schema, table):
+    return [row[1] for row in connection.exec_driver_sql(f"PRAGMA {schema}.table_info({table})")]
+
+
+def ensure_schema(connection):
+    """Crée les tables froides (copie de structure) et ajoute les colonnes apparues depuis dans la base principale.
+
+    Vérifie aussi que les tables déplacées de la base principale sont en AUTOINCREMENT (voir _reserve_ids).
+    """
+    names = ", ".join(f"'{table}'" for table in _ID_TABLES)
+    missing = [
+        row[0]
+        for row in connection.exec_driver_sql(
+            f"SELECT name FROM main.sqlite_master WHERE type = 'table' AND name IN ({names}) "
+            "AND sql NOT LIKE '%AUTOINCREMENT%'"
+        )
+    ]
+    if missing:
+        raise RuntimeError(f"tables sans AUTOINCREMENT ({', '.join(missing)}) : lancez d'abord `flask db upgrade`")
+
+    for table in COLD_TABLES:
+        cold_columns = _columns(connection, COLD_SCHEMA, table)
+        if not cold_columns:
+            connection.exec_driver_sql(f"CREATE TABLE cold.{table} AS SELECT * FROM main.{table} WHERE 0")
+            continue
+        for row in connection.exec_driver_sql(f"PRAGMA main.table_info({table})"):
+            if row[1] not in cold_columns:
+                connection.exec_driver_sql(f'ALTER TABLE cold.{table} ADD COLUMN "{row[1]}" {row[2]}')
+    for statement in COLD_INDEXES:
+        connection.exec_driver_sql(statement)
+
+
+def _reserve_ids(connection):
+    """Place les compteurs AUTOINCREMENT de la base principale au-delà des id du stockage froid"""
+    for table in _ID_TABLES:
+        connection.exec_driver_sql(
+            f"INSERT INTO main.sqlite_sequence (name, seq) SELECT '{table}', 0 "
+            f"WHERE NOT EXISTS (SELECT 1 FROM main.sqlite_sequence WHERE name = '{table}')"
+        )
+        connection.exec_driver_sql(
+            f"UPDATE main.sqlite_sequence SET seq = max(seq, coalesce((SELECT max(id) FROM cold.{table}), 0)) "
+            f"WHERE name = '{table}'"
+        )
+
+
+def _copy(connection, ids, source, target):
+    """Copie dans target les lignes des tâches ids présentes dans source (parents d'abord)"""
+    id_list = ",".join(str(int(task_id)) for task_id in ids)
+    for table, where in COLD_TABLES.items():
+        columns = ", ".join(f'"{name}"' for name in _columns(connection, "main", table))
+        connection.exec_driver_sql(
+            f"INSERT INTO {target}.{table} ({columns}) "
+            f"SELECT {columns} FROM {source}.{table} WHERE {where.format(ids=id_list, schema=source)}"
+        )
+
+
+def _delete(connection, ids, schema):
+    """Supprime de schema les lignes des tâches ids (enfants d'abord)"""
+    id_list = ",".join(str(int(task_id)) for task_id in ids)
+    for table, where in reversed(COLD_TABLES.items()):
+        connection.exec_driver_sql(f"DELETE FROM {schema}.{table} WHERE {where.format(ids=id_list, schema=schema)}")
+
+
+def _conflicts(connection, ids, source, target):
+    """Tables dont une ligne des tâches ids porte dans source un id déjà présent dans target"""
+    id_list = ",".join(str(int(task_id)) for task_id in ids)
+    return [
+        table
+        for table in _ID_TABLES
+        if connection.exec_driver_sql(
+            f"SELECT 1 FROM {source}.{table} WHERE {COLD_TABLES[table].format(ids=id_list, schema=source)} "
+            f"AND id IN (SELECT id FROM {target}.{table}) LIMIT 1"
+        ).first()
+    ]
+
+
+def _run_transaction(work):
+    """Exécute work(connection) dans une transaction SQLite explicite, clés étrangères désactivées.
+
+    Les clés étrangères sont coupées le temps du transfert : les lignes restées dans la base principale
+    (credit_log, communication) pointent vers des tâches déplacées, dont l'id est conservé.
+    work ne doit écrire que dans un seul fichier : en WAL, SQLite ne rend pas atomique le COMMIT d'une
+    transaction qui modifie deux bases attachées.
+    """
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                result = work(connection)
+                connection.exec_driver_sql("COMMIT")
+            except Exception:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+        finally:
+            connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+        connection.commit()
+    return result
+
+
+def _archived_before(cutoff):
+    """Tâches archivées avant cutoff, hors modèles de séries récurrentes (référencés par la série)"""
+    return [
+        Task.is_archived == True,
+        Task.archived_at < cutoff,
+        Task.id.not_in(sa.select(TaskRecurrenceSeries.template_task_id)),
+    ]
+
+
+def _candidates(connection, cutoff, batch_size):
+    """Prochain lot de tâches à déplacer (archivées avant cutoff, hors modèles de séries récurrentes)"""
+    query = sa.select(Task.id).where(*_archived_before(cutoff)).order_by(Task.id).limit(batch_size)
+    return list(connection.execute(query).scalars())
+
+
+def _drop_stale_copies(connection):
+    """Supprime du stockage froid les tâches aussi présentes dans la base principale (transfert interrompu)"""
+    ids = list(connection.exec_driver_sql("SELECT id FROM cold.task WHERE id IN (SELECT id FROM main.task)").scalars())
+    if ids:
+        _delete(connection, ids, COLD_SCHEMA)
+
+
+def freeze(months=None, batch_size=500, dry_run=False):
+    """
+    Déplace vers le stockage froid les tâches archivées depuis plus de `months` mois, par lots.
+
+    Chaque lot se fait en deux transactions, chacune n'écrivant que dans un fichier : copie dans cold,
+    puis suppression de la base principale. Un transfert interrompu entre les deux (lot ou restauration)
+    laisse la tâche dans les deux fichiers : la copie principale fait foi, celle du stockage froid est
+    supprimée au passage suivant.
+
+    Returns:
+        int: nombre de tâches déplacées (à déplacer avec dry_run)
+    """
+    months = current_app.config.get("COLD_STORAGE_AFTER_MONTHS", 6) if months is None else months
+    cutoff = (datetime.now(UTC) - timedelta(days=30 * months)).replace(tzinfo=None)
+
+    if dry_run:
+        return db.session.execute(sa.select(sa.func.count(Task.id)).where(*_archived_before(cutoff))).scalar()
+
+    journal_mode = current_app.config.get("SQLITE_JOURNAL_MODE")
+    if journal_mode:
+        # journal_mode est persistant : le fichier froid suit le mode de la base principale
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql(f"PRAGMA cold.journal_mode = {journal_mode}")
+    _run_transaction(ensure_schema)
+    _run_transaction(_reserve_ids)
+    _run_transaction(_drop_stale_copies)
+    moved = 0
+    while True:
+        with db.engine.connect() as connection:
+            ids = _candidates(connection, cutoff, batch_size)
+        if not ids:
+            return moved
+        _run_transaction(lambda connection, ids=ids: _copy(connection, ids, "main", COLD_SCHEMA))
+        _run_transaction(lambda connection, ids=ids: _delete(connection, ids, "main"))
+        moved += len(ids)
+
+
+def thaw(slug_or_id, can_access=None):
+    """
+    Restaure dans la base principale une tâche du stockage froid (toujours archivée) ; retourne son id.
+
+    None, sans rien écrire, si le stockage froid n'est pas utilisé, si la tâche n'y est pas, si son projet
+    a été supprimé, si can_access(projet) est faux ou si l'un de ses id est déjà pris dans la base principale.
+    """
+    if not is_ready():
+        return None
+    cold_task = cold_table(Task)
+    criterion = cold_task.c.slug == str(slug_or_id)
+    if str(slug_or_id).isdigit():
+        criterion = sa.or_(criterion, cold_task.c.id == int(slug_or_id))
+    row = db.session.execute(
+        sa.select(cold_task.c.id, cold_task.c.title, cold_task.c.slug, cold_task.c.project_id).where(criterion)
+    ).first()
+    project = db.session.get(Project, row.project_id) if row is not None else None
+    if project is None or (can_access is not None and not can_access(project)):
+        return None
+    # Slug repris entre-temps par une tâche de la base principale : nouveau slug
+    slug = row.slug
+    if db.session.execute(sa.select(Task.id).where(Task.slug == slug)).first() is not None:
+        slug = generate_slug(row.title, Task)
+
+    # Deux transactions comme pour freeze() : copie dans la base principale, puis suppression du stockage froid
+    def restore(connection):
+        conflicts = _conflicts(connection, [row.id], COLD_SCHEMA, "main")
+        if conflicts:
+            return conflicts
+        _copy(connection, [row.id], COLD_SCHEMA, "main")
+        # Table sans onupdate : updated_at de la tâche restaurée est conservé
+        task = sa.table("task", sa.column("id"), sa.column("slug"), sa.column("recurrence_series_id"))
+        connection.execute(
+            task.update()
+            .where(task.c.id == row.id)
+            .values(
+                slug=slug,
+                # Série récurrente supprimée entre-temps : la tâche est détachée
+                recurrence_series_id=sa.case(
+                    (task.c.recurrence_series_id.in_(sa.select(TaskRecurrenceSeries.id)), task.c.recurrence_series_id),
+                    else_=None,
+                ),
+            )
+        )
+        return []
+
+    conflicts = _run_transaction(restore)
+    if conflicts:
+        current_app.logger.error(
+            f"Tâche {row.id} non restaurée du stockage froid : id déjà utilisé dans la base principale "
+            f"({', '.join(conflicts)})"
+        )
+        return None
+    _run_transaction(lambda connection: _delete(connection, [row.id], COLD_SCHEMA))
+    return row.id
+
+
+def purge_projects(project_ids):
+    """
+    Supprime du stockage froid les tâches des projets project_ids, avant la suppression de ces projets.
+
+    Sans cela, les tâches gelées d'un projet supprimé resteraient référencées (contenus des pièces jointes
+    jamais libérés) et réapparaîtraient sous un nouveau projet reprenant son id. Le stockage froid est
+    purgé dans sa propre transaction ; les références des contenus sont décrémentées dans celle de la
+    session, validée avec la suppression des projets (un arrêt entre les deux est corrigé par
+    `flask attachments-gc`).
+
+    Returns:
+        int: nombre de tâches supprimées du stockage froid
+    """
+    project_ids = list(project_ids)
+    if not project_ids or not is_ready():
+        return 0
+    cold_task = cold_table(Task)
+    ids = list(db.session.execute(sa.select(cold_task.c.id).where(cold_task.c.project_id.in_(project_ids))).scalars())
+    if not ids:
+        return 0
+    cold_attachments = cold_table(TaskAttachment)
+    references = db.session.execute(
+        sa.select(cold_attachments.c.sha256, sa.func.count())
+        .where(cold_attachments.c.task_id.in_(ids))
+        .group_by(cold_attachments.c.sha256)
+    ).all()
+
+    _run_transaction(lambda connection: _delete(connection, ids, COLD_SCHEMA))
+
+    blobs = AttachmentBlob.__table__
+    for sha256, count in references:
+        db.session.execute(blobs.update().where(blobs.c.sha256 == sha256).values(ref_count=blobs.c.ref_count - count))
+    return len(ids)
+
+
+def archived_tasks_query(project_id=None, search=None):
+    """
+    Requête (Query ORM de Task) des tâches archivées des deux bases, de la plus récemment archivée à la plus ancienne.
+
+    La recherche dans le stockage froid porte sur le texte indexé des tâches et checklists (LIKE),
+    sans index plein texte ni commentaires.
+    """
+    criteria = [Task.is_archived == True]
+    if project_id:
+        criteria.append(Task.project_id == project_id)
+    if search:
+        criteria.append(task_search_filter(search))
+    if not is_ready():
+        return Task.query.filter(*criteria).order_by(Task.archived_at.desc())
+
+    cold_task = cold_table(Task)
+    cold = sa.select(*(cold_task.c[name] for name in Task.__table__.columns.keys())).where(
+        cold_task.c.is_archived == True,
+        # Tâche présente dans les deux bases (transfert interrompu) : la copie principale fait foi
+        ~sa.exists().where(Task.id == cold_task.c.id),
+    )
+    if project_id:
+        cold = cold.where(cold_task.c.project_id == project_id)
+    terms = search_terms(search) if search else []
+    if terms:
+        documents = cold_table(SearchDocument)
+        matches = sa.select(documents.c.task_id).where(
+            *(sa.or_(documents.c.title.like(f"%{term}%"), documents.c.body.like(f"%{term}%")) for term in terms)
+        )
+        cold = cold.where(cold_task.c.id.in_(matches))
+
+    hot = sa.select(Task.__table__).where(*criteria)
+    archived_task = aliased(Task, sa.union_all(hot, cold).subquery("archived_task"))
+    return db.session.query(archived_task).order_by(archived_task.archived_at.desc())
@@ -1,22 +1,96 @@
-from sqlalchemy import event
-from sqlalchemy.engine import Engine
+import logging
+import os
+import threading
+import time
+import weakref
 
+from sqlalchemy import event, text
 
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    """Configure SQLite pour de meilleures performances via PRAGMA"""
-    if "sqlite" in str(dbapi_connection):
-        cursor = dbapi_connection.cursor()
+logger = logging.getLogger(__name__)
+
+# Moteurs SQLite configurés dans ce processus (recréés après fork)
+_sqlite_engines = weakref.WeakSet()
+
+# PID du processus dans lequel tourne le thread de checkpoint WAL
+_checkpoint_pid = None
+_checkpoint_lock = threading.Lock()
 
-        # Optimisations de performance
-        cursor.execute("PRAGMA cache_size = -64000")  # 64MB de cache
-        cursor.execute("PRAGMA journal_mode = WAL")  # Mode WAL pour de meilleures performances
-        cursor.execute("PRAGMA synchronous = NORMAL")  # Équilibre performance/sécurité
-        cursor.execute("PRAGMA temp_store = MEMORY")  # Stockage temporaire en mémoire
-        cursor.execute("PRAGMA mmap_size = 268435456")  # 256MB de mmap
 
-        # Optimisations de sécurité
-        cursor.execute("PRAGMA foreign_keys = ON")  # Contraintes de clés étrangères
-        cursor.execute("PRAGMA secure_delete = OFF")  # Performance vs sécurité
+def init_sqlite_engine(app, engine, read_only=False):
+    """Applique le profil SQLite de la configuration à un moteur (PRAGMA, fork, checkpoint WAL)"""
+    if engine.dialect.name != "sqlite":
+        return
 
+    pragmas = dict(app.config.get("SQLITE_PRAGMAS") or {})
+    journal_mode = app.config.get("SQLITE_JOURNAL_MODE")
+    if read_only:
+        # Moteur de lecture (mode=ro) : refuse toute écriture, le fichier est géré par le moteur principal
+        pragmas["query_only"] = "ON"
+        journal_mode = None
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        """Configure SQLite pour de meilleures performances via PRAGMA"""
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        # Stockage froid des tâches archivées (app/utils/cold_storage.py), attaché à chaque connexion ;
+        # le moteur de lecture ne crée pas le fichier : il l'attache une fois créé par le moteur principal
+        cold_storage_path = app.config.get("COLD_STORAGE_PATH")
+        if cold_storage_path and (not read_only or os.path.exists(cold_storage_path)):
+            cursor.execute("ATTACH DATABASE ? AS cold", (cold_storage_path,))
         cursor.close()
+
+    if journal_mode:
+
+        @event.listens_for(engine, "first_connect")
+        def set_sqlite_journal_mode(dbapi_connection, connection_record):
+            """journal_mode est persistant dans le fichier : une seule fois par pool suffit"""
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+            cursor.close()
+
+    _sqlite_engines.add(engine)
+
+    interval = app.config.get("SQLITE_WAL_CHECKPOINT_INTERVAL") or 0
+    if interval > 0 and not app.testing and not read_only:
+        # Démarrage paresseux à la première requête du processus : avec gunicorn --preload,
+        # un thread lancé dans le master ne survivrait pas au fork des workers.
+        @app.before_request
+        def ensure_wal_checkpointer():
+            start_wal_checkpointer(engine, interval)
+
+
+def start_wal_checkpointer(engine, interval):
+    """Lance (une fois par processus) un thread qui fait des checkpoints WAL passifs réguliers"""
+    global _checkpoint_pid
+
+    pid = os.getpid()
+    if _checkpoint_pid == pid:
+        return
+    with _checkpoint_lock:
+        if _checkpoint_pid == pid:
+            return
+        _checkpoint_pid = pid
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with engine.connect() as conn:
+                    # PASSIVE : ne bloque ni les lecteurs ni les écrivains
+                    conn.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+            except Exception as e:
+                logger.warning(f"Checkpoint WAL échoué: {e}")
+
+    threading.Thread(target=run, name="sqlite-wal-checkpoint", daemon=True).start()
+
+
+def _dispose_engines_after_fork():
+    """Après fork, le worker ne doit pas réutiliser les connexions ouvertes par le processus parent"""
+    for engine in list(_sqlite_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
@@ -0,0 +1,60 @@
+"""
+Routage des sessions vers un moteur en lecture seule.
+
+Les vues marquées par @read_only_db (rapports, tableau de bord, listes) lisent via un second
+moteur : connexion SQLite ouverte en mode=ro + PRAGMA query_only, ou réplique PostgreSQL
+(DATABASE_READ_URL). Les longues lectures ne partagent plus le pool des écritures (saisie de temps).
+Les flush de l'ORM restent toujours dirigés vers le moteur principal.
+"""
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+READ_ONLY_BIND = "readonly"
+
+
+def read_only_database_uri(app):
+    """URL du moteur de lecture : DATABASE_READ_URL, sinon le même fichier SQLite en mode=ro."""
+    uri = app.config.get("SQLALCHEMY_READONLY_DATABASE_URI")
+    if uri:
+        return uri
+
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        # PostgreSQL sans réplique déclarée : pas de routage
+        return None
+    if url.query.get("uri"):
+        return url.update_query_dict({"mode": "ro"}).render_as_string(hide_password=False)
+    return (
+        url.set(database=f"file:{url.database}")
+        .update_query_dict({"mode": "ro", "uri": "true"})
+        .render_as_string(hide_password=False)
+    )
+
+
+def configure_read_only_bind(app, engine_options):
+    """Déclare le bind "readonly" dans SQLALCHEMY_BINDS (à appeler avant db.init_app)."""
+    if not app.config.get("DB_READ_ONLY_ROUTING"):
+        return
+    uri = read_only_database_uri(app)
+    if not uri:
+        return
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    binds[READ_ONLY_BIND] = {"url": uri, **engine_options}
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy qui dirige les lectures des vues en lecture seule vers le bind "readonly"."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_app_context()
+            and g.get("db_read_only")
+            and READ_ONLY_BIND in self._db.engines
+        ):
+            return self._db.engines[READ_ONLY_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
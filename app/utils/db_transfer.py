@@ -0,0 +1,74 @@
+"""
+Copie des données d'une base vers une autre (SQLite -> PostgreSQL).
+
+Les colonnes chiffrées (EncryptedType) sont copiées telles quelles, sans déchiffrement :
+la clé ENCRYPTION_KEY reste la même pour la base cible.
+"""
+
+import sqlalchemy as sa
+
+from app.utils.encryption import EncryptedType
+
+
+def _raw_table(table):
+    """Table "légère" dont les colonnes chiffrées sont vues comme du texte brut."""
+    columns = [sa.column(c.name, sa.String() if isinstance(c.type, EncryptedType) else c.type) for c in table.columns]
+    return sa.table(table.name, *columns)
+
+
+def copy_database(metadata, source_engine, target_engine, batch_size=1000, log=print):
+    """Crée le schéma sur la cible puis copie toutes les tables par lots (ordre des clés étrangères)."""
+    metadata.create_all(target_engine)
+    counts = {}
+
+    with source_engine.connect() as source, target_engine.begin() as target:
+        if target.dialect.name == "postgresql":
+            # Les tables task et task_recurrence_series se référencent mutuellement : on désactive
+            # les triggers de clés étrangères le temps de la copie (nécessite un rôle propriétaire)
+            target.execute(sa.text("SET LOCAL session_replication_role = replica"))
+
+        for table in metadata.sorted_tables:
+            if target.execute(sa.select(sa.func.count()).select_from(table)).scalar():
+                raise RuntimeError(f"La table '{table.name}' n'est pas vide sur la base cible")
+
+            raw = _raw_table(table)
+            query = sa.select(*raw.columns).order_by(*[raw.c[c.name] for c in table.primary_key.columns])
+            result = source.execution_options(yield_per=batch_size).execute(query)
+            total = 0
+            for rows in result.partitions():
+                target.execute(sa.insert(raw), [row._asdict() for row in rows])
+                total += len(rows)
+            counts[table.name] = total
+            log(f"  {table.name}: {total} ligne(s)")
+
+        if target.dialect.name == "postgresql":
+            _reset_sequences(metadata, target)
+        _copy_alembic_version(source, target)
+
+    return counts
+
+
+def _reset_sequences(metadata, target):
+    """Recale les séquences des clés primaires après insertion d'identifiants explicites."""
+    for table in metadata.sorted_tables:
+        pk = list(table.primary_key.columns)
+        if len(pk) != 1 or not isinstance(pk[0].type, sa.Integer):
+            continue
+        target.execute(
+            sa.text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{pk[0].name}'), "
+                f'COALESCE((SELECT MAX("{pk[0].name}") FROM "{table.name}"), 0) + 1, false)'
+            )
+        )
+
+
+def _copy_alembic_version(source, target):
+    """Reporte la révision Alembic pour que `flask db upgrade` reparte du bon point."""
+    if not sa.inspect(source).has_table("alembic_version"):
+        return
+    version = source.execute(sa.text("SELECT version_num FROM alembic_version")).scalar()
+    if version is None:
+        return
+    target.execute(sa.text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+    target.execute(sa.text("DELETE FROM alembic_version"))
+    target.execute(sa.text("INSERT INTO alembic_version (version_num) VALUES (:v)"), {"v": version})
@@ -1,6 +1,8 @@
+import hashlib
+import time
 from functools import wraps
 
-from flask import abort, flash, redirect, url_for
+from flask import abort, current_app, flash, g, make_response, redirect, request, session, url_for
 from flask_login import current_user, login_required
 
 
@@ -114,3 +116,88 @@ def login_and_admin_required(f):
         return f(*args, **kwargs)
 
     return decorated_function
+
+
+def read_only_db(f):
+    """Exécute la vue sur le moteur en lecture seule (voir app/utils/db_routing.py)"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        previous = g.get("db_read_only", False)
+        g.db_read_only = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.db_read_only = previous
+
+    return decorated_function
+
+
+def _page_etag(stamp):
+    """ETag faible de la page pour l'utilisateur courant.
+
+    En plus de l'empreinte des données (stamp), il varie avec tout ce que la page embarque :
+    utilisateur et rôle, jour (tâches planifiées), version de l'application, secret CSRF de la session
+    (reconnexion) et tranche de WTF_CSRF_TIME_LIMIT / 2 : une page revalidée garde des jetons CSRF valides.
+    """
+    from app import db
+    from app.models.task import Task, UserPinnedTask
+    from app.utils.version import get_version
+
+    # Tâches épinglées affichées dans la barre latérale de toutes les pages
+    pinned = db.session.execute(
+        db.select(db.func.count(), db.func.sum(UserPinnedTask.task_id), db.func.max(Task.updated_at))
+        .select_from(UserPinnedTask)
+        .join(Task, Task.id == UserPinnedTask.task_id)
+        .where(UserPinnedTask.user_id == current_user.id)
+    ).one()
+    csrf_window = (current_app.config.get("WTF_CSRF_TIME_LIMIT") or 3600) // 2
+    parts = (
+        current_user.get_id(),
+        current_user.role,
+        time.strftime("%Y-%m-%d", time.gmtime()),
+        int(time.time() // csrf_window),
+        get_version(),
+        session.get("csrf_token"),
+        *pinned,
+        *stamp,
+    )
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def conditional_get(stamp_view):
+    """
+    GET conditionnel (If-None-Match -> 304) pour une page reconstruite à chaque rechargement.
+
+    stamp_view(*args, **kwargs) reçoit les arguments de la vue et retourne un tuple peu coûteux à
+    calculer (compteurs, max(updated_at), derniers ids) qui change dès que la page changerait ; il
+    vérifie aussi les droits d'accès (abort), appelé avant la vue. Si l'ETag correspond, la réponse 304
+    est retournée sans exécuter la vue (ni requêtes lourdes, ni rendu).
+
+    La réponse 304 ne porte pas d'en-tête Content-Security-Policy (voir add_security_headers) : le
+    navigateur conserve celui de la page en cache, dont le nonce correspond aux scripts qu'elle contient.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Messages flash en attente : la page doit être rendue pour les afficher (et les consommer)
+            if request.method != "GET" or session.get("_flashes"):
+                return f(*args, **kwargs)
+
+            etag = _page_etag(stamp_view(*args, **kwargs))
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Revalidation à chaque affichage, cache du navigateur uniquement
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Cookie")
+            return response
+
+        return decorated_function
+
+    return decorator
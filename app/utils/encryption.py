@@ -1,6 +1,7 @@
 import logging
+from functools import lru_cache
 
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from flask import current_app
 from sqlalchemy.types import String, TypeDecorator
 
@@ -11,12 +12,43 @@ _warned_values = set()
 _warning_count = 0
 _MAX_WARNINGS = 10  # Limite le nombre total de warnings
 
+# Préfixe des jetons Fernet (version 0x80 encodée en base64)
+ENCRYPTED_PREFIX = "gAAA"
+
+
+def encryption_keys(config=None):
+    """Clés Fernet configurées : ENCRYPTION_KEY (chiffrement) puis ENCRYPTION_OLD_KEYS (déchiffrement seul)"""
+    config = config if config is not None else current_app.config
+    primary = config.get("ENCRYPTION_KEY")
+    if not primary:
+        return ()
+    return (primary, *config.get("ENCRYPTION_OLD_KEYS", ()))
+
+
+@lru_cache(maxsize=8)
+def _multi_fernet(keys):
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def get_fernet():
+    """MultiFernet de l'application (mis en cache par jeu de clés) ; None si aucune clé.
+
+    Chiffre avec la clé principale et déchiffre avec n'importe quelle clé configurée : pendant une
+    rotation, les données encore chiffrées avec l'ancienne clé restent lisibles.
+    """
+    keys = encryption_keys()
+    return _multi_fernet(keys) if keys else None
+
 
 class EncryptedType(TypeDecorator):
     """Type SQLAlchemy pour les champs chiffrés"""
 
     impl = String(500)  # Augmentation de la taille pour stocker les données chiffrées
-    cache_ok = False  # Important pour éviter les problèmes de cache
+    # Le type n'a aucun paramètre d'instance : deux colonnes EncryptedType compilent le même SQL.
+    # Le chiffrement se fait à l'exécution (process_bind_param, jamais dans le SQL compilé), avec la clé
+    # lue à chaque appel : les requêtes sur Client, Comment et Communication profitent du cache de
+    # compilation de SQLAlchemy sans risque de réutiliser une valeur ou une clé.
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
         """Chiffre la valeur avant de l'envoyer à la base de données"""
@@ -24,13 +56,12 @@ class EncryptedType(TypeDecorator):
             return None
 
         try:
-            key = current_app.config.get("ENCRYPTION_KEY")
-            if not key:
+            f = get_fernet()
+            if f is None:
                 logger.error("Clé de chiffrement manquante dans la configuration")
                 return value  # Retourner la valeur telle quelle si pas de clé
 
             # Chiffrement simple sans timeout (plus compatible)
-            f = Fernet(key)
             encrypted_data = f.encrypt(value.encode("utf-8"))
             return encrypted_data.decode("utf-8")
 
@@ -46,7 +77,7 @@ class EncryptedType(TypeDecorator):
 
         try:
             # Tester si la valeur semble être chiffrée (commence par 'gAAA')
-            if not isinstance(value, str) or not value.startswith("gAAA"):
+            if not isinstance(value, str) or not value.startswith(ENCRYPTED_PREFIX):
                 # Ignorer les warnings pour les valeurs vides ou composées uniquement d'espaces
                 if not value or value.strip() == "":
                     return value
@@ -67,12 +98,11 @@ class EncryptedType(TypeDecorator):
                 return value
 
             # La valeur est chiffrée, procéder au déchiffrement simple
-            key = current_app.config.get("ENCRYPTION_KEY")
-            if not key:
+            f = get_fernet()
+            if f is None:
                 logger.error("Clé de chiffrement manquante dans la configuration")
                 return "[Erreur: Clé de chiffrement manquante]"
 
-            f = Fernet(key)
             decrypted_data = f.decrypt(value.encode("utf-8"))
             return decrypted_data.decode("utf-8")
 
@@ -0,0 +1,186 @@
+"""
+Exports tabulaires en flux (CSV et XLSX).
+
+Les lignes sont consommées depuis un itérable (résultats `yield_per`) et émises par morceaux :
+la mémoire reste constante quel que soit le volume exporté.
+
+Le XLSX est produit sans dépendance externe : le classeur minimal (une feuille, chaînes en ligne)
+est écrit dans un `zipfile` ouvert sur un tampon non positionnable, vidé après chaque lot de lignes.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from flask import Response, stream_with_context
+
+# Nombre de lignes sérialisées entre deux envois au client
+EXPORT_CHUNK_ROWS = 500
+
+# Limite de lignes d'une feuille Excel (en-tête compris)
+XLSX_MAX_ROWS = 1_048_576
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Premiers caractères qu'Excel et LibreOffice interprètent comme une formule dans un CSV
+_CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Caractères de contrôle interdits en XML 1.0
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    "</Types>"
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    "</Relationships>"
+)
+
+
+def _format_value(value):
+    """Valeur texte d'une cellule (dates ISO, vides pour None)"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    """Valeur d'une cellule CSV : un texte commençant comme une formule est préfixé d'une apostrophe.
+
+    Titres, descriptions et commentaires peuvent venir d'utilisateurs clients ; les nombres (crédits
+    négatifs) ne sont pas concernés. Le XLSX écrit des chaînes en ligne, jamais évaluées.
+    """
+    if isinstance(value, str) and value.startswith(_CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return _format_value(value)
+
+
+def iter_csv(header, rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Produit le CSV par morceaux (UTF-8 avec BOM et « ; » pour l'ouverture directe dans Excel)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(header)
+    yield buffer.getvalue().encode("utf-8-sig")
+
+    pending = 0
+    for row in rows:
+        if pending == 0:
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow([_csv_value(value) for value in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _StreamSink(io.RawIOBase):
+    """Tampon en écriture seule, non positionnable, vidé par le générateur XLSX"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or value is None or not isinstance(value, int | float):
+        text = escape(_XML_ILLEGAL.sub("", _format_value(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+    return f"<c><v>{value}</v></c>"
+
+
+def _xlsx_row(values):
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+def iter_xlsx(header, rows, sheet_name="Export", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Produit un classeur XLSX par morceaux (les lignes au-delà de la limite Excel sont ignorées)"""
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name[:31])))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(header).encode("utf-8"))
+            parts = []
+            for count, row in enumerate(rows, start=2):
+                if count > XLSX_MAX_ROWS:
+                    break
+                parts.append(_xlsx_row(row))
+                if len(parts) >= chunk_rows:
+                    sheet.write("".join(parts).encode("utf-8"))
+                    parts.clear()
+                    yield sink.drain()
+            sheet.write("".join(parts).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+def stream_export(export_format, filename, header, rows, sheet_name="Export"):
+    """Réponse HTTP en flux pour un export CSV ou XLSX (`export_format` validé par l'appelant)"""
+    if export_format == "xlsx":
+        body = iter_xlsx(header, rows, sheet_name=sheet_name)
+    else:
+        export_format = "csv"
+        body = iter_csv(header, rows)
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    # Pas de mise en tampon côté proxy (nginx) : les lignes partent dès qu'elles sont prêtes
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
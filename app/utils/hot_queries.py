@@ -0,0 +1,240 @@
+"""
+Requêtes les plus fréquentes (recherche de tâche par slug, kanban, tableau de bord, temps passé),
+écrites en lambda_stmt et enregistrées dans HOT_QUERIES.
+
+Une requête ORM classique reconstruit son arbre d'expressions et calcule sa clé de cache à chaque
+exécution ; une lambda_stmt n'est analysée qu'une fois (par emplacement de la lambda) : les appels
+suivants ne font qu'extraire les variables de fermeture comme paramètres liés, puis réutilisent le SQL
+compilé du cache du moteur. Règles à respecter dans les lambdas :
+  - les valeurs variables (ids, dates, listes) passent par des variables de fermeture, jamais par une
+    structure qui change d'un appel à l'autre ;
+  - un critère optionnel s'ajoute par `stmt += lambda s: s.where(...)` (une lambda par variante) ;
+  - un critère construit à part (ex. recherche plein texte) est passé en variable de fermeture : c'est
+    une expression SQL, sa structure entre dans la clé de cache.
+
+Benchmark : scripts/bench_hot_queries.py.
+"""
+
+from sqlalchemy import and_, func, lambda_stmt, select
+
+from app.models.client import Client
+from app.models.project import Project
+from app.models.task import ChecklistItem, Comment, Task, TimeEntry
+
+HOT_QUERIES = {}
+
+
+def hot_query(name):
+    """Enregistre une fabrique de requête dans HOT_QUERIES (benchmark, tests)"""
+
+    def register(builder):
+        HOT_QUERIES[name] = builder
+        return builder
+
+    return register
+
+
+# --- Recherche par slug ---
+
+
+@hot_query("task_by_slug")
+def task_by_slug(slug):
+    return lambda_stmt(lambda: select(Task).where(Task.slug == slug).limit(1))
+
+
+@hot_query("project_by_slug")
+def project_by_slug(slug):
+    return lambda_stmt(lambda: select(Project).where(Project.slug == slug).limit(1))
+
+
+@hot_query("client_by_slug")
+def client_by_slug(slug):
+    return lambda_stmt(lambda: select(Client).where(Client.slug == slug).limit(1))
+
+
+# --- Détail d'une tâche ---
+
+
+@hot_query("task_time_entries")
+def task_time_entries(task_id):
+    return lambda_stmt(
+        lambda: select(TimeEntry).where(TimeEntry.task_id == task_id).order_by(TimeEntry.created_at.desc())
+    )
+
+
+@hot_query("task_root_comments")
+def task_root_comments(task_id):
+    return lambda_stmt(
+        lambda: (
+            select(Comment)
+            .where(Comment.task_id == task_id, Comment.parent_id.is_(None))
+            .order_by(Comment.created_at.desc())
+        )
+    )
+
+
+@hot_query("task_checklist_items")
+def task_checklist_items(task_id):
+    return lambda_stmt(
+        lambda: (
+            select(ChecklistItem)
+            .where(ChecklistItem.task_id == task_id)
+            .order_by(ChecklistItem.position.asc(), ChecklistItem.id.asc())
+        )
+    )
+
+
+# --- Kanban (projet, mes tâches) ---
+
+
+@hot_query("project_visible_tasks")
+def project_visible_tasks(project_id, today):
+    return lambda_stmt(lambda: select(Task).where(Task.project_id == project_id, Task.visible_on(today)))
+
+
+def _next_occurrences(owner_criteria, today):
+    """Prochaine occurrence future "à faire" de chaque série, parmi les tâches de owner_criteria"""
+    next_subq = (
+        select(Task.recurrence_series_id.label("sid"), func.min(Task.scheduled_for).label("next_date"))
+        .where(
+            owner_criteria,
+            Task.is_archived == False,
+            Task.recurrence_series_id.isnot(None),
+            Task.scheduled_for.isnot(None),
+            Task.scheduled_for > today,
+            Task.status == "à faire",
+        )
+        .group_by(Task.recurrence_series_id)
+        .subquery()
+    )
+    return select(Task).join(
+        next_subq,
+        and_(Task.recurrence_series_id == next_subq.c.sid, Task.scheduled_for == next_subq.c.next_date),
+    )
+
+
+@hot_query("project_next_occurrences")
+def project_next_occurrences(project_id, today):
+    return lambda_stmt(lambda: _next_occurrences(Task.project_id == project_id, today))
+
+
+@hot_query("project_time_entries")
+def project_time_entries(project_id):
+    return lambda_stmt(lambda: select(TimeEntry).join(Task).where(Task.project_id == project_id))
+
+
+@hot_query("user_visible_tasks")
+def user_visible_tasks(user_id, today, statuses=None, priority=None, project_id=None, search_criteria=None):
+    stmt = lambda_stmt(
+        lambda: (
+            select(Task)
+            .where(Task.user_id == user_id, Task.is_archived == False, Task.visible_on(today))
+            .order_by(Task.position.asc(), Task.created_at.desc())
+        )
+    )
+    if statuses:
+        stmt += lambda s: s.where(Task.status.in_(statuses))
+    if priority:
+        stmt += lambda s: s.where(Task.priority == priority)
+    if project_id:
+        stmt += lambda s: s.where(Task.project_id == project_id)
+    if search_criteria is not None:
+        stmt += lambda s: s.where(search_criteria)
+    return stmt
+
+
+@hot_query("user_next_occurrences")
+def user_next_occurrences(user_id, today, priority=None, project_id=None, search_criteria=None):
+    stmt = lambda_stmt(lambda: _next_occurrences(Task.user_id == user_id, today))
+    if priority:
+        stmt += lambda s: s.where(Task.priority == priority)
+    if project_id:
+        stmt += lambda s: s.where(Task.project_id == project_id)
+    if search_criteria is not None:
+        stmt += lambda s: s.where(search_criteria)
+    return stmt
+
+
+# --- Tableau de bord (client_ids : périmètre d'un utilisateur client, None pour tout voir) ---
+
+
+@hot_query("count_clients")
+def count_clients(client_ids=None):
+    stmt = lambda_stmt(lambda: select(func.count(Client.id)))
+    if client_ids is not None:
+        stmt += lambda s: s.where(Client.id.in_(client_ids))
+    return stmt
+
+
+@hot_query("count_projects")
+def count_projects(client_ids=None):
+    stmt = lambda_stmt(lambda: select(func.count(Project.id)))
+    if client_ids is not None:
+        stmt += lambda s: s.where(Project.client_id.in_(client_ids))
+    return stmt
+
+
+@hot_query("count_visible_tasks")
+def count_visible_tasks(today, status=None, client_ids=None):
+    stmt = lambda_stmt(lambda: select(func.count(Task.id)).where(Task.visible_on(today)))
+    if status is not None:
+        stmt += lambda s: s.where(Task.status == status)
+    if client_ids is not None:
+        stmt += lambda s: s.join(Project, Task.project_id == Project.id).where(Project.client_id.in_(client_ids))
+    return stmt
+
+
+@hot_query("total_minutes")
+def total_minutes(client_ids=None):
+    stmt = lambda_stmt(lambda: select(func.sum(TimeEntry.minutes)))
+    if client_ids is not None:
+        stmt += lambda s: (
+            s.join(Task, TimeEntry.task_id == Task.id)
+            .join(Project, Task.project_id == Project.id)
+            .where(Project.client_id.in_(client_ids))
+        )
+    return stmt
+
+
+def _low_credit(stmt, threshold_minutes, client_ids):
+    stmt += lambda s: s.where(Project.remaining_credit < threshold_minutes, Project.remaining_credit > 0)
+    if client_ids is not None:
+        stmt += lambda s: s.where(Project.client_id.in_(client_ids))
+    return stmt
+
+
+@hot_query("count_low_credit_projects")
+def count_low_credit_projects(threshold_minutes, client_ids=None):
+    return _low_credit(lambda_stmt(lambda: select(func.count(Project.id))), threshold_minutes, client_ids)
+
+
+@hot_query("low_credit_projects")
+def low_credit_projects(threshold_minutes, client_ids=None, limit=5):
+    stmt = _low_credit(lambda_stmt(lambda: select(Project)), threshold_minutes, client_ids)
+    stmt += lambda s: s.order_by(Project.remaining_credit).limit(limit)
+    return stmt
+
+
+@hot_query("urgent_tasks")
+def urgent_tasks(today, limit=10):
+    return lambda_stmt(
+        lambda: (
+            select(Task)
+            .where(Task.priority == "urgente", Task.status == "à faire", Task.visible_on(today))
+            .limit(limit)
+        )
+    )
+
+
+@hot_query("user_tasks_in_progress")
+def user_tasks_in_progress(user_id, today, limit=10):
+    return lambda_stmt(
+        lambda: (
+            select(Task).where(Task.user_id == user_id, Task.status == "en cours", Task.visible_on(today)).limit(limit)
+        )
+    )
+
+
+@hot_query("recent_time_entries")
+def recent_time_entries(limit=10):
+    return lambda_stmt(lambda: select(TimeEntry).order_by(TimeEntry.created_at.desc()).limit(limit))
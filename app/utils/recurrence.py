@@ -0,0 +1,242 @@
+"""
+Matérialisation des occurrences des tâches récurrentes, en tâche de fond.
+
+La création ou la modification d'une série ne crée que la première occurrence (la tâche modèle) et
+enregistre un travail (table recurrence_job) ; les occurrences futures (jusqu'à 180 jours, avec slugs
+et checklists) sont créées par un thread par processus, par lots d'une transaction chacun :
+  - prise en charge par UPDATE conditionnel (plusieurs workers gunicorn peuvent se partager la file) ;
+  - un seul travail actif par série, un travail plus récent remplace les travaux en attente ;
+  - avancement (created / total) exposé par GET /tasks/<slug>/recurrence.
+
+RECURRENCE_JOBS_ASYNC=false désactive le thread : `flask process-recurrence-jobs` traite alors la file.
+"""
+
+import logging
+import os
+import threading
+from datetime import UTC, datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models.task import RecurrenceJob, Task, TaskRecurrenceSeries
+from app.utils import get_utc_now
+from app.utils.slug_utils import generate_slugs
+
+logger = logging.getLogger(__name__)
+
+RECURRENCE_HORIZON_DAYS = 180
+# Occurrences créées par transaction (l'avancement est enregistré après chaque lot)
+BATCH_SIZE = 25
+# Un travail "running" plus ancien est considéré comme abandonné (processus arrêté) et repris
+STALE_JOB_SECONDS = 600
+# Délai maximal entre deux passages du thread sur la file (en plus des réveils à l'ajout d'un travail)
+POLL_INTERVAL = 30
+
+_worker_pid = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _today_utc_date():
+    return get_utc_now().date()
+
+
+def delete_future_instances(series_id: int, keep_task_id: int | None = None):
+    """
+    Supprime les occurrences futures (planifiées dans le futur) d'une série.
+    On reste conservateur: on ne supprime que les tâches "à faire" sans temps passé.
+    """
+    today = _today_utc_date()
+    q = Task.query.filter(
+        Task.recurrence_series_id == series_id,
+        Task.scheduled_for.isnot(None),
+        Task.scheduled_for > today,
+        Task.status == "à faire",
+        Task.is_archived == False,
+    )
+    if keep_task_id:
+        q = q.filter(Task.id != keep_task_id)
+
+    tasks_to_delete = q.all()
+    for t in tasks_to_delete:
+        if t.time_entries:
+            # sécurité: ne pas supprimer si du temps a été enregistré
+            continue
+        db.session.delete(t)
+
+
+def missing_dates(series: TaskRecurrenceSeries, horizon_days: int = RECURRENCE_HORIZON_DAYS):
+    """Dates d'occurrence (>= aujourd'hui, jusqu'à horizon_days) qui n'ont pas encore de tâche."""
+    today = _today_utc_date()
+    horizon_end = today + timedelta(days=horizon_days)
+    existing_dates = {
+        d[0]
+        for d in db.session.query(Task.scheduled_for)
+        .filter(
+            Task.recurrence_series_id == series.id,
+            Task.scheduled_for.isnot(None),
+            Task.scheduled_for <= horizon_end,
+        )
+        .all()
+    }
+    return [d for d in series.iter_dates(horizon_end) if d >= today and d not in existing_dates]
+
+
+def create_instances(template_task: Task, dates):
+    """Ajoute à la session une copie de la tâche modèle (avec sa checklist) par date."""
+    # Slugs calculés en lot : une requête pour tout le lot au lieu d'une par occurrence
+    slugs = generate_slugs([template_task.title] * len(dates), Task)
+    for d, slug in zip(dates, slugs, strict=True):
+        cloned = template_task.clone_for_recurrence(scheduled_for=d, clone_checklist_items=True, slug=slug)
+        db.session.add(cloned)
+
+
+def enqueue_materialization(series: TaskRecurrenceSeries, replace: bool = False) -> RecurrenceJob:
+    """
+    Ajoute à la session (sans commit) un travail de matérialisation pour la série.
+
+    Les travaux encore en attente de la série sont annulés : le nouveau travail les remplace
+    (et reprend leur suppression des occurrences futures le cas échéant).
+    Appeler notify_worker() après le commit.
+    """
+    pending = RecurrenceJob.query.filter_by(series_id=series.id, status="pending").all()
+    for job in pending:
+        replace = replace or job.replace
+        job.status = "cancelled"
+        job.finished_at = datetime.now(UTC)
+    job = RecurrenceJob(series_id=series.id, replace=replace, horizon_days=RECURRENCE_HORIZON_DAYS)
+    db.session.add(job)
+    return job
+
+
+def job_progress(series_id: int) -> dict | None:
+    """Avancement du dernier travail de la série (None si aucun)."""
+    job = RecurrenceJob.query.filter_by(series_id=series_id).order_by(RecurrenceJob.id.desc()).first()
+    return job.progress() if job else None
+
+
+def _claim_next_job() -> int | None:
+    """Prend en charge le plus ancien travail disponible ; retourne son id (None si la file est vide)."""
+    stale_before = datetime.now(UTC) - timedelta(seconds=STALE_JOB_SECONDS)
+    available = db.or_(
+        RecurrenceJob.status == "pending",
+        db.and_(RecurrenceJob.status == "running", RecurrenceJob.started_at < stale_before),
+    )
+    # Un seul travail actif par série
+    active_series = db.select(RecurrenceJob.series_id).where(
+        RecurrenceJob.status == "running", RecurrenceJob.started_at >= stale_before
+    )
+    while True:
+        job_id = db.session.execute(
+            db.select(RecurrenceJob.id)
+            .where(available, RecurrenceJob.series_id.not_in(active_series))
+            .order_by(RecurrenceJob.id)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        claimed = db.session.execute(
+            db.update(RecurrenceJob)
+            .where(RecurrenceJob.id == job_id, available)
+            .values(status="running", started_at=datetime.now(UTC))
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+
+
+def _superseded(job: RecurrenceJob) -> bool:
+    """Vrai si un travail plus récent existe pour la série (celui-ci s'arrête au lot suivant)."""
+    return (
+        db.session.query(RecurrenceJob.id)
+        .filter(RecurrenceJob.series_id == job.series_id, RecurrenceJob.id > job.id)
+        .first()
+        is not None
+    )
+
+
+def _finish(job: RecurrenceJob, status: str, error: str | None = None):
+    job.status = status
+    job.error = error
+    job.finished_at = datetime.now(UTC)
+    db.session.commit()
+
+
+def run_job(job_id: int):
+    """Exécute un travail pris en charge (status running)."""
+    job = db.session.get(RecurrenceJob, job_id)
+    series = db.session.get(TaskRecurrenceSeries, job.series_id)
+    template_task = db.session.get(Task, series.template_task_id) if series else None
+    if template_task is None:
+        _finish(job, "failed", "Tâche modèle introuvable")
+        return
+
+    try:
+        if job.replace:
+            delete_future_instances(series.id, keep_task_id=template_task.id)
+        dates = missing_dates(series, job.horizon_days)
+        job.total = len(dates)
+        db.session.commit()
+
+        for start in range(0, len(dates), BATCH_SIZE):
+            if _superseded(job):
+                _finish(job, "cancelled")
+                return
+            batch = dates[start : start + BATCH_SIZE]
+            create_instances(template_task, batch)
+            job.created_count += len(batch)
+            db.session.commit()
+        _finish(job, "done")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Matérialisation du travail de récurrence {job_id} échouée: {e}")
+        job = db.session.get(RecurrenceJob, job_id)
+        if job is not None:  # Absent si la série a été supprimée entre-temps
+            _finish(job, "failed", str(e))
+
+
+def process_jobs(limit: int | None = None) -> int:
+    """Traite les travaux disponibles (au plus `limit`) ; retourne le nombre de travaux exécutés."""
+    processed = 0
+    while limit is None or processed < limit:
+        job_id = _claim_next_job()
+        if job_id is None:
+            break
+        run_job(job_id)
+        processed += 1
+    return processed
+
+
+def start_recurrence_worker(app):
+    """Lance (une fois par processus) le thread qui traite la file des travaux de récurrence"""
+    global _worker_pid
+
+    pid = os.getpid()
+    if _worker_pid == pid:
+        return
+    with _worker_lock:
+        if _worker_pid == pid:
+            return
+        _worker_pid = pid
+
+    def run():
+        while True:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+            try:
+                with app.app_context():
+                    process_jobs()
+            except Exception as e:
+                logger.warning(f"Traitement des travaux de récurrence échoué: {e}")
+
+    _wakeup.set()  # Reprendre dès le démarrage les travaux laissés en attente
+    threading.Thread(target=run, name="recurrence-jobs", daemon=True).start()
+
+
+def notify_worker():
+    """Réveille le thread de traitement (démarré si besoin) après l'ajout d'un travail"""
+    if not current_app.config.get("RECURRENCE_JOBS_ASYNC", True):
+        return
+    start_recurrence_worker(current_app._get_current_object())
+    _wakeup.set()
@@ -0,0 +1,233 @@
+"""
+(Re)chiffrement des colonnes EncryptedType : chiffre les valeurs encore en clair et rechiffre avec
+ENCRYPTION_KEY les valeurs chiffrées par une ancienne clé (ENCRYPTION_OLD_KEYS).
+
+Remplace les anciens scripts encrypt_* / fix_unencrypted_data* :
+  - parcours par plages de clés primaires (id > dernier id traité), un lot = une transaction courte ;
+  - progression enregistrée après chaque lot dans un fichier d'état, pour reprendre après interruption ;
+  - chiffrement Fernet réparti sur un pool de processus, lecture et écriture restant dans le processus principal ;
+  - écriture conditionnelle (UPDATE ... WHERE col = ancienne valeur) : une valeur modifiée entre-temps par
+    l'application (déjà chiffrée avec la clé principale) n'est pas écrasée, l'application reste en service.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import sqlalchemy as sa
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from flask import current_app
+
+from app import db
+from app.utils.encryption import ENCRYPTED_PREFIX, EncryptedType, encryption_keys
+
+# Compteurs d'un lot / d'une table
+STAT_KEYS = ("rows", "encrypted", "rotated", "current", "errors", "conflicts")
+
+# Clés du processus de travail (initialisées une fois par processus)
+_worker_primary = None
+_worker_fernet = None
+
+
+def encrypted_columns(metadata):
+    """Colonnes EncryptedType par table : {nom de table: [noms de colonnes]}"""
+    columns = {}
+    for table in metadata.sorted_tables:
+        names = [column.name for column in table.columns if isinstance(column.type, EncryptedType)]
+        if names:
+            columns[table.name] = names
+    return columns
+
+
+def key_fingerprint(key):
+    """Empreinte courte (non réversible) d'une clé, pour lier un fichier d'état à une clé principale"""
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def _init_worker(keys):
+    global _worker_primary, _worker_fernet
+    _worker_primary = Fernet(keys[0])
+    _worker_fernet = MultiFernet([Fernet(key) for key in keys])
+
+
+def _process_chunk(rows):
+    """Calcule les nouvelles valeurs d'un lot de lignes (id, valeur1, valeur2...).
+
+    Retourne (changements, compteurs) ; changements : liste de (index de colonne, id, ancienne, nouvelle).
+    """
+    changes = []
+    stats = dict.fromkeys(STAT_KEYS, 0)
+    stats["rows"] = len(rows)
+    for row_id, *values in rows:
+        for index, value in enumerate(values):
+            if not value:
+                continue
+            if not value.startswith(ENCRYPTED_PREFIX):
+                new_value = _worker_primary.encrypt(value.encode("utf-8")).decode("utf-8")
+                stats["encrypted"] += 1
+            else:
+                token = value.encode("utf-8")
+                try:
+                    _worker_primary.decrypt(token)
+                    stats["current"] += 1
+                    continue
+                except InvalidToken:
+                    pass
+                try:
+                    new_value = _worker_fernet.rotate(token).decode("utf-8")
+                    stats["rotated"] += 1
+                except InvalidToken:
+                    # Chiffré avec une clé inconnue : laissé tel quel
+                    stats["errors"] += 1
+                    continue
+            changes.append((index, row_id, value, new_value))
+    return changes, stats
+
+
+class _InlineExecutor:
+    """Exécution dans le processus courant (workers <= 1) avec l'interface de ProcessPoolExecutor"""
+
+    def __init__(self, keys):
+        _init_worker(keys)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self):
+        pass
+
+
+def load_state(path, fingerprint, restart=False):
+    """État de reprise {table: dernier id traité} ; ignoré s'il a été produit pour une autre clé principale"""
+    if restart or not path or not os.path.exists(path):
+        return {"key_fingerprint": fingerprint, "tables": {}}
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("key_fingerprint") != fingerprint:
+        return {"key_fingerprint": fingerprint, "tables": {}}
+    return state
+
+
+def save_state(path, state):
+    """Écrit l'état de façon atomique (fichier temporaire puis remplacement)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _write_changes(table, columns, changes):
+    """Applique les changements d'un lot en une transaction ; retourne le nombre de conflits"""
+    by_column = {}
+    for index, row_id, old_value, new_value in changes:
+        by_column.setdefault(columns[index], []).append({"_id": row_id, "_old": old_value, "_new": new_value})
+    conflicts = 0
+    with db.engine.begin() as connection:
+        for name, params in by_column.items():
+            column = table.c[name]
+            statement = (
+                table.update()
+                .where(table.c.id == sa.bindparam("_id"), column == sa.bindparam("_old"))
+                .values({name: sa.bindparam("_new")})
+            )
+            result = connection.execute(statement, params)
+            if result.rowcount >= 0:
+                conflicts += len(params) - result.rowcount
+    return conflicts
+
+
+def reencrypt(
+    tables=None, chunk_size=500, workers=None, state_path=None, restart=False, dry_run=False, log=lambda message: None
+):
+    """
+    Chiffre / rechiffre toutes les colonnes EncryptedType avec la clé principale.
+
+    Args:
+        tables: noms de tables à traiter (toutes les tables chiffrées par défaut)
+        chunk_size: nombre de lignes par lot (et par transaction)
+        workers: nombre de processus de chiffrement (nombre de CPU par défaut ; <= 1 : sans pool)
+        state_path: fichier d'état pour la reprise (instance/reencryption_state.json par défaut),
+            supprimé à la fin d'un parcours complet
+        restart: ignorer l'état enregistré et tout reparcourir
+        dry_run: compter sans rien écrire
+
+    Returns:
+        dict: compteurs par table (rows, encrypted, rotated, current, errors, conflicts)
+    """
+    keys = encryption_keys()
+    if not keys:
+        raise ValueError("ENCRYPTION_KEY n'est pas définie")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    state_path = state_path or os.path.join(current_app.instance_path, "reencryption_state.json")
+    state = load_state(state_path, key_fingerprint(keys[0]), restart=restart or dry_run)
+
+    selected = encrypted_columns(db.metadata)
+    if tables:
+        unknown = set(tables) - set(selected)
+        if unknown:
+            raise ValueError(f"Table(s) sans colonne chiffrée : {', '.join(sorted(unknown))}")
+        selected = {name: columns for name, columns in selected.items() if name in tables}
+
+    if not dry_run:
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+    if workers > 1:
+        # "spawn" : pas de fork d'un processus qui a déjà des threads (worker email, checkpoint WAL)
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(keys,))
+    else:
+        executor = _InlineExecutor(keys)
+    results = {}
+    try:
+        for name, columns in selected.items():
+            # Colonnes non typées : valeurs brutes (chiffrées ou non), sans passer par EncryptedType
+            table = sa.table(name, sa.column("id"), *(sa.column(column) for column in columns))
+            totals = results[name] = dict.fromkeys(STAT_KEYS, 0)
+            cursor = state["tables"].get(name, 0)
+            log(
+                f"{name} ({', '.join(columns)}) : reprise après l'id {cursor}"
+                if cursor
+                else f"{name} ({', '.join(columns)})"
+            )
+
+            pending = deque()
+            exhausted = False
+            while not exhausted or pending:
+                if not exhausted:
+                    with db.engine.connect() as connection:
+                        rows = connection.execute(
+                            sa.select(table).where(table.c.id > cursor).order_by(table.c.id).limit(chunk_size)
+                        ).all()
+                    if rows:
+                        cursor = rows[-1][0]
+                        pending.append((cursor, executor.submit(_process_chunk, [tuple(row) for row in rows])))
+                    else:
+                        exhausted = True
+
+                # Lots terminés écrits dans l'ordre (la progression enregistrée reste monotone)
+                while pending and (exhausted or len(pending) > workers * 2 or pending[0][1].done()):
+                    last_id, future = pending.popleft()
+                    changes, stats = future.result()
+                    if not dry_run:
+                        stats["conflicts"] = _write_changes(table, columns, changes) if changes else 0
+                        state["tables"][name] = last_id
+                        save_state(state_path, state)
+                    for key in STAT_KEYS:
+                        totals[key] += stats[key]
+            log(
+                f"  {totals['rows']} ligne(s) : {totals['encrypted']} chiffrée(s), {totals['rotated']} rechiffrée(s), "
+                f"{totals['current']} à jour, {totals['errors']} illisible(s), {totals['conflicts']} conflit(s)"
+            )
+    finally:
+        executor.shutdown()
+
+    # Parcours complet : l'état de reprise n'a plus d'objet, le prochain lancement revérifie tout
+    if not dry_run and os.path.exists(state_path):
+        os.remove(state_path)
+    return results
@@ -7,8 +7,11 @@ from app import db
 from app.models.client import Client
 from app.models.communication import Communication
 from app.models.project import Project
+from app.models.search import entity_search_filter, task_search_filter
 from app.models.task import Task
 from app.models.user import User
+from app.utils.cold_storage import thaw
+from app.utils.hot_queries import client_by_slug, project_by_slug, task_by_slug
 
 
 def get_client_by_id(client_id):
@@ -27,7 +30,7 @@ def get_client_by_slug_or_id(slug_or_id):
     except (ValueError, TypeError):
         pass
     # Sinon, recherche par slug
-    client = Client.query.filter_by(slug=slug_or_id).first()
+    client = db.session.scalars(client_by_slug(slug_or_id)).first()
     if not client:
         abort(404)
     if current_user.is_client() and not current_user.has_access_to_client(client.id):
@@ -56,7 +59,7 @@ def get_project_by_slug_or_id(slug_or_id):
     except (ValueError, TypeError):
         pass
     # Sinon, recherche par slug
-    project = Project.query.filter_by(slug=slug_or_id).first()
+    project = db.session.scalars(project_by_slug(slug_or_id)).first()
     if not project:
         abort(404)
     if current_user.is_client() and not current_user.has_access_to_client(project.client_id):
@@ -80,7 +83,17 @@ def get_task_by_slug_or_id(slug_or_id):
     except (ValueError, TypeError):
         pass
     # Sinon, recherche par slug
-    task = Task.query.filter_by(slug=slug_or_id).first()
+    task = db.session.scalars(task_by_slug(slug_or_id)).first()
+    if not task:
+        # Tâche archivée déplacée dans le stockage froid : restaurée à la demande, seulement si l'utilisateur
+        # a accès à son projet (sinon 404 sans écriture)
+        task_id = thaw(
+            slug_or_id,
+            can_access=lambda project: (
+                not current_user.is_client() or current_user.has_access_to_client(project.client_id)
+            ),
+        )
+        task = db.session.get(Task, task_id) if task_id else None
     if not task:
         abort(404)
     if current_user.is_client() and not current_user.has_access_to_client(task.project.client_id):
@@ -131,7 +144,13 @@ def apply_filters(query, model, filters):
 
     for field, value in filters.items():
         if value is not None:
-            if field == "search" and hasattr(model, "name"):
+            if field == "search" and model in (Client, Project):
+                query = query.filter(entity_search_filter(model, value))
+                filters_active = True
+            elif field == "search" and model is Task:
+                query = query.filter(task_search_filter(value))
+                filters_active = True
+            elif field == "search" and hasattr(model, "name"):
                 query = query.filter(model.name.ilike(f"%{value}%"))
                 filters_active = True
             elif field == "search" and hasattr(model, "title"):
@@ -1,12 +1,77 @@
 import re
 
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
 from unidecode import unidecode
 
+# Clé de Session.info : slugs attribués dans la transaction en cours (par table), pas encore en base
+_RESERVED_SLUGS_KEY = "reserved_slugs"
+
+
+def slugify(text):
+    """Convertit un texte en slug (minuscules, sans accents, mots séparés par des tirets)"""
+    # Convertir en minuscules et remplacer les caractères accentués
+    slug = unidecode(text.lower())
+
+    # Remplacer les espaces et caractères spéciaux par des tirets
+    slug = re.sub(r"[^a-z0-9]+", "-", slug)
+
+    # Supprimer les tirets au début et à la fin
+    return slug.strip("-")
+
+
+def _reserved_slugs(model_class):
+    """Slugs réservés dans la transaction en cours pour la table du modèle"""
+    from app import db
+
+    reservations = db.session.info.setdefault(_RESERVED_SLUGS_KEY, {})
+    return reservations.setdefault(model_class.__tablename__, set())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_reserved_slugs(session, transaction):
+    """Les réservations ne survivent pas à la transaction (commit, rollback ou fermeture)"""
+    if transaction.parent is None:
+        session.info.pop(_RESERVED_SLUGS_KEY, None)
+
+
+def _taken_slugs(base_slug, model_class, existing_id=None):
+    """Slugs déjà pris pour `base_slug` et ses variantes numérotées, en une seule requête.
+
+    Équivalent de `slug = base OR slug LIKE 'base-%'`, écrit en intervalle ('-' < '.') pour
+    profiter de l'index unique sur slug (SQLite n'indexe pas LIKE sensible à la casse).
+    """
+    query = model_class.query.filter(
+        or_(
+            model_class.slug == base_slug,
+            and_(model_class.slug > f"{base_slug}-", model_class.slug < f"{base_slug}."),
+        )
+    )
+    # Si on met à jour un objet existant, exclure son ID
+    if existing_id is not None:
+        query = query.filter(model_class.id != existing_id)
+    return {slug for (slug,) in query.with_entities(model_class.slug)} | _reserved_slugs(model_class)
+
+
+def _next_free_slug(base_slug, taken):
+    """Premier slug libre : base, puis base-1, base-2... (les trous sont réutilisés)"""
+    if base_slug not in taken:
+        return base_slug
+    suffix = re.compile(rf"^{re.escape(base_slug)}-(\d+)$")
+    used = {int(match.group(1)) for slug in taken if (match := suffix.match(slug))}
+    counter = 1
+    while counter in used:
+        counter += 1
+    return f"{base_slug}-{counter}"
+
 
 def generate_slug(text, model_class, existing_id=None):
     """
     Génère un slug unique à partir d'un texte.
 
+    Une seule requête par appel, quel que soit le nombre de doublons ; le slug retourné est
+    réservé jusqu'à la fin de la transaction, pour que les créations suivantes ne le reprennent pas.
+
     Args:
         text (str): Le texte à convertir en slug
         model_class: La classe du modèle pour vérifier l'unicité
@@ -15,36 +80,57 @@ def generate_slug(text, model_class, existing_id=None):
     Returns:
         str: Un slug unique
     """
-    # Convertir en minuscules et remplacer les caractères accentués
-    slug = unidecode(text.lower())
-
-    # Remplacer les espaces et caractères spéciaux par des tirets
-    slug = re.sub(r"[^a-z0-9]+", "-", slug)
+    base_slug = slugify(text)
+    slug = _next_free_slug(base_slug, _taken_slugs(base_slug, model_class, existing_id))
+    _reserved_slugs(model_class).add(slug)
+    return slug
 
-    # Supprimer les tirets au début et à la fin
-    slug = slug.strip("-")
 
-    # Vérifier si le slug existe déjà
-    base_slug = slug
-    counter = 1
+def generate_slugs(texts, model_class):
+    """
+    Génère des slugs uniques pour une création en masse (ex. occurrences d'une tâche récurrente).
 
-    while True:
-        # Construire la requête
-        query = model_class.query.filter_by(slug=slug)
+    Une requête par texte distinct, et non par objet : les slugs attribués sont réservés au fur et
+    à mesure, les doublons reçoivent les suffixes suivants.
 
-        # Si on met à jour un objet existant, exclure son ID
-        if existing_id is not None:
-            query = query.filter(model_class.id != existing_id)
+    Returns:
+        list[str]: Les slugs, dans l'ordre des textes
+    """
+    reserved = _reserved_slugs(model_class)
+    taken_by_base = {}
+    slugs = []
+    for text in texts:
+        base_slug = slugify(text)
+        if base_slug not in taken_by_base:
+            taken_by_base[base_slug] = _taken_slugs(base_slug, model_class)
+        taken = taken_by_base[base_slug]
+        slug = _next_free_slug(base_slug, taken)
+        taken.add(slug)
+        reserved.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def _slug_source_text(model_instance):
+    """Texte dont le slug est dérivé : `name` (clients, projets) ou `title` (tâches)"""
+    if hasattr(model_instance, "name"):
+        return model_instance.name
+    if hasattr(model_instance, "title"):
+        return model_instance.title
+    raise ValueError("Le modèle doit avoir un attribut 'name' ou 'title'")
 
-        # Vérifier si le slug existe
-        if not query.first():
-            break
 
-        # Si le slug existe, ajouter un numéro
-        slug = f"{base_slug}-{counter}"
-        counter += 1
+def slug_needs_update(model_instance):
+    """
+    Vrai si le slug est absent ou ne correspond plus au nom/titre actuel.
 
-    return slug
+    Sans requête : le slug est à jour tant qu'il vaut slugify(texte) ou slugify(texte)-N.
+    Un simple enregistrement sans renommage ne relance donc pas la génération.
+    """
+    if not model_instance.slug:
+        return True
+    base_slug = slugify(_slug_source_text(model_instance))
+    return re.fullmatch(rf"{re.escape(base_slug)}(-\d+)?", model_instance.slug) is None
 
 
 def update_slug(model_instance):
@@ -55,12 +141,11 @@ def update_slug(model_instance):
         model_instance: L'instance du modèle à mettre à jour
     """
     # Déterminer le texte source en fonction du type de modèle
-    if hasattr(model_instance, "name"):
-        text = model_instance.name
-    elif hasattr(model_instance, "title"):
-        text = model_instance.title
-    else:
-        raise ValueError("Le modèle doit avoir un attribut 'name' ou 'title'")
+    text = _slug_source_text(model_instance)
+
+    # Le slug actuel de l'instance (éventuellement réservé à sa création) ne la bloque pas elle-même
+    if model_instance.slug:
+        _reserved_slugs(type(model_instance)).discard(model_instance.slug)
 
     # Générer le nouveau slug
     model_instance.slug = generate_slug(text, type(model_instance), model_instance.id)
@@ -0,0 +1,68 @@
+"""
+Expressions SQL portables entre SQLite et PostgreSQL.
+
+Les fonctions de date diffèrent d'un dialecte à l'autre (strftime côté SQLite, to_char/date_trunc
+côté PostgreSQL) : on passe par des éléments compilés selon le dialecte plutôt que par func.strftime.
+"""
+
+from sqlalchemy import String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# Format de la clé texte retournée pour chaque unité de troncature
+SQLITE_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+POSTGRESQL_FORMATS = {"day": "YYYY-MM-DD", "month": "YYYY-MM", "year": "YYYY"}
+
+
+class truncate_date(FunctionElement):
+    """Tronque une date/datetime à l'unité donnée et retourne une clé texte triable.
+
+    Exemple : truncate_date(TimeEntry.created_at, "month") -> '2026-03'
+    """
+
+    type = String()
+    name = "truncate_date"
+    inherit_cache = True
+
+    def __init__(self, column, unit="month"):
+        if unit not in SQLITE_FORMATS:
+            raise ValueError(f"Unité de troncature non supportée: {unit}")
+        self.unit = unit
+        super().__init__(column)
+
+    # L'unité fait partie de la clé de cache de la requête compilée
+    _traverse_internals = FunctionElement._traverse_internals + [("unit", InternalTraversal.dp_string)]
+
+
+@compiles(truncate_date)
+def _truncate_date_sqlite(element, compiler, **kw):
+    (column,) = element.clauses
+    return f"strftime('{SQLITE_FORMATS[element.unit]}', {compiler.process(column, **kw)})"
+
+
+@compiles(truncate_date, "postgresql")
+def _truncate_date_postgresql(element, compiler, **kw):
+    (column,) = element.clauses
+    return (
+        f"to_char(date_trunc('{element.unit}', {compiler.process(column, **kw)}), '{POSTGRESQL_FORMATS[element.unit]}')"
+    )
+
+
+def insert_or_increment(connection, table, keys, increments, defaults=None):
+    """INSERT ... ON CONFLICT DO UPDATE qui ajoute `increments` à la ligne identifiée par `keys`.
+
+    `defaults` : valeurs des autres colonnes, utilisées seulement à l'insertion.
+    Syntaxe commune à SQLite (>= 3.24) et PostgreSQL ; la clé doit correspondre à une contrainte unique.
+    """
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(table).values(**keys, **increments, **(defaults or {}))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: table.c[name] + stmt.excluded[name] for name in increments},
+    )
+    connection.execute(stmt)
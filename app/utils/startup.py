@@ -0,0 +1,125 @@
+"""
+Profil de démarrage de l'application : "web" (serveur, tests) ou "cli" (commandes `flask`, cron).
+
+Le profil cli n'initialise pas ce qui ne sert qu'aux requêtes HTTP (connexion, CSRF, cache des cartes,
+réception des pièces jointes, préchargement des templates) et n'importe pas les blueprints : ils sont
+enregistrés au premier url_for() qui en a besoin (ex. lien d'une notification envoyée par une commande).
+Les modèles sont importés explicitement, les relations et les métadonnées des migrations restent complètes.
+Flask-Migrate (et alembic) n'est chargé qu'à l'exécution de `flask db ...` (LazyGroup) : ni les workers ni
+le cron ne l'utilisent.
+
+STARTUP_PROFILE force le profil ("web" ou "cli") ; sinon il est déduit de la commande `flask` en cours.
+`flask startup-profile` mesure un démarrage à froid (python -X importtime) dans un processus neuf.
+"""
+
+import importlib
+import os
+import re
+import subprocess
+import sys
+
+import click
+
+# Commandes `flask` qui utilisent l'application web complète
+WEB_COMMANDS = frozenset({"run", "shell", "routes"})
+
+# Blueprints dans leur ordre d'enregistrement (app.routes.<nom>, objet Blueprint du même nom)
+BLUEPRINTS = (
+    "auth",
+    "clients",
+    "projects",
+    "tasks",
+    "main",
+    "admin",
+    "communications",
+    "api",
+    "optimization",
+    "exports",
+)
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$")
+
+
+class LazyGroup(click.Group):
+    """Groupe de commandes chargé à son exécution : `flask --help` n'affiche que son aide courte.
+
+    load() retourne le vrai groupe click (et peut l'enregistrer à la place de celui-ci).
+    """
+
+    def __init__(self, name, load, **attrs):
+        super().__init__(name, **attrs)
+        self.load = load
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+
+def startup_profile(app):
+    """Profil de démarrage : STARTUP_PROFILE, sinon "cli" pour les commandes `flask` hors WEB_COMMANDS"""
+    profile = app.config.get("STARTUP_PROFILE")
+    if profile in ("web", "cli"):
+        return profile
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.info_name in WEB_COMMANDS:
+        return "web"
+    return "cli"
+
+
+def import_models():
+    """Importe tous les modules de app/models (mappers et tables déclarés sans passer par les routes)"""
+    models_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+    for filename in sorted(os.listdir(models_path)):
+        if filename.endswith(".py") and not filename.startswith("_"):
+            importlib.import_module(f"app.models.{filename[:-3]}")
+
+
+def register_blueprints(app):
+    for name in BLUEPRINTS:
+        module = importlib.import_module(f"app.routes.{name}")
+        app.register_blueprint(getattr(module, name))
+
+
+def defer_blueprints(app):
+    """Profil cli : enregistre les blueprints au premier url_for() vers une route encore inconnue"""
+
+    def register_and_retry(error, endpoint, values):
+        if BLUEPRINTS[0] in app.blueprints:
+            return None
+        register_blueprints(app)
+        return app.url_for(endpoint, **values)
+
+    app.url_build_error_handlers.append(register_and_retry)
+
+
+def measure_startup(config_name, profile):
+    """Démarrage à froid (import de app + create_app) dans un nouveau processus Python.
+
+    Retourne (durée totale en ms, imports) où imports liste (durée cumulée en ms, profondeur, module)
+    des imports de premier et second niveau, dans l'ordre de python -X importtime.
+    """
+    create = f"create_app({config_name!r})"
+    if profile == "cli":
+        # Même détection qu'une commande cron : un contexte click actif, hors WEB_COMMANDS
+        create = f"import click\nwith click.Context(click.Command('cron'), info_name='cron'):\n    {create}"
+    code = (
+        "import time\nstarted = time.perf_counter()\nfrom app import create_app\n"
+        f"{create}\nprint((time.perf_counter() - started) * 1000)"
+    )
+    env = {key: value for key, value in os.environ.items() if key != "STARTUP_PROFILE"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "échec du démarrage")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and len(match.group(2)) <= 2:
+            imports.append((int(match.group(1)) / 1000, len(match.group(2)) // 2, match.group(3)))
+    return float(result.stdout.strip().splitlines()[-1]), imports
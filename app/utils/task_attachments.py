@@ -1,21 +1,31 @@
 """
 Gestion sécurisée des pièces jointes des tâches.
 
-- Stockage dans une arborescence dérivée (hash task_id + salt), non devinable.
-- Fichiers stockés sous UUID (sans extension dans le nom) ; métadonnées dans manifest.json.
+- Stockage par contenu : chaque fichier est stocké une seule fois sous son empreinte SHA-256
+  (blobs/ab/abcdef...), partagé entre pièces jointes identiques avec comptage des références
+  (table attachment_blob) ; métadonnées en base (table task_attachment), identifiant public UUID.
+- Anciennes arborescences par tâche (hash task_id + salt) : lues en repli, migrées par import_manifests().
 - Validation : whitelist d’extensions + vérification des magic bytes.
 - Accès uniquement via les routes Flask (vérification d’accès à la tâche).
 """
 
 import hashlib
 import json
+import os
 import re
 import shutil
+import time
 import uuid
 from datetime import UTC, datetime
 from pathlib import Path
+from urllib.parse import quote
 
-from flask import current_app
+from flask import Request, current_app, request
+from werkzeug.utils import send_file
+
+from app import db
+from app.models.task import AttachmentBlob, Task, TaskAttachment
+from app.utils import cold_storage
 
 # Extensions autorisées (lowercase)
 ALLOWED_EXTENSIONS = frozenset({"csv", "pdf", "zip", "doc", "docx", "xls", "xlsx", "7z", "tar", "gz"})
@@ -35,7 +45,18 @@ _MAGIC_SIGNATURES = {
     "csv": None,  # Texte ; validé uniquement par extension + pas de binaire
 }
 
+# Nombre d'octets lus pour la vérification des magic bytes
+MAGIC_SIZE = 32
+
+# Ancien stockage des métadonnées (un fichier par tâche), lu uniquement par import_manifests()
 MANIFEST_FILENAME = "manifest.json"
+IMPORTED_MANIFEST_SUFFIX = ".imported"
+
+BLOBS_DIRNAME = "blobs"
+# Fichiers en cours de réception (même système de fichiers que blobs/ : os.replace atomique)
+TMP_DIRNAME = "tmp"
+# Âge minimal d'un fichier non référencé avant suppression par le ramasse-miettes (upload en cours)
+GC_GRACE_SECONDS = 3600
 
 
 def _get_base_dir():
@@ -52,15 +73,31 @@ def _task_dir_hash(task_id: int) -> str:
     return hashlib.sha256(data.encode()).hexdigest()[:32]
 
 
+def _task_dir(task_id: int) -> Path:
+    return _get_base_dir() / _task_dir_hash(task_id)
+
+
 def get_task_attachment_dir(task_id: int) -> Path:
-    """Retourne le répertoire des pièces jointes pour une tâche (créé si besoin)."""
-    base = _get_base_dir()
-    dir_name = _task_dir_hash(task_id)
-    path = base / dir_name
+    """Retourne l'ancien répertoire des pièces jointes d'une tâche (créé si besoin)."""
+    path = _task_dir(task_id)
     path.mkdir(parents=True, exist_ok=True)
     return path
 
 
+def _blob_path(sha256: str) -> Path:
+    return _get_base_dir() / BLOBS_DIRNAME / sha256[:2] / sha256
+
+
+def _store_blob(tmp_path: Path, sha256: str) -> None:
+    """Place un fichier reçu sous son empreinte, ou le supprime si ce contenu est déjà stocké."""
+    dest = _blob_path(sha256)
+    if dest.is_file():
+        tmp_path.unlink()
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, dest)
+
+
 def _load_manifest(task_dir: Path) -> dict:
     manifest_path = task_dir / MANIFEST_FILENAME
     if not manifest_path.exists():
@@ -72,12 +109,6 @@ def _load_manifest(task_dir: Path) -> dict:
         return {}
 
 
-def _save_manifest(task_dir: Path, manifest: dict) -> None:
-    manifest_path = task_dir / MANIFEST_FILENAME
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=0)
-
-
 def _allowed_file_extension(filename: str) -> str | None:
     """Retourne l’extension normalisée si elle est autorisée, sinon None."""
     ext = (Path(filename).suffix or "").lstrip(".").lower()
@@ -94,11 +125,6 @@ def _sanitize_filename(filename: str) -> str:
     return name[:200]
 
 
-def _read_magic(stream, size: int = 32) -> bytes:
-    stream.seek(0)
-    return stream.read(size)
-
-
 def _validate_magic(data: bytes, ext: str) -> bool:
     """Vérifie que les premiers octets correspondent au type attendu."""
     sigs = _MAGIC_SIGNATURES.get(ext)
@@ -117,90 +143,220 @@ def _validate_magic(data: bytes, ext: str) -> bool:
     return any(data.startswith(s) for s in sigs)
 
 
-def validate_file_upload(stream, filename: str) -> tuple[bool, str]:
-    """
-    Valide un fichier (extension + magic bytes).
-    Retourne (True, "") si OK, (False, message_erreur) sinon.
-    """
+def _validation_error(filename: str, size: int, magic: bytes) -> str:
+    """Message d'erreur de validation (extension, taille, magic bytes), ou "" si le fichier est accepté."""
     ext = _allowed_file_extension(filename)
     if not ext:
-        return False, "Type de fichier non autorisé. Autorisés : csv, pdf, zip, doc, docx, xls, xlsx, 7z, tar, gz."
-
+        return "Type de fichier non autorisé. Autorisés : csv, pdf, zip, doc, docx, xls, xlsx, 7z, tar, gz."
     max_size = current_app.config.get("TASK_ATTACHMENTS_MAX_FILE_SIZE", 25 * 1024 * 1024)
-    stream.seek(0, 2)
-    size = stream.tell()
-    stream.seek(0)
     if size > max_size:
-        return False, f"Fichier trop volumineux (max {max_size // (1024 * 1024)} Mo)."
+        return f"Fichier trop volumineux (max {max_size // (1024 * 1024)} Mo)."
     if size == 0:
-        return False, "Fichier vide."
-
-    magic = _read_magic(stream, 32)
+        return "Fichier vide."
     if not _validate_magic(magic, ext):
-        return False, "Le contenu du fichier ne correspond pas à son extension (fichier non autorisé ou corrompu)."
-    return True, ""
+        return "Le contenu du fichier ne correspond pas à son extension (fichier non autorisé ou corrompu)."
+    return ""
+
+
+class AttachmentUpload:
+    """
+    Fichier reçu écrit directement dans tmp/ du stockage des pièces jointes, en une seule passe :
+    empreinte SHA-256, taille et magic bytes (premier bloc) calculés au fil de l'écriture.
+
+    Dès que le premier bloc ou la taille rend le fichier invalide, la suite n'est plus écrite sur disque.
+    Utilisé comme flux de FileStorage par StreamingUploadRequest (écriture par le parseur multipart),
+    ou alimenté depuis un flux existant par from_stream().
+    """
+
+    def __init__(self, filename: str | None):
+        self.filename = filename or ""
+        self.size = 0
+        self.magic = b""
+        self.error = ""
+        self._digest = hashlib.sha256()
+        self._max_size = current_app.config.get("TASK_ATTACHMENTS_MAX_FILE_SIZE", 25 * 1024 * 1024)
+        tmp_dir = _get_base_dir() / TMP_DIRNAME
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.path = tmp_dir / f"{uuid.uuid4()}.part"
+        self._file = open(self.path, "w+b")
+
+    @classmethod
+    def from_stream(cls, stream, filename: str) -> "AttachmentUpload":
+        upload = cls(filename)
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(65536), b""):
+            upload.write(chunk)
+        return upload
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.error:
+            return len(data)
+        if len(self.magic) < MAGIC_SIZE:
+            self.magic += bytes(data[: MAGIC_SIZE - len(self.magic)])
+            if len(self.magic) == MAGIC_SIZE:
+                self.error = _validation_error(self.filename, self.size, self.magic)
+        if self.size > self._max_size:
+            self.error = _validation_error(self.filename, self.size, self.magic)
+        if not self.error:
+            self._file.write(data)
+            self._digest.update(data)
+        return len(data)
+
+    def finish(self) -> str:
+        """Termine la réception ; retourne le message d'erreur de validation ("" si accepté)."""
+        self._file.flush()
+        if not self.error:
+            self.error = _validation_error(self.filename, self.size, self.magic)
+        return self.error
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    # Interface fichier attendue par FileStorage / le parseur multipart (seek(0) après réception, read...)
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def close(self):
+        """Ferme le fichier ; supprime le fichier temporaire s'il n'a pas été déplacé dans blobs/."""
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class StreamingUploadRequest(Request):
+    """Requête Flask dont les fichiers envoyés aux routes d'upload de pièces jointes sont reçus
+    directement dans le stockage (AttachmentUpload) au lieu d'un fichier temporaire intermédiaire."""
+
+    STREAMED_ENDPOINTS = frozenset({"tasks.upload_task_attachments"})
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in self.STREAMED_ENDPOINTS:
+            return AttachmentUpload(filename)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
 
 
 def list_attachments(task_id: int) -> list[dict]:
-    """Liste les pièces jointes d’une tâche (id, name, size, uploaded_at)."""
-    task_dir = get_task_attachment_dir(task_id)
-    manifest = _load_manifest(task_dir)
-    out = []
-    for file_id, meta in manifest.items():
-        path = task_dir / file_id
-        if not path.is_file():
+    """Liste les pièces jointes d’une tâche (id, name, size, uploaded_at), en une requête."""
+    attachments = TaskAttachment.query.filter_by(task_id=task_id).order_by(
+        TaskAttachment.uploaded_at.desc(), TaskAttachment.id.desc()
+    )
+    return [attachment.to_dict() for attachment in attachments]
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_attachments(task_id: int, files) -> tuple[list[dict], list[str]]:
+    """
+    Enregistre les fichiers d'une requête : [(nom d'origine, flux)], flux AttachmentUpload de préférence
+    (déjà reçu et haché) ou flux quelconque (recopié en une passe).
+
+    Les fichiers valides sont déplacés dans blobs/ (renommage atomique ; supprimés si ce contenu est déjà
+    stocké) et leurs métadonnées enregistrées en une seule transaction.
+    Retourne (pièces jointes enregistrées, [(nom, message d'erreur)] des fichiers refusés).
+    """
+    max_per_task = current_app.config.get("TASK_ATTACHMENTS_MAX_FILES_PER_TASK", 50)
+    remaining = max_per_task - TaskAttachment.query.filter_by(task_id=task_id).count()
+    accepted, errors = [], []
+    for original_filename, stream in files:
+        upload = (
+            stream if isinstance(stream, AttachmentUpload) else AttachmentUpload.from_stream(stream, original_filename)
+        )
+        error = upload.finish()
+        if not error and len(accepted) >= remaining:
+            error = f"Nombre maximum de pièces jointes atteint ({max_per_task}) pour cette tâche."
+        if error:
+            errors.append((original_filename, error))
+            upload.close()
             continue
-        out.append(
-            {
-                "id": file_id,
-                "name": meta.get("original_name", "fichier"),
-                "size": meta.get("size", 0),
-                "uploaded_at": meta.get("uploaded_at", ""),
-            }
+        accepted.append(
+            (
+                upload,
+                TaskAttachment(
+                    task_id=task_id,
+                    file_id=str(uuid.uuid4()),
+                    name=_sanitize_filename(original_filename),
+                    size=upload.size,
+                    sha256=upload.sha256,
+                ),
+            )
         )
-    out.sort(key=lambda x: x.get("uploaded_at", ""), reverse=True)
-    return out
+    if not accepted:
+        return [], errors
+
+    try:
+        db.session.add_all(attachment for _, attachment in accepted)
+        # Références enregistrées avant de toucher à blobs/ : les contenus ne peuvent plus être libérés
+        db.session.flush()
+        for upload, attachment in accepted:
+            _store_blob(upload.path, attachment.sha256)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        for upload, _ in accepted:
+            upload.close()
+
+    return [attachment.to_dict() for _, attachment in accepted], errors
 
 
 def save_attachment(task_id: int, stream, original_filename: str) -> dict:
     """
-    Enregistre une pièce jointe. Valide extension + magic, stocke sous UUID.
+    Enregistre une pièce jointe. Valide extension + magic, stocke le contenu sous son empreinte SHA-256.
     Retourne {"id": uuid, "name": ..., "size": ..., "uploaded_at": ...} ou lève ValueError.
     """
-    ok, err = validate_file_upload(stream, original_filename)
-    if not ok:
-        raise ValueError(err)
+    saved, errors = save_attachments(task_id, [(original_filename, stream)])
+    if errors:
+        raise ValueError(errors[0][1])
+    return saved[0]
 
-    max_per_task = current_app.config.get("TASK_ATTACHMENTS_MAX_FILES_PER_TASK", 50)
-    task_dir = get_task_attachment_dir(task_id)
-    manifest = _load_manifest(task_dir)
-    if len(manifest) >= max_per_task:
-        raise ValueError(f"Nombre maximum de pièces jointes atteint ({max_per_task}) pour cette tâche.")
-
-    file_id = str(uuid.uuid4())
-    stream.seek(0, 2)
-    size = stream.tell()
-    stream.seek(0)
-
-    dest = task_dir / file_id
-    with open(dest, "wb") as f:
-        chunk_size = 65536
-        while True:
-            chunk = stream.read(chunk_size)
-            if not chunk:
-                break
-            f.write(chunk)
-
-    safe_name = _sanitize_filename(original_filename)
-    now = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
-    manifest[file_id] = {
-        "original_name": safe_name,
-        "size": size,
-        "uploaded_at": now,
-    }
-    _save_manifest(task_dir, manifest)
 
-    return {"id": file_id, "name": safe_name, "size": size, "uploaded_at": now}
+def _get_attachment(task_id: int, file_id: str) -> TaskAttachment | None:
+    """Ligne de la pièce jointe si file_id est un UUID appartenant à la tâche (pas de path traversal)."""
+    try:
+        uuid.UUID(file_id)
+    except (ValueError, TypeError):
+        return None
+    return TaskAttachment.query.filter_by(task_id=task_id, file_id=file_id).first()
+
+
+def store_legacy_file(attachment: TaskAttachment) -> None:
+    """Place sous son empreinte le fichier d'une pièce jointe encore dans l'ancien stockage par tâche.
+
+    Appelé avant d'en faire une copie (TaskAttachment.copy) : le repli de _attachment_file cherche
+    le fichier sous task_id/file_id, que la copie ne partage pas.
+    """
+    if _blob_path(attachment.sha256).is_file():
+        return
+    path = _task_dir(attachment.task_id) / attachment.file_id
+    if path.is_file():
+        _store_blob(path, attachment.sha256)
+
+
+def _attachment_file(attachment: TaskAttachment) -> Path | None:
+    path = _blob_path(attachment.sha256)
+    if not path.is_file():
+        # Ancien stockage par tâche, pas encore migré (flask import-attachment-manifests)
+        path = _task_dir(attachment.task_id) / attachment.file_id
+        if not path.is_file():
+            return None
+    return path.resolve()
 
 
 def get_attachment_path_and_name(task_id: int, file_id: str) -> tuple[Path, str] | None:
@@ -208,45 +364,256 @@ def get_attachment_path_and_name(task_id: int, file_id: str) -> tuple[Path, str]
     Retourne (chemin absolu, nom d’affichage) si le fichier existe et appartient à la tâche.
     Sinon None. Vérifie que file_id est un UUID pour éviter path traversal.
     """
-    try:
-        uuid.UUID(file_id)
-    except (ValueError, TypeError):
+    attachment = _get_attachment(task_id, file_id)
+    if attachment is None:
         return None
-    task_dir = get_task_attachment_dir(task_id)
-    manifest = _load_manifest(task_dir)
-    if file_id not in manifest:
+    path = _attachment_file(attachment)
+    if path is None:
         return None
-    path = task_dir / file_id
-    if not path.is_file():
+    return (path, attachment.name)
+
+
+def send_attachment(task_id: int, file_id: str):
+    """
+    Réponse de téléchargement d'une pièce jointe (None si introuvable), à appeler après le contrôle d'accès.
+
+    ETag fort = empreinte SHA-256 du contenu (If-None-Match -> 304). Selon TASK_ATTACHMENTS_DELIVERY :
+      - "app" : fichier envoyé par l'application (wsgi.file_wrapper, soit os.sendfile sous gunicorn),
+        requêtes Range (206) et If-Range prises en charge ;
+      - "x-sendfile" (Apache, lighttpd) ou "x-accel-redirect" (nginx) : en-tête seul, le proxy
+        lit le fichier et gère lui-même les Range ; le worker est libéré immédiatement.
+    """
+    attachment = _get_attachment(task_id, file_id)
+    if attachment is None:
+        return None
+    path = _attachment_file(attachment)
+    if path is None:
         return None
-    return (path.resolve(), manifest[file_id].get("original_name", "fichier"))
+
+    delivery = current_app.config.get("TASK_ATTACHMENTS_DELIVERY", "app")
+    proxied = delivery in ("x-sendfile", "x-accel-redirect")
+    environ = request.environ
+    if proxied:
+        # Les plages sont servies par le proxy : ne pas produire de 206 sans corps
+        environ = {key: value for key, value in environ.items() if key not in ("HTTP_RANGE", "HTTP_IF_RANGE")}
+    response = send_file(
+        path,
+        environ,
+        mimetype="application/octet-stream",
+        as_attachment=True,
+        download_name=attachment.name,
+        etag=attachment.sha256,
+        last_modified=attachment.uploaded_at.replace(tzinfo=UTC) if attachment.uploaded_at else None,
+        use_x_sendfile=proxied,
+        response_class=current_app.response_class,
+    )
+    # Fichier soumis à contrôle d'accès : pas de cache partagé
+    response.cache_control.private = True
+    if delivery == "x-accel-redirect" and "X-Sendfile" in response.headers:
+        relative = path.relative_to(_get_base_dir().resolve()).as_posix()
+        prefix = current_app.config.get("TASK_ATTACHMENTS_ACCEL_PREFIX", "/protected-attachments/")
+        response.headers["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{quote(relative)}"
+        del response.headers["X-Sendfile"]
+    return response
+
+
+def _release_blobs(digests) -> tuple[int, int]:
+    """Supprime les contenus sans référence (ligne puis fichier) ; retourne (nombre, octets libérés)."""
+    table = AttachmentBlob.__table__
+    released = freed = 0
+    for sha256 in digests:
+        # Suppression conditionnelle : un contenu référencé à nouveau entre-temps est conservé
+        size = db.session.execute(
+            table.delete().where(table.c.sha256 == sha256, table.c.ref_count <= 0).returning(table.c.size)
+        ).scalar()
+        if size is None:
+            continue
+        path = _blob_path(sha256)
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            current_app.logger.warning("Could not remove attachment blob %s: %s", path, e)
+        released += 1
+        freed += size
+    db.session.commit()
+    return released, freed
+
+
+def release_unreferenced_blobs() -> tuple[int, int]:
+    """Supprime tous les contenus dont le compteur de références est tombé à zéro."""
+    digests = db.session.execute(db.select(AttachmentBlob.sha256).where(AttachmentBlob.ref_count <= 0)).scalars()
+    return _release_blobs(list(digests))
 
 
 def delete_attachment(task_id: int, file_id: str) -> bool:
-    """Supprime une pièce jointe. Retourne True si supprimée."""
-    try:
-        uuid.UUID(file_id)
-    except (ValueError, TypeError):
-        return False
-    task_dir = get_task_attachment_dir(task_id)
-    manifest = _load_manifest(task_dir)
-    if file_id not in manifest:
+    """Supprime une pièce jointe (décrémente les références du contenu, supprimé s'il n'est plus utilisé).
+
+    Retourne True si supprimée.
+    """
+    attachment = _get_attachment(task_id, file_id)
+    if attachment is None:
         return False
-    path = task_dir / file_id
-    if path.is_file():
-        path.unlink()
-    del manifest[file_id]
-    _save_manifest(task_dir, manifest)
+    sha256 = attachment.sha256
+    db.session.delete(attachment)
+    db.session.flush()
+    _release_blobs([sha256])
     return True
 
 
 def delete_task_attachments_folder(task_id: int) -> None:
-    """Supprime tout le répertoire des pièces jointes d'une tâche (à appeler lors de la suppression de la tâche)."""
-    base = _get_base_dir()
-    dir_name = _task_dir_hash(task_id)
-    path = base / dir_name
+    """Libère les contenus d'une tâche supprimée et son éventuel ancien répertoire.
+
+    Les références sont décrémentées lors de la suppression de la tâche (événements de TaskAttachment).
+    """
+    release_unreferenced_blobs()
+    path = _task_dir(task_id)
     if path.is_dir():
         try:
             shutil.rmtree(path)
         except OSError as e:
             current_app.logger.warning("Could not remove task attachments folder %s: %s", path, e)
+
+
+def collect_garbage(grace_seconds: int = GC_GRACE_SECONDS) -> dict:
+    """
+    Ramasse-miettes du stockage par contenu.
+
+    1. recalcule les compteurs de références à partir de task_attachment (corrige une dérive,
+       ex. suppression de tâches par ON DELETE CASCADE hors ORM) ;
+    2. supprime les contenus sans référence ;
+    3. supprime les fichiers de blobs/ et tmp/ inconnus de la base, plus anciens que grace_seconds.
+
+    Returns:
+        dict: recounted, released, orphans, freed_bytes
+    """
+    table = AttachmentBlob.__table__
+    references = (
+        db.select(db.func.count(TaskAttachment.id)).where(TaskAttachment.sha256 == table.c.sha256).scalar_subquery()
+    )
+    if cold_storage.is_ready():
+        # Pièces jointes des tâches déplacées dans le stockage froid : toujours référencées
+        cold_attachments = cold_storage.cold_table(TaskAttachment)
+        references = (
+            references
+            + db.select(db.func.count(cold_attachments.c.id))
+            .where(cold_attachments.c.sha256 == table.c.sha256)
+            .scalar_subquery()
+        )
+    recounted = db.session.execute(
+        table.update().where(table.c.ref_count != references).values(ref_count=references)
+    ).rowcount
+    db.session.commit()
+
+    released, freed = release_unreferenced_blobs()
+
+    orphans = 0
+    base = _get_base_dir()
+    known = set(db.session.execute(db.select(AttachmentBlob.sha256)).scalars())
+    cutoff = time.time() - grace_seconds
+    candidates = [*(base / BLOBS_DIRNAME).glob("*/*"), *(base / TMP_DIRNAME).glob("*")]
+    for path in candidates:
+        if path.parent.parent.name == BLOBS_DIRNAME and path.name in known:
+            continue
+        try:
+            stat = path.stat()
+            if stat.st_mtime >= cutoff:
+                continue
+            path.unlink()
+        except OSError:
+            continue
+        orphans += 1
+        freed += stat.st_size
+    return {"recounted": recounted, "released": released, "orphans": orphans, "freed_bytes": freed}
+
+
+def disk_usage() -> dict:
+    """
+    Rapport d'occupation : taille logique (somme des pièces jointes) et taille stockée (contenus uniques).
+
+    Returns:
+        dict: attachments, logical_bytes, blobs, shared_blobs, stored_bytes, saved_bytes
+    """
+    attachments, logical = db.session.execute(
+        db.select(db.func.count(TaskAttachment.id), db.func.coalesce(db.func.sum(TaskAttachment.size), 0))
+    ).one()
+    if cold_storage.is_ready():
+        cold_attachments = cold_storage.cold_table(TaskAttachment)
+        cold_count, cold_logical = db.session.execute(
+            db.select(db.func.count(cold_attachments.c.id), db.func.coalesce(db.func.sum(cold_attachments.c.size), 0))
+        ).one()
+        attachments, logical = attachments + cold_count, logical + cold_logical
+    blobs, shared, stored = db.session.execute(
+        db.select(
+            db.func.count(AttachmentBlob.sha256),
+            db.func.count(AttachmentBlob.sha256).filter(AttachmentBlob.ref_count > 1),
+            db.func.coalesce(db.func.sum(AttachmentBlob.size), 0),
+        )
+    ).one()
+    return {
+        "attachments": attachments,
+        "logical_bytes": int(logical),
+        "blobs": blobs,
+        "shared_blobs": shared,
+        "stored_bytes": int(stored),
+        "saved_bytes": int(logical) - int(stored),
+    }
+
+
+def import_manifests() -> tuple[int, int]:
+    """
+    Migre l'ancien stockage par tâche (migration unique, relançable sans doublon) :
+    importe en base les manifest.json, puis déplace les fichiers dans le stockage par contenu.
+
+    Chaque manifest importé est renommé en manifest.json.imported (conservé comme sauvegarde).
+    Les entrées dont le fichier a disparu sont ignorées ; le sha256 est calculé depuis le fichier.
+
+    Returns:
+        tuple: (pièces jointes importées, entrées ignorées)
+    """
+    base = _get_base_dir()
+    if not base.is_dir():
+        return 0, 0
+    # Répertoires non réversibles (hash + salt) : correspondance calculée depuis les ids de tâches
+    task_ids = {_task_dir_hash(task_id): task_id for (task_id,) in db.session.query(Task.id)}
+    known = dict(db.session.query(TaskAttachment.file_id, TaskAttachment.sha256))
+    imported = skipped = 0
+    for task_dir in sorted(base.iterdir()):
+        task_id = task_ids.get(task_dir.name)
+        if task_id is None:
+            if (task_dir / MANIFEST_FILENAME).is_file():
+                current_app.logger.warning("Attachment manifest without task: %s", task_dir / MANIFEST_FILENAME)
+            continue
+        manifest_path = task_dir / MANIFEST_FILENAME
+        for file_id, meta in _load_manifest(task_dir).items():
+            try:
+                path = task_dir / str(uuid.UUID(file_id))
+            except ValueError:
+                skipped += 1
+                continue
+            if file_id in known or not path.is_file():
+                skipped += 1
+                continue
+            try:
+                uploaded_at = datetime.strptime(meta.get("uploaded_at", ""), "%Y-%m-%dT%H:%M:%SZ")
+            except ValueError:
+                uploaded_at = datetime.fromtimestamp(path.stat().st_mtime, UTC).replace(tzinfo=None)
+            attachment = TaskAttachment(
+                task_id=task_id,
+                file_id=file_id,
+                name=meta.get("original_name") or "fichier",
+                size=path.stat().st_size,
+                sha256=_file_sha256(path),
+                uploaded_at=uploaded_at,
+            )
+            db.session.add(attachment)
+            known[file_id] = attachment.sha256
+            imported += 1
+        db.session.commit()
+        if manifest_path.is_file():
+            os.replace(manifest_path, f"{manifest_path}{IMPORTED_MANIFEST_SUFFIX}")
+
+        # Fichiers déjà référencés en base : déplacés sous leur empreinte (doublons supprimés)
+        for path in task_dir.iterdir():
+            if path.name in known:
+                _store_blob(path, known[path.name])
+    return imported, skipped
@@ -0,0 +1,53 @@
+"""
+Cache des fragments HTML des cartes du kanban (components/kanban_card.html).
+
+Chaque carte rendue est conservée dans card_cache (instance Flask-Caching dédiée, voir create_app) sous
+la clé de la tâche, avec sa version : (updated_at, nombre de pièces jointes, nom du projet et du client).
+Une version différente (tâche modifiée, y compris par un UPDATE en masse qui met à jour updated_at)
+provoque un nouveau rendu : une entrée périmée n'est jamais servie, même partagée entre processus.
+Les écritures ORM sur une tâche suppriment aussi son entrée (mémoire libérée sans attendre l'éviction).
+
+Une entrée regroupe les variantes de la carte (colonne, actions affichées, occurrence à venir) : le rendu
+ne dépend pas du rôle de l'utilisateur, seulement de ces paramètres.
+"""
+
+from flask import current_app
+from markupsafe import Markup
+from sqlalchemy import event
+
+from app import card_cache
+from app.models.task import Task
+
+
+def _cache_key(task_id):
+    return f"task:{task_id}"
+
+
+def kanban_card(task, column, show_actions=True, today=None, attachment_counts=None):
+    """HTML de la carte d'une tâche (global Jinja), depuis le cache si la tâche n'a pas changé."""
+    is_upcoming = bool(today and task.scheduled_for and task.scheduled_for > today)
+    attachment_count = attachment_counts.get(task.id, 0) if attachment_counts else 0
+    version = (task.updated_at, attachment_count, task.project.name, task.project.client.name)
+    variant = (column, bool(show_actions), is_upcoming)
+
+    key = _cache_key(task.id)
+    entry = card_cache.get(key)
+    if entry is None or entry[0] != version:
+        entry = (version, {})
+    html = entry[1].get(variant)
+    if html is None:
+        macro = current_app.jinja_env.get_template("components/kanban_card.html").module.kanban_card
+        html = str(macro(task, column, show_actions, is_upcoming, attachment_count))
+        entry[1][variant] = html
+        card_cache.set(key, entry)
+    return Markup(html)
+
+
+def invalidate(task_id):
+    card_cache.delete(_cache_key(task_id))
+
+
+@event.listens_for(Task, "after_update")
+@event.listens_for(Task, "after_delete")
+def _invalidate_task_card(mapper, connection, target):
+    invalidate(target.id)
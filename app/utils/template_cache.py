@@ -0,0 +1,42 @@
+"""
+Cache du bytecode des templates Jinja et préchargement au démarrage.
+
+Jinja compile chaque template (source -> code Python) à son premier rendu dans un processus. Le
+bytecode est conservé dans JINJA_BYTECODE_CACHE_DIR (défaut : instance/jinja_cache) : un processus qui
+redémarre (gunicorn --max-requests) le recharge au lieu de recompiler. Les entrées sont associées à
+l'empreinte de la source : un template modifié est recompilé, sans purge manuelle.
+
+Avec TEMPLATE_WARMUP, create_app charge tous les templates : avec gunicorn --preload, c'est fait une
+fois dans le processus maître et les workers (même recyclés) héritent des templates compilés.
+`flask precompile-templates` remplit le cache sans démarrer le serveur.
+"""
+
+import logging
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+
+def init_template_cache(app):
+    """Branche le cache de bytecode sur l'environnement Jinja de l'application (si le dossier est utilisable)"""
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if cache_dir is None:
+        cache_dir = os.path.join(app.instance_path, "jinja_cache")
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Cache du bytecode des templates désactivé ({cache_dir}): {e}")
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def precompile_templates(app):
+    """Charge (compile ou relit depuis le cache de bytecode) tous les templates ; retourne leur nombre"""
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith((".html", ".txt")))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
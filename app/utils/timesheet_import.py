@@ -0,0 +1,343 @@
+"""
+Import en masse de feuilles de temps (CSV ou JSON) : tâches, saisies de temps et crédits.
+
+Le fichier est lu en flux (ligne par ligne pour le CSV, objet par objet pour le JSON), validé par lots
+puis inséré par insertions groupées, une transaction par lot. Le crédit restant des projets et le temps
+passé des tâches sont mis à jour une fois par lot et non à chaque ligne ; les notifications e-mail
+sont désactivées par défaut.
+
+Format d'une ligne (colonnes CSV ou clés JSON) :
+  type         "time" (défaut) ou "credit"
+  project      slug ou identifiant du projet (obligatoire)
+  task         titre de la tâche (obligatoire pour "time", créée si absente du projet)
+  user         e-mail de l'utilisateur (obligatoire pour "time")
+  minutes      durée en minutes (ou `hours` en heures décimales)
+  date         date ou date-heure ISO (défaut : maintenant)
+  description  description de la saisie, ou note du crédit
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import UTC, datetime
+
+from sqlalchemy import bindparam, func, insert, or_
+
+from app import db
+from app.models.project import CreditLog, Project
+from app.models.task import Task, TimeEntry, apply_time_rollup_totals
+from app.models.user import User
+from app.utils.slug_utils import generate_slugs
+
+IMPORT_BATCH_SIZE = 1000
+
+# Nombre maximal d'erreurs de validation conservées dans le rapport
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_EXTENSIONS = ("csv", "json", "jsonl", "ndjson")
+
+
+def iter_csv_records(text_stream):
+    """Lit un CSV (séparateur « ; » ou « , ») ligne par ligne ; produit (numéro de ligne, dict)"""
+    first_line = text_stream.readline()
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    header = next(csv.reader([first_line], delimiter=delimiter), [])
+    reader = csv.DictReader(text_stream, fieldnames=[name.strip().lstrip("﻿") for name in header], delimiter=delimiter)
+    for record in reader:
+        yield reader.line_num + 1, record
+
+
+def iter_json_records(text_stream, chunk_size=64 * 1024):
+    """Lit un tableau JSON ou du JSON Lines objet par objet, sans charger le fichier ; produit (rang, dict)"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    index = 0
+    eof = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,[]")
+        if not buffer:
+            if eof:
+                return
+            chunk = text_stream.read(chunk_size)
+            eof = not chunk
+            buffer = chunk.lstrip("﻿") if index == 0 else chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"JSON invalide après l'enregistrement {index}") from None
+            # Objet incomplet : lire la suite
+            chunk = text_stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        index += 1
+        buffer = buffer[end:]
+        yield index, obj
+
+
+def iter_records(binary_stream, filename):
+    """Choisit le lecteur selon l'extension du fichier (csv, json, jsonl, ndjson)"""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension not in IMPORT_EXTENSIONS:
+        raise ValueError(f"Format non pris en charge : .{extension} (attendu : {', '.join(IMPORT_EXTENSIONS)})")
+    text_stream = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    if extension == "csv":
+        return iter_csv_records(text_stream)
+    return iter_json_records(text_stream)
+
+
+def _parse_record(record):
+    """Valide et normalise une ligne ; lève ValueError avec un message lisible"""
+    if not isinstance(record, dict):
+        raise ValueError("enregistrement attendu sous forme d'objet")
+    record = {
+        str(key).strip().lower(): value.strip() if isinstance(value, str) else value for key, value in record.items()
+    }
+
+    kind = record.get("type") or "time"
+    if kind not in ("time", "credit"):
+        raise ValueError(f"type inconnu : {kind}")
+
+    project = record.get("project") or record.get("project_id")
+    if project in (None, ""):
+        raise ValueError("projet manquant")
+
+    try:
+        if record.get("minutes") not in (None, ""):
+            minutes = int(record["minutes"])
+        elif record.get("hours") not in (None, ""):
+            minutes = round(float(str(record["hours"]).replace(",", ".")) * 60)
+        else:
+            raise ValueError("durée manquante (minutes ou hours)")
+    except (TypeError, ValueError) as e:
+        raise ValueError(str(e) if "manquante" in str(e) else "durée invalide") from None
+    if minutes <= 0 and kind == "time":
+        raise ValueError("durée nulle ou négative")
+
+    created_at = datetime.now(UTC)
+    if record.get("date"):
+        try:
+            created_at = datetime.fromisoformat(str(record["date"]))
+        except ValueError:
+            raise ValueError(f"date invalide : {record['date']}") from None
+
+    parsed = {
+        "type": kind,
+        "project": str(project),
+        "task": record.get("task") or None,
+        "user": (record.get("user") or "").lower() or None,
+        "minutes": minutes,
+        "created_at": created_at,
+        "description": record.get("description") or record.get("note") or None,
+    }
+    if kind == "time" and not parsed["task"]:
+        raise ValueError("tâche manquante")
+    if kind == "time" and not parsed["user"]:
+        raise ValueError("utilisateur manquant")
+    if parsed["task"] and len(parsed["task"]) > Task.title.type.length:
+        raise ValueError("titre de tâche trop long")
+    return parsed
+
+
+class _ImportContext:
+    """Caches des résolutions (projets, utilisateurs, tâches) partagés entre les lots"""
+
+    def __init__(self):
+        self.projects = {}  # slug ou id (str) -> (id, time_tracking_enabled)
+        self.users = {}  # e-mail -> id
+        self.tasks = {}  # (project_id, titre) -> id
+
+    def resolve_projects(self, keys):
+        missing = {key for key in keys if key not in self.projects}
+        if not missing:
+            return
+        ids = [int(key) for key in missing if key.isdigit()]
+        rows = db.session.execute(
+            db.select(Project.id, Project.slug, Project.time_tracking_enabled).where(
+                or_(Project.slug.in_(missing), Project.id.in_(ids))
+            )
+        )
+        for project_id, slug, tracking in rows:
+            self.projects[slug] = self.projects[str(project_id)] = (project_id, tracking)
+
+    def resolve_users(self, emails):
+        missing = {email for email in emails if email not in self.users}
+        if not missing:
+            return
+        rows = db.session.execute(db.select(User.id, func.lower(User.email)).where(func.lower(User.email).in_(missing)))
+        for user_id, email in rows:
+            self.users[email] = user_id
+
+    def resolve_tasks(self, keys, dry_run):
+        """Retrouve les tâches existantes par titre et crée celles qui manquent ; retourne le nombre créé"""
+        missing = {key for key in keys if key not in self.tasks}
+        if not missing:
+            return 0
+        rows = db.session.execute(
+            db.select(Task.id, Task.project_id, Task.title).where(
+                Task.project_id.in_({project_id for project_id, _ in missing}),
+                Task.title.in_({title for _, title in missing}),
+            )
+        )
+        for task_id, project_id, title in rows:
+            self.tasks.setdefault((project_id, title), task_id)
+
+        to_create = sorted(key for key in missing if key not in self.tasks)
+        if dry_run:
+            # Simulation : rien n'est écrit, les tâches sont seulement comptées
+            self.tasks.update(dict.fromkeys(to_create))
+            return len(to_create)
+
+        slugs = generate_slugs([title for _, title in to_create], Task)
+        created = [
+            Task(title=title, project_id=project_id, slug=slug)
+            for (project_id, title), slug in zip(to_create, slugs, strict=True)
+        ]
+        db.session.add_all(created)
+        db.session.flush()
+        for task in created:
+            self.tasks[(task.project_id, task.title)] = task.id
+        return len(created)
+
+
+def _import_batch(batch, context, stats, dry_run, notify):
+    """Valide puis insère un lot de lignes (une transaction)"""
+    parsed = []
+    for line, record in batch:
+        try:
+            parsed.append((line, _parse_record(record)))
+        except ValueError as e:
+            _add_error(stats, line, str(e))
+
+    context.resolve_projects({row["project"] for _, row in parsed})
+    context.resolve_users({row["user"] for _, row in parsed if row["user"]})
+
+    valid = []
+    for line, row in parsed:
+        if row["project"] not in context.projects:
+            _add_error(stats, line, f"projet introuvable : {row['project']}")
+        elif row["user"] and row["user"] not in context.users:
+            _add_error(stats, line, f"utilisateur introuvable : {row['user']}")
+        else:
+            row["project_id"], row["time_tracking"] = context.projects[row["project"]]
+            valid.append(row)
+
+    task_keys = {(row["project_id"], row["task"]) for row in valid if row["task"]}
+    stats["tasks_created"] += context.resolve_tasks(task_keys, dry_run)
+
+    time_rows, credit_rows = [], []
+    task_minutes = defaultdict(int)
+    credit_delta = defaultdict(int)
+    rollups = defaultdict(lambda: [0, 0])
+    notified = {}
+    for row in valid:
+        task_id = context.tasks.get((row["project_id"], row["task"])) if row["task"] else None
+        if row["type"] == "time":
+            user_id = context.users[row["user"]]
+            time_rows.append(
+                {
+                    "task_id": task_id,
+                    "user_id": user_id,
+                    "minutes": row["minutes"],
+                    "description": row["description"],
+                    "created_at": row["created_at"],
+                }
+            )
+            task_minutes[task_id] += row["minutes"]
+            if row["time_tracking"]:
+                credit_delta[row["project_id"]] -= row["minutes"]
+            totals = rollups[(row["created_at"].date(), row["project_id"], user_id)]
+            totals[0] += row["minutes"]
+            totals[1] += 1
+            notified[task_id] = user_id
+        else:
+            credit_rows.append(
+                {
+                    "project_id": row["project_id"],
+                    "task_id": task_id,
+                    "amount": row["minutes"],
+                    "note": row["description"],
+                    "created_at": row["created_at"],
+                }
+            )
+            credit_delta[row["project_id"]] += row["minutes"]
+
+    stats["time_entries"] += len(time_rows)
+    stats["credits"] += len(credit_rows)
+    if dry_run:
+        db.session.rollback()
+        return
+
+    try:
+        # Insertions groupées : pas d'événements ORM, les cumuls sont appliqués une fois pour le lot
+        if time_rows:
+            db.session.execute(insert(TimeEntry), time_rows)
+            apply_time_rollup_totals(db.session.connection(), {key: tuple(value) for key, value in rollups.items()})
+        if credit_rows:
+            db.session.execute(insert(CreditLog), credit_rows)
+        if task_minutes:
+            tasks = Task.__table__
+            db.session.execute(
+                tasks.update()
+                .where(tasks.c.id == bindparam("b_id"))
+                .values(actual_minutes=func.coalesce(tasks.c.actual_minutes, 0) + bindparam("b_minutes")),
+                [{"b_id": task_id, "b_minutes": minutes} for task_id, minutes in task_minutes.items()],
+            )
+        credit_updates = [{"b_id": project_id, "b_delta": delta} for project_id, delta in credit_delta.items() if delta]
+        if credit_updates:
+            projects = Project.__table__
+            db.session.execute(
+                projects.update()
+                .where(projects.c.id == bindparam("b_id"))
+                .values(remaining_credit=projects.c.remaining_credit + bindparam("b_delta")),
+                credit_updates,
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if notify:
+        _notify_tasks(notified, task_minutes)
+
+
+def _notify_tasks(notified, task_minutes):
+    """Une notification « temps enregistré » par tâche du lot (et non par ligne importée)"""
+    from app.utils.email import send_task_notification
+
+    for task_id, user_id in notified.items():
+        task = db.session.get(Task, task_id)
+        user = db.session.get(User, user_id)
+        summary = TimeEntry(task_id=task_id, user_id=user_id, minutes=task_minutes[task_id], description="Import")
+        send_task_notification(task, "time_logged", user, {"time_entry": summary}, notify_all=True)
+
+
+def _add_error(stats, line, message):
+    stats["errors"] += 1
+    if len(stats["error_details"]) < MAX_REPORTED_ERRORS:
+        stats["error_details"].append((line, message))
+
+
+def import_timesheet(records, batch_size=IMPORT_BATCH_SIZE, dry_run=False, notify=False, log=None):
+    """Importe des lignes (itérable de (numéro, dict)) par lots ; retourne les compteurs et les erreurs.
+
+    Les lignes invalides sont ignorées et signalées ; les lots déjà validés restent enregistrés
+    si un lot suivant échoue.
+    """
+    stats = {"rows": 0, "time_entries": 0, "credits": 0, "tasks_created": 0, "errors": 0, "error_details": []}
+    context = _ImportContext()
+    batch = []
+    for line, record in records:
+        batch.append((line, record))
+        stats["rows"] += 1
+        if len(batch) >= batch_size:
+            _import_batch(batch, context, stats, dry_run, notify)
+            batch = []
+            if log:
+                log(f"{stats['rows']} ligne(s) traitée(s)...")
+    if batch:
+        _import_batch(batch, context, stats, dry_run, notify)
+    return stats
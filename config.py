@@ -5,24 +5,64 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 
+def sqlite_engine_options(pool_size, busy_timeout_ms):
+    """Options du moteur SQLAlchemy pour une base SQLite fichier."""
+    return {
+        # Fichier local : pas de connexion "morte" à détecter, pool_pre_ping ne ferait qu'ajouter un SELECT 1
+        "pool_pre_ping": False,
+        "pool_recycle": 3600,
+        "pool_size": pool_size,
+        "max_overflow": 2,
+        "pool_timeout": 30,
+        "connect_args": {
+            "timeout": busy_timeout_ms / 1000,
+            "check_same_thread": False,  # False pour permettre les threads (Waitress, worker email)
+            "isolation_level": None,  # Mode autocommit pour éviter les deadlocks
+        },
+    }
+
+
+def engine_options(database_uri, pool_size, busy_timeout_ms):
+    """Options du moteur SQLAlchemy selon le dialecte de DATABASE_URL (SQLite ou PostgreSQL)."""
+    if database_uri.startswith("sqlite"):
+        return sqlite_engine_options(pool_size, busy_timeout_ms)
+    # PostgreSQL (postgresql+psycopg://...) : connexions réseau, pre_ping utile après un redémarrage du serveur
+    return {
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+        "pool_size": pool_size,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+    }
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "hard-to-guess-string"
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or "sqlite:///chronotrak.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Configuration du pool de connexions et timeouts pour SQLite
-    # SQLite thread-safe avec Waitress (4 threads) - Optimisé pour Python 3.13
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        "pool_pre_ping": True,
-        "pool_recycle": 300,
-        "pool_size": 10,  # Pool de connexions pour les threads
-        "max_overflow": 20,
-        "connect_args": {
-            "timeout": 30,
-            "check_same_thread": False,  # False pour permettre les threads
-            "isolation_level": None,  # Mode autocommit pour éviter les deadlocks
-        },
+    # Pool par processus (gunicorn prefork), dimensionné sur le nombre de threads du serveur
+    # (waitress --threads=4 ; 1 seul thread par worker gunicorn "sync" + worker email).
+    # Les moteurs sont recréés après fork (voir app/utils/db_optimization.py).
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+    # Checkpoint WAL en tâche de fond (secondes, 0 pour désactiver)
+    SQLITE_WAL_CHECKPOINT_INTERVAL = int(os.environ.get("SQLITE_WAL_CHECKPOINT_INTERVAL", "300"))
+    # PRAGMA appliqués à chaque nouvelle connexion (journal_mode, persistant, n'est appliqué qu'une fois)
+    SQLITE_PRAGMAS = {
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -64000,  # 64MB de cache
+        "synchronous": "NORMAL",  # Équilibre performance/sécurité (sûr en mode WAL)
+        "temp_store": "MEMORY",  # Stockage temporaire en mémoire
+        "mmap_size": 268435456,  # 256MB de mmap
+        "foreign_keys": "ON",  # Contraintes de clés étrangères
+        "secure_delete": "OFF",  # Performance vs sécurité
     }
+    SQLITE_JOURNAL_MODE = "WAL"
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, SQLITE_BUSY_TIMEOUT_MS)
+    # Vues en lecture seule (@read_only_db) : second moteur SQLite mode=ro, ou réplique PostgreSQL
+    DB_READ_ONLY_ROUTING = os.environ.get("DB_READ_ONLY_ROUTING", "true").lower() in ["true", "on", "1"]
+    SQLALCHEMY_READONLY_DATABASE_URI = os.environ.get("DATABASE_READ_URL")
     ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL")
     ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
     CREDIT_THRESHOLD = int(os.environ.get("CREDIT_THRESHOLD", "2"))
@@ -59,12 +99,37 @@ class Config:
             "ENCRYPTION_KEY doit être définie dans les variables d'environnement. "
             "Générez une clé avec: python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())'"
         )
+    # Anciennes clés (séparées par des virgules), acceptées en déchiffrement seulement : rotation sans
+    # interruption, `flask reencrypt` rechiffre ensuite les données avec ENCRYPTION_KEY
+    ENCRYPTION_OLD_KEYS = [key.strip() for key in os.environ.get("ENCRYPTION_OLD_KEYS", "").split(",") if key.strip()]
+    # Clé HMAC de l'index aveugle des commentaires (dérivée de ENCRYPTION_KEY si absente).
+    # La définir séparément permet de changer ENCRYPTION_KEY sans reconstruire l'index.
+    BLIND_INDEX_KEY = os.environ.get("BLIND_INDEX_KEY")
 
     # Configuration du cache
     CACHE_TYPE = "SimpleCache"  # Utilise le cache en mémoire
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes par défaut
     CACHE_THRESHOLD = 1000  # Nombre maximum d'éléments dans le cache
     CACHE_KEY_PREFIX = "chronotrak_"  # Préfixe pour les clés de cache
+    # Bytecode des templates Jinja (défaut : instance/jinja_cache, chaîne vide pour désactiver) et
+    # préchargement de tous les templates au démarrage (hors debug et tests)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get("JINJA_BYTECODE_CACHE_DIR")
+    TEMPLATE_WARMUP = os.environ.get("TEMPLATE_WARMUP", "true").lower() in ["true", "on", "1"]
+
+    # Cache des cartes du kanban (une entrée par tâche, même type de cache que ci-dessus)
+    TASK_CARD_CACHE_THRESHOLD = int(os.environ.get("TASK_CARD_CACHE_THRESHOLD", "5000"))
+    TASK_CARD_CACHE_TIMEOUT = int(os.environ.get("TASK_CARD_CACHE_TIMEOUT", "86400"))
+
+    # Profil de démarrage : "web", "cli" (sans extensions ni routes web) ou auto (déduit de la commande `flask`)
+    STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "auto")
+
+    # Occurrences des tâches récurrentes créées par un thread de fond ; false : `flask process-recurrence-jobs`
+    RECURRENCE_JOBS_ASYNC = os.environ.get("RECURRENCE_JOBS_ASYNC", "true").lower() in ["true", "on", "1"]
+
+    # Stockage froid : fichier SQLite attaché recevant les tâches archivées depuis plus de
+    # COLD_STORAGE_AFTER_MONTHS mois (`flask cold-storage`) ; désactivé si non défini
+    COLD_STORAGE_PATH = os.environ.get("COLD_STORAGE_PATH")
+    COLD_STORAGE_AFTER_MONTHS = int(os.environ.get("COLD_STORAGE_AFTER_MONTHS", "6"))
 
     # Pièces jointes des tâches (stockage fichier, hors web root)
     TASK_ATTACHMENTS_UPLOAD_FOLDER = os.environ.get("TASK_ATTACHMENTS_UPLOAD_FOLDER") or os.path.join(
@@ -72,6 +137,10 @@ class Config:
     )
     TASK_ATTACHMENTS_MAX_FILE_SIZE = int(os.environ.get("TASK_ATTACHMENTS_MAX_FILE_SIZE", 25)) * 1024 * 1024  # 25 Mo
     TASK_ATTACHMENTS_MAX_FILES_PER_TASK = int(os.environ.get("TASK_ATTACHMENTS_MAX_FILES_PER_TASK", 50))
+    # Remise des fichiers : "app" (envoi par l'application, Range/ETag), "x-sendfile" (Apache, lighttpd)
+    # ou "x-accel-redirect" (nginx : location interne pointant sur TASK_ATTACHMENTS_UPLOAD_FOLDER)
+    TASK_ATTACHMENTS_DELIVERY = os.environ.get("TASK_ATTACHMENTS_DELIVERY", "app").lower()
+    TASK_ATTACHMENTS_ACCEL_PREFIX = os.environ.get("TASK_ATTACHMENTS_ACCEL_PREFIX", "/protected-attachments/")
     # Salt pour dériver le chemin (ne pas exposer) ; défaut dérivé de SECRET_KEY si non défini
     TASK_ATTACHMENTS_PATH_SALT = os.environ.get("TASK_ATTACHMENTS_PATH_SALT") or "chronotrak_task_attachments_v1"
 
@@ -83,25 +152,28 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///test.db"
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, Config.DB_POOL_SIZE, Config.SQLITE_BUSY_TIMEOUT_MS
+    )
     LOGIN_RATE_LIMIT_ENABLED = False
+    SQLITE_WAL_CHECKPOINT_INTERVAL = 0
+    RECURRENCE_JOBS_ASYNC = False  # Les tests traitent la file explicitement (process_jobs)
+    JINJA_BYTECODE_CACHE_DIR = ""  # Pas de cache de bytecode partagé entre les exécutions des tests
+
+    # Matrice de tests : TEST_DATABASE_URL permet de cibler PostgreSQL (voir tests/conftest.py)
+    @classmethod
+    def init_app(cls, app):
+        test_database_url = os.environ.get("TEST_DATABASE_URL")
+        if test_database_url:
+            app.config["SQLALCHEMY_DATABASE_URI"] = test_database_url
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+                test_database_url, cls.DB_POOL_SIZE, cls.SQLITE_BUSY_TIMEOUT_MS
+            )
 
 
 class ProductionConfig(Config):
     DEBUG = False
 
-    # Configuration SQLite spécifique à la production avec Waitress - Optimisé Python 3.13
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        "pool_pre_ping": True,
-        "pool_recycle": 300,
-        "pool_size": 10,  # Pool de connexions pour les threads
-        "max_overflow": 20,
-        "connect_args": {
-            "timeout": 30,
-            "check_same_thread": False,  # False pour permettre les threads avec Waitress
-            "isolation_level": None,
-        },
-    }
-
     # En production, la clé de chiffrement DOIT être définie dans les variables d'environnement
     @classmethod
     def init_app(cls, app):
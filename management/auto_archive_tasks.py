@@ -29,27 +29,18 @@ def main():
 
     with app.app_context():
         try:
-            # Récupérer les tâches qui devraient être archivées
-            tasks_to_archive = Task.should_be_archived()
+            # Archivage par lots d'UPDATE (transactions courtes), rapport par projet en une requête
+            result = Task.archive_in_batches()
 
-            if not tasks_to_archive:
+            if not result["archived"]:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Aucune tâche à archiver.")
                 return
 
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {len(tasks_to_archive)} tâche(s) à archiver...")
-
-            # Archiver les tâches
-            archived_count = 0
-            for task in tasks_to_archive:
-                try:
-                    task.archive()
-                    archived_count += 1
-                    print(f"  ✓ Archivée: {task.title} (Projet: {task.project.name})")
-                except Exception as e:
-                    print(f"  ✗ Erreur lors de l'archivage de '{task.title}': {e}")
+            for project_name, count in result["by_project"]:
+                print(f"  ✓ {project_name} : {count} tâche(s)")
 
             print(
-                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {archived_count} tâche(s) archivée(s) avec succès."
+                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {result['archived']} tâche(s) archivée(s) avec succès."
             )
 
         except Exception as e:
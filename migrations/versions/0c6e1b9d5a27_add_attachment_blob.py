@@ -0,0 +1,93 @@
+"""add attachment_blob (content-addressed, reference-counted attachment storage)
+
+Revision ID: 0c6e1b9d5a27
+Revises: f4a9c2e7b813
+Create Date: 2026-10-19
+"""
+
+import hashlib
+from pathlib import Path
+
+import sqlalchemy as sa
+from alembic import op
+from flask import current_app
+
+# revision identifiers, used by Alembic.
+revision = "0c6e1b9d5a27"
+down_revision = "f4a9c2e7b813"
+branch_labels = None
+depends_on = None
+
+
+def _hash_missing_digests():
+    """Calcule l'empreinte des pièces jointes qui n'en ont pas, depuis leur fichier dans l'ancien stockage par tâche.
+
+    Échoue, avant toute modification, s'il reste des lignes sans fichier lisible : aucune métadonnée supprimée.
+    """
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, task_id, file_id FROM task_attachment WHERE sha256 IS NULL")).all()
+    if not rows:
+        return
+    base = current_app.config.get("TASK_ATTACHMENTS_UPLOAD_FOLDER")
+    salt = current_app.config.get("TASK_ATTACHMENTS_PATH_SALT", "chronotrak_task_attachments_v1")
+    digests, missing = {}, []
+    for row in rows:
+        # Répertoire de l'ancien stockage (app/utils/task_attachments.py, _task_dir_hash)
+        task_dir = hashlib.sha256(f"{row.task_id}:{salt}:task_attachments".encode()).hexdigest()[:32]
+        path = Path(base) / task_dir / row.file_id if base else None
+        if path is None or not path.is_file():
+            missing.append(row.id)
+            continue
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        digests[row.id] = digest.hexdigest()
+    if missing:
+        raise RuntimeError(
+            f"{len(missing)} pièce(s) jointe(s) sans empreinte et sans fichier dans TASK_ATTACHMENTS_UPLOAD_FOLDER "
+            f"(task_attachment.id : {', '.join(str(attachment_id) for attachment_id in missing)}). "
+            "Restaurez ces fichiers (ou supprimez ces lignes), puis relancez `flask db upgrade`."
+        )
+    conn.execute(
+        sa.text("UPDATE task_attachment SET sha256 = :sha256 WHERE id = :id"),
+        [{"id": attachment_id, "sha256": sha256} for attachment_id, sha256 in digests.items()],
+    )
+
+
+def upgrade():
+    _hash_missing_digests()
+
+    op.create_table(
+        "attachment_blob",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+    op.create_index("ix_attachment_blob_ref_count", "attachment_blob", ["ref_count"])
+
+    # Un contenu par empreinte déjà connue ; les fichiers restent dans l'ancienne arborescence
+    # (lus en repli) jusqu'à `flask import-attachment-manifests`
+    op.execute(
+        "INSERT INTO attachment_blob (sha256, size, ref_count, created_at) "
+        "SELECT sha256, MAX(size), COUNT(*), MIN(uploaded_at) FROM task_attachment "
+        "GROUP BY sha256"
+    )
+
+    with op.batch_alter_table("task_attachment", schema=None) as batch_op:
+        batch_op.alter_column("sha256", existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_foreign_key(
+            "fk_task_attachment_sha256_attachment_blob", "attachment_blob", ["sha256"], ["sha256"]
+        )
+        batch_op.create_index("ix_task_attachment_sha256", ["sha256"])
+
+
+def downgrade():
+    with op.batch_alter_table("task_attachment", schema=None) as batch_op:
+        batch_op.drop_index("ix_task_attachment_sha256")
+        batch_op.drop_constraint("fk_task_attachment_sha256_attachment_blob", type_="foreignkey")
+        batch_op.alter_column("sha256", existing_type=sa.String(length=64), nullable=True)
+    op.drop_index("ix_attachment_blob_ref_count", table_name="attachment_blob")
+    op.drop_table("attachment_blob")
@@ -0,0 +1,42 @@
+"""add recurrence_job (background materialization of recurring task occurrences)
+
+Revision ID: 3b7e5d1c9a62
+Revises: 0c6e1b9d5a27
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b7e5d1c9a62"
+down_revision = "0c6e1b9d5a27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "recurrence_job",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("series_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("replace", sa.Boolean(), nullable=False),
+        sa.Column("horizon_days", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("created_count", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["series_id"], ["task_recurrence_series.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_recurrence_job_status_id", "recurrence_job", ["status", "id"])
+    op.create_index("ix_recurrence_job_series_id", "recurrence_job", ["series_id", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_recurrence_job_series_id", table_name="recurrence_job")
+    op.drop_index("ix_recurrence_job_status_id", table_name="recurrence_job")
+    op.drop_table("recurrence_job")
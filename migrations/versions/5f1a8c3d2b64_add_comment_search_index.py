@@ -0,0 +1,30 @@
+"""add comment_search_index (key fingerprint of the comment blind index)
+
+Revision ID: 5f1a8c3d2b64
+Revises: 9d2c4b7e1f30
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5f1a8c3d2b64"
+down_revision = "9d2c4b7e1f30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Table vide : clé de l'index inconnue, le prochain `flask reencrypt` reconstruit l'index
+    op.create_table(
+        "comment_search_index",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("key_fingerprint", sa.String(length=16), nullable=True),
+        sa.Column("built_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("comment_search_index")
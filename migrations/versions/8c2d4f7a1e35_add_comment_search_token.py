@@ -0,0 +1,32 @@
+"""add comment_search_token (blind index of encrypted comments)
+
+Revision ID: 8c2d4f7a1e35
+Revises: d3f8a1c6b924
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c2d4f7a1e35"
+down_revision = "d3f8a1c6b924"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les jetons exigent la clé de l'application : le remplissage se fait avec scripts/index_comments.py
+    op.create_table(
+        "comment_search_token",
+        sa.Column("token", sa.String(length=32), nullable=False),
+        sa.Column("comment_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["comment_id"], ["comment.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("token", "comment_id"),
+    )
+    op.create_index("ix_comment_search_token_comment", "comment_search_token", ["comment_id"])
+
+
+def downgrade():
+    op.drop_index("ix_comment_search_token_comment", table_name="comment_search_token")
+    op.drop_table("comment_search_token")
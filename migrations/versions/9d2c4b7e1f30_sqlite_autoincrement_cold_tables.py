@@ -0,0 +1,78 @@
+"""sqlite autoincrement on tables moved to cold storage (ids never reused)
+
+Revision ID: 9d2c4b7e1f30
+Revises: 3b7e5d1c9a62
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9d2c4b7e1f30"
+down_revision = "3b7e5d1c9a62"
+branch_labels = None
+depends_on = None
+
+# Tables dont les lignes passent dans le stockage froid (app/utils/cold_storage.py) : sans AUTOINCREMENT,
+# SQLite réattribue un id supprimé s'il était le plus grand, et une tâche restaurée écraserait la nouvelle ligne
+TABLES = ("task", "checklist_item", "comment", "time_entry", "task_attachment", "search_document")
+
+# La recréation de search_document supprime ses triggers (synchronisation de search_fts)
+SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+)
+
+
+def _recreate(autoincrement):
+    conn = op.get_bind()
+    if conn.dialect.name != "sqlite":
+        # PostgreSQL : les séquences ne redonnent jamais un id
+        return
+    has_fts = "search_fts" in sa.inspect(conn).get_table_names()
+
+    # batch_alter_table recrée chaque table : DROP impossible si foreign_keys est ON (tables référencées)
+    conn.execute(sa.text("PRAGMA foreign_keys=OFF"))
+    try:
+        for table in TABLES:
+            with op.batch_alter_table(table, recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}):
+                pass
+        if has_fts:
+            for statement in SEARCH_TRIGGERS:
+                conn.execute(sa.text(statement))
+    finally:
+        conn.execute(sa.text("PRAGMA foreign_keys=ON"))
+    return conn
+
+
+def upgrade():
+    conn = _recreate(True)
+    if conn is None:
+        return
+
+    # Compteurs AUTOINCREMENT : au-delà des id déjà déplacés dans le stockage froid (s'il est attaché)
+    attached = {row[1] for row in conn.execute(sa.text("PRAGMA database_list"))}
+    for table in TABLES:
+        highest = f"(SELECT max(id) FROM main.{table})"
+        if (
+            "cold" in attached
+            and conn.execute(
+                sa.text("SELECT 1 FROM cold.sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}
+            ).first()
+        ):
+            highest = f"max(coalesce({highest}, 0), coalesce((SELECT max(id) FROM cold.{table}), 0))"
+        conn.execute(sa.text("DELETE FROM main.sqlite_sequence WHERE name = :name"), {"name": table})
+        conn.execute(
+            sa.text(f"INSERT INTO main.sqlite_sequence (name, seq) SELECT :name, coalesce({highest}, 0)"),
+            {"name": table},
+        )
+
+
+def downgrade():
+    _recreate(False)
@@ -0,0 +1,58 @@
+"""add task visible_from
+
+Revision ID: a4e2f9b71c05
+Revises: c81b6c3e4d10
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a4e2f9b71c05"
+down_revision = "c81b6c3e4d10"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_task_visible_from", ["visible_from"]),
+    ("ix_task_project_visible_from", ["project_id", "visible_from"]),
+    ("ix_task_status_visible_from", ["status", "visible_from"]),
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    insp = sa.inspect(conn)
+
+    has_column = any(c.get("name") == "visible_from" for c in insp.get_columns("task"))
+    if not has_column:
+        # ADD COLUMN nullable : supporté nativement par SQLite, pas besoin de recréer la table
+        op.add_column("task", sa.Column("visible_from", sa.Date(), nullable=True))
+
+    # Backfill : même sémantique que l'ancien prédicat (scheduled_for IS NULL OR scheduled_for <= today)
+    conn.execute(sa.text("UPDATE task SET visible_from = COALESCE(scheduled_for, date(created_at))"))
+
+    existing = {ix.get("name") for ix in insp.get_indexes("task")}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, "task", columns)
+
+
+def downgrade():
+    for name, _columns in INDEXES:
+        try:
+            op.drop_index(name, table_name="task")
+        except Exception:
+            pass
+
+    conn = op.get_bind()
+    is_sqlite = conn.dialect.name == "sqlite"
+    if is_sqlite:
+        conn.execute(sa.text("PRAGMA foreign_keys=OFF"))
+    try:
+        with op.batch_alter_table("task", schema=None) as batch_op:
+            batch_op.drop_column("visible_from")
+    finally:
+        if is_sqlite:
+            conn.execute(sa.text("PRAGMA foreign_keys=ON"))
@@ -0,0 +1,74 @@
+"""add time_rollup_daily and time_rollup_monthly
+
+Revision ID: b7c3e91d2f68
+Revises: e5b8d2a3f417
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7c3e91d2f68"
+down_revision = "e5b8d2a3f417"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "time_rollup_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("minutes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("entry_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("day", "project_id", "user_id"),
+    )
+    op.create_index("ix_time_rollup_daily_project_day", "time_rollup_daily", ["project_id", "day"])
+    op.create_index("ix_time_rollup_daily_user_day", "time_rollup_daily", ["user_id", "day"])
+
+    op.create_table(
+        "time_rollup_monthly",
+        sa.Column("month", sa.String(length=7), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("minutes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("entry_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("month", "project_id", "user_id"),
+    )
+    op.create_index("ix_time_rollup_monthly_project_month", "time_rollup_monthly", ["project_id", "month"])
+    op.create_index("ix_time_rollup_monthly_user_month", "time_rollup_monthly", ["user_id", "month"])
+
+    # Backfill initial (équivalent de `flask rebuild-time-rollups`)
+    op.execute(
+        """
+        INSERT INTO time_rollup_daily (day, project_id, user_id, minutes, entry_count)
+        SELECT date(time_entry.created_at), task.project_id, time_entry.user_id,
+               SUM(time_entry.minutes), COUNT(time_entry.id)
+        FROM time_entry JOIN task ON task.id = time_entry.task_id
+        GROUP BY date(time_entry.created_at), task.project_id, time_entry.user_id
+        """
+    )
+    month = "to_char(day, 'YYYY-MM')" if op.get_bind().dialect.name == "postgresql" else "strftime('%Y-%m', day)"
+    op.execute(
+        f"""
+        INSERT INTO time_rollup_monthly (month, project_id, user_id, minutes, entry_count)
+        SELECT {month}, project_id, user_id, SUM(minutes), SUM(entry_count)
+        FROM time_rollup_daily
+        GROUP BY {month}, project_id, user_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_time_rollup_monthly_user_month", table_name="time_rollup_monthly")
+    op.drop_index("ix_time_rollup_monthly_project_month", table_name="time_rollup_monthly")
+    op.drop_table("time_rollup_monthly")
+    op.drop_index("ix_time_rollup_daily_user_day", table_name="time_rollup_daily")
+    op.drop_index("ix_time_rollup_daily_project_day", table_name="time_rollup_daily")
+    op.drop_table("time_rollup_daily")
@@ -0,0 +1,114 @@
+"""add search_document (full-text search index)
+
+Revision ID: d3f8a1c6b924
+Revises: b7c3e91d2f68
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from unidecode import unidecode
+
+# revision identifiers, used by Alembic.
+revision = "d3f8a1c6b924"
+down_revision = "b7c3e91d2f68"
+branch_labels = None
+depends_on = None
+
+PG_TSVECTOR = (
+    "setweight(to_tsvector('simple', search_document.title), 'A') || "
+    "setweight(to_tsvector('simple', search_document.body), 'B')"
+)
+
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+    "title, body, content='search_document', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+)
+
+# Backfill : (type, requête) ; colonnes id, title, body, task_id, project_id, client_id
+BACKFILL_QUERIES = (
+    ("client", "SELECT id, name, contact_name, NULL, NULL, id FROM client"),
+    ("project", "SELECT id, name, description, NULL, id, client_id FROM project"),
+    (
+        "task",
+        "SELECT task.id, task.title, task.description, task.id, task.project_id, project.client_id "
+        "FROM task JOIN project ON project.id = task.project_id",
+    ),
+    (
+        "checklist_item",
+        "SELECT checklist_item.id, '', checklist_item.content, task.id, task.project_id, project.client_id "
+        "FROM checklist_item JOIN task ON task.id = checklist_item.task_id JOIN project ON project.id = task.project_id",
+    ),
+)
+
+
+def normalize_search_text(text):
+    """Texte indexable : minuscules sans accents (même règle que l'application)"""
+    return unidecode((text or "").lower())
+
+
+def upgrade():
+    op.create_table(
+        "search_document",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("entity_type", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=True),
+        sa.Column("project_id", sa.Integer(), nullable=True),
+        sa.Column("client_id", sa.Integer(), nullable=True),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("entity_type", "entity_id", name="uq_search_document_entity"),
+    )
+    op.create_index("ix_search_document_task_id", "search_document", ["task_id"])
+    op.create_index("ix_search_document_project_id", "search_document", ["project_id"])
+    op.create_index("ix_search_document_client_id", "search_document", ["client_id"])
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute(f"CREATE INDEX ix_search_document_tsv ON search_document USING gin (({PG_TSVECTOR}))")
+    elif bind.dialect.name == "sqlite":
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+    # Backfill initial (équivalent de `flask rebuild-search-index`, commentaires exclus)
+    table = sa.table(
+        "search_document",
+        *(
+            sa.column(name)
+            for name in ("entity_type", "entity_id", "task_id", "project_id", "client_id", "title", "body")
+        ),
+    )
+    for entity_type, query in BACKFILL_QUERIES:
+        batch = []
+        for entity_id, title, body, task_id, project_id, client_id in bind.execute(sa.text(query)):
+            batch.append(
+                {
+                    "entity_type": entity_type,
+                    "entity_id": entity_id,
+                    "task_id": task_id,
+                    "project_id": project_id,
+                    "client_id": client_id,
+                    "title": normalize_search_text(title),
+                    "body": normalize_search_text(body),
+                }
+            )
+            if len(batch) >= 1000:
+                bind.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            bind.execute(table.insert(), batch)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS search_fts")
+    op.drop_table("search_document")
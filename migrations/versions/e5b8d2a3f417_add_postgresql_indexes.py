@@ -0,0 +1,37 @@
+"""add postgresql-only indexes
+
+Revision ID: e5b8d2a3f417
+Revises: a4e2f9b71c05
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5b8d2a3f417"
+down_revision = "a4e2f9b71c05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index spécifiques PostgreSQL (index partiel, BRIN) : rien à faire sur SQLite
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.create_index(
+        "ix_task_active_project_visible_from",
+        "task",
+        ["project_id", "visible_from"],
+        postgresql_where=sa.text("NOT is_archived"),
+    )
+    op.create_index("ix_time_entry_created_at_brin", "time_entry", ["created_at"], postgresql_using="brin")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("ix_time_entry_created_at_brin", table_name="time_entry")
+    op.drop_index("ix_task_active_project_visible_from", table_name="task")
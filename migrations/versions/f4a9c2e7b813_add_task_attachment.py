@@ -0,0 +1,39 @@
+"""add task_attachment (attachment metadata, replaces per-task manifest.json)
+
+Revision ID: f4a9c2e7b813
+Revises: 8c2d4f7a1e35
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f4a9c2e7b813"
+down_revision = "8c2d4f7a1e35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les manifestes existants dépendent de la configuration de l'application (dossier, salt) :
+    # l'import se fait ensuite avec `flask import-attachment-manifests`
+    op.create_table(
+        "task_attachment",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.String(length=36), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=True),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["task_id"], ["task.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_id"),
+    )
+    op.create_index("ix_task_attachment_task_uploaded", "task_attachment", ["task_id", "uploaded_at"])
+
+
+def downgrade():
+    op.drop_index("ix_task_attachment_task_uploaded", table_name="task_attachment")
+    op.drop_table("task_attachment")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark de la recherche dans les commentaires chiffrés.
+
+Génère N commentaires chiffrés (Fernet) et leurs jetons d'index aveugle dans une base SQLite
+temporaire, puis compare pour une recherche de deux mots :
+  - le parcours complet (déchiffrement de chaque commentaire en Python) ;
+  - la recherche par index aveugle (matching_comments, jointure sur les tâches).
+
+Usage:
+  python scripts/bench_comment_search.py [--comments N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+VOCABULARY = [f"mot{i}" for i in range(5000)] + ["serveur", "sauvegarde", "client", "mise", "jour", "production"]
+
+
+def populate(db_path, nb_comments, encryption_key, blind_tokens):
+    """Insère un projet, 1000 tâches et N commentaires chiffrés avec leurs jetons (sqlite3, rapide)."""
+    from cryptography.fernet import Fernet
+
+    fernet = Fernet(encryption_key)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    now = datetime.now().isoformat(" ")
+    conn.execute(
+        "INSERT INTO client (id, name, slug, created_at) VALUES (1, 'Client bench', 'client-bench', ?)", (now,)
+    )
+    conn.execute(
+        "INSERT INTO project (id, name, slug, client_id, initial_credit, remaining_credit, "
+        "time_tracking_enabled, is_favorite, created_at) VALUES (1, 'Projet bench', 'projet-bench', 1, 0, 0, 1, 0, ?)",
+        (now,),
+    )
+    conn.executemany(
+        "INSERT INTO task (id, title, slug, status, priority, project_id, created_at, updated_at, visible_from, "
+        "is_archived, is_pinned) VALUES (?, ?, ?, 'en cours', 'normale', 1, ?, ?, date(?), 0, 0)",
+        [(i, f"Tâche {i}", f"tache-{i}", now, now, now) for i in range(1, 1001)],
+    )
+    conn.execute(
+        "INSERT INTO user (id, name, email, password_hash, role) VALUES (1, 'Admin', 'a@example.com', 'x', 'admin')"
+    )
+
+    comments, tokens = [], []
+    for comment_id in range(1, nb_comments + 1):
+        text = " ".join(random.choices(VOCABULARY, k=random.randint(5, 30)))
+        if comment_id % 5000 == 0:
+            text += " Redémarrage du serveur de préproduction"
+        encrypted = fernet.encrypt(text.encode("utf-8")).decode("utf-8")
+        comments.append((comment_id, encrypted, 1 + comment_id % 1000, now))
+        tokens.extend((token, comment_id) for token in blind_tokens(text))
+        if len(comments) >= 10_000:
+            conn.executemany(
+                "INSERT INTO comment (id, content, task_id, user_id, created_at) VALUES (?, ?, ?, 1, ?)", comments
+            )
+            conn.executemany("INSERT INTO comment_search_token (token, comment_id) VALUES (?, ?)", tokens)
+            comments, tokens = [], []
+    conn.executemany("INSERT INTO comment (id, content, task_id, user_id, created_at) VALUES (?, ?, ?, 1, ?)", comments)
+    conn.executemany("INSERT INTO comment_search_token (token, comment_id) VALUES (?, ?)", tokens)
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche dans les commentaires chiffrés")
+    parser.add_argument("--comments", type=int, default=500_000, help="Nombre de commentaires")
+    parser.add_argument("--repeat", type=int, default=20, help="Nombre de recherches indexées mesurées")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from app import create_app, db
+        from app.models.search import matching_comments, normalize_search_text
+        from app.models.task import Comment, Task
+        from app.utils.blind_index import blind_tokens
+
+        app = create_app("development")
+        with app.app_context():
+            db.create_all()
+            print(f"Génération de {args.comments} commentaires chiffrés...")
+            start = time.perf_counter()
+            populate(db_path, args.comments, app.config["ENCRYPTION_KEY"], blind_tokens)
+            print(f"  fait en {time.perf_counter() - start:.1f} s")
+
+            query = "serveur préproduction"
+            words = re.findall(r"[a-z0-9]+", normalize_search_text(query))
+
+            start = time.perf_counter()
+            scanned = set()
+            for comment in Comment.query.yield_per(1000):
+                found = set(re.findall(r"[a-z0-9]+", normalize_search_text(comment.content)))
+                if all(word in found for word in words):
+                    scanned.add(comment.task_id)
+            print(f"  parcours avec déchiffrement  {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                comment_ids = matching_comments(query)
+                indexed = {
+                    task_id for (task_id,) in db.session.query(Comment.task_id).filter(Comment.id.in_(comment_ids))
+                }
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            print(f"  index aveugle                 {elapsed:10.1f} ms")
+            assert indexed == scanned, (len(indexed), len(scanned))
+            print(f"  {len(indexed)} tâche(s) trouvée(s) sur {db.session.query(Task.id).count()}")
+
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
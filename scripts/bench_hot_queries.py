@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Benchmark des requêtes fréquentes (app/utils/hot_queries.py) : coût de compilation SQL par requête HTTP.
+
+Chaque page type (tableau de bord, kanban projet, détail d'une tâche, mes tâches) exécute ses requêtes
+sur une base SQLite temporaire, dans deux modes :
+  - "sans cache" : cache de compilation désactivé (compiled_cache=None), comme pour toute requête
+    touchant Client, Comment ou Communication tant que EncryptedType avait cache_ok = False ;
+  - "lambda + cache" : lambda_stmt analysée une fois, SQL compilé réutilisé.
+La base est petite pour que le temps mesuré soit surtout celui de Python (construction, compilation).
+
+Usage:
+  python scripts/bench_hot_queries.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+
+def setup(db_path):
+    """Crée le schéma et quelques données via l'application ; retourne (app, ids utiles)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app import create_app, db
+    from app.models.client import Client
+    from app.models.project import Project
+    from app.models.task import ChecklistItem, Comment, Task, TimeEntry
+    from app.models.user import User
+
+    app = create_app("development")
+    with app.app_context():
+        db.create_all()
+        user = User(name="Bench", email="bench@example.com", role="admin")
+        user.set_password("bench")
+        client = Client(name="Client bench")
+        db.session.add_all([user, client])
+        db.session.flush()
+        project = Project(name="Projet bench", client_id=client.id, initial_credit=6000, remaining_credit=60)
+        db.session.add(project)
+        db.session.flush()
+        for i, status in enumerate(["à faire", "en cours", "terminé"] * 10):
+            task = Task(title=f"Tâche {i}", project_id=project.id, status=status, user_id=user.id)
+            db.session.add(task)
+            db.session.flush()
+            db.session.add(ChecklistItem(task_id=task.id, content="Contrôle", position=0))
+            db.session.add(Comment(task_id=task.id, user_id=user.id, content="Commentaire chiffré"))
+            db.session.add(TimeEntry(task_id=task.id, user_id=user.id, minutes=30))
+        db.session.commit()
+        ids = {"user": user.id, "client": client.id, "project": project.id, "project_slug": project.slug}
+        ids["task"], ids["task_slug"] = task.id, task.slug
+    return app, ids
+
+
+def request_profiles(ids, today):
+    """Requêtes exécutées par chaque page, dans l'ordre de la vue"""
+    from app.utils import hot_queries as q
+
+    return {
+        "tableau de bord (admin)": lambda: [
+            q.count_clients(),
+            q.count_projects(),
+            q.count_visible_tasks(today),
+            q.count_low_credit_projects(120),
+            q.count_visible_tasks(today, "à faire"),
+            q.count_visible_tasks(today, "en cours"),
+            q.count_visible_tasks(today, "terminé"),
+            q.low_credit_projects(120),
+            q.urgent_tasks(today),
+            q.user_tasks_in_progress(ids["user"], today),
+            q.recent_time_entries(),
+        ],
+        "tableau de bord (client)": lambda: [
+            q.count_clients([ids["client"]]),
+            q.count_projects([ids["client"]]),
+            q.count_visible_tasks(today, client_ids=[ids["client"]]),
+            q.total_minutes([ids["client"]]),
+            q.count_low_credit_projects(120, [ids["client"]]),
+            q.count_visible_tasks(today, "à faire", [ids["client"]]),
+            q.count_visible_tasks(today, "en cours", [ids["client"]]),
+            q.low_credit_projects(120, [ids["client"]]),
+        ],
+        "kanban projet": lambda: [
+            q.project_by_slug(ids["project_slug"]),
+            q.project_visible_tasks(ids["project"], today),
+            q.project_next_occurrences(ids["project"], today),
+            q.project_time_entries(ids["project"]),
+        ],
+        "détail tâche": lambda: [
+            q.task_by_slug(ids["task_slug"]),
+            q.task_time_entries(ids["task"]),
+            q.task_root_comments(ids["task"]),
+            q.task_checklist_items(ids["task"]),
+        ],
+        "mes tâches": lambda: [
+            q.user_visible_tasks(ids["user"], today, statuses=["à faire", "en cours"]),
+            q.user_next_occurrences(ids["user"], today),
+        ],
+    }
+
+
+def run_profile(db, build, repeat, execution_options):
+    """Temps moyen (ms) d'une requête HTTP : construction des requêtes, exécution, chargement ORM"""
+    for statement in build():  # Préchauffage (analyse des lambdas, remplissage du cache)
+        db.session.execute(statement, execution_options=execution_options).all()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for statement in build():
+            db.session.execute(statement, execution_options=execution_options).all()
+        db.session.expunge_all()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du cache de compilation des requêtes fréquentes")
+    parser.add_argument("--repeat", type=int, default=200, help="Nombre de requêtes HTTP simulées par page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, ids = setup(os.path.join(tmp, "bench.db"))
+        from app import db
+        from app.utils import get_utc_now
+
+        today = get_utc_now().date() + timedelta(days=1)
+        with app.app_context():
+            print(f"{'page':<26} {'requêtes':>8} {'sans cache':>12} {'lambda + cache':>15} {'gain':>10}")
+            for label, build in request_profiles(ids, today).items():
+                uncached = run_profile(db, build, args.repeat, {"compiled_cache": None})
+                cached = run_profile(db, build, args.repeat, {})
+                print(
+                    f"{label:<26} {len(build()):>8} {uncached:>9.2f} ms {cached:>12.2f} ms {uncached - cached:>7.2f} ms"
+                )
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
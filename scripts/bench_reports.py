@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Benchmark de la page /reports servie depuis les cumuls de temps (quotidiens et mensuels).
+
+Génère des saisies de temps réalistes (chaque technicien travaille sur quelques projets, les jours
+ouvrés) dans une base SQLite temporaire, reconstruit les cumuls
+(`TimeRollupDaily.rebuild`, comme `flask rebuild-time-rollups`) puis mesure le temps de réponse
+de /reports sans filtre, sur une période et en exploration par projet.
+
+Usage:
+  python scripts/bench_reports.py [--entries N] [--projects N] [--users N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+
+def populate(db_path, nb_entries, nb_projects, nb_users):
+    """Insère clients, projets, tâches, utilisateurs et saisies avec sqlite3 (rapide)."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    now = datetime.now().isoformat(" ")
+    conn.execute(
+        "INSERT INTO client (id, name, slug, created_at) VALUES (1, 'Client bench', 'client-bench', ?)", (now,)
+    )
+    conn.executemany(
+        "INSERT INTO project (id, name, slug, client_id, initial_credit, remaining_credit, "
+        "time_tracking_enabled, is_favorite, created_at) VALUES (?, ?, ?, 1, 0, 0, 1, 0, ?)",
+        [(i, f"Projet {i}", f"projet-{i}", now) for i in range(1, nb_projects + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO task (id, title, slug, status, priority, project_id, created_at, updated_at, visible_from, "
+        "is_archived, is_pinned) VALUES (?, ?, ?, 'en cours', 'normale', ?, ?, ?, date(?), 0, 0)",
+        [
+            (i, f"Tâche {i}", f"tache-{i}", 1 + (i - 1) % nb_projects, now, now, now)
+            for i in range(1, nb_projects * 10 + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO user (id, name, email, password_hash, role) VALUES (?, ?, ?, 'x', 'technicien')",
+        [(i, f"Technicien {i}", f"tech{i}@example.com") for i in range(1, nb_users + 1)],
+    )
+    start = datetime.now() - timedelta(days=3 * 365)
+    workdays = [d for d in (start + timedelta(days=i) for i in range(3 * 365)) if d.weekday() < 5]
+    # Chaque technicien intervient sur une poignée de projets
+    assignments = {
+        user: random.sample(range(1, nb_projects + 1), min(5, nb_projects)) for user in range(1, nb_users + 1)
+    }
+
+    def rows():
+        for _ in range(nb_entries):
+            user = random.randint(1, nb_users)
+            project = random.choice(assignments[user])
+            task = project + nb_projects * random.randint(0, 9)
+            created_at = random.choice(workdays).replace(hour=random.randint(8, 18), minute=random.randint(0, 59))
+            yield (task, user, 15, created_at.isoformat(" "))
+
+    conn.executemany("INSERT INTO time_entry (task_id, user_id, minutes, created_at) VALUES (?, ?, ?, ?)", rows())
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de /reports (cumuls de temps)")
+    parser.add_argument("--entries", type=int, default=2_000_000, help="Nombre de saisies de temps")
+    parser.add_argument("--projects", type=int, default=200, help="Nombre de projets")
+    parser.add_argument("--users", type=int, default=30, help="Nombre d'utilisateurs")
+    parser.add_argument("--repeat", type=int, default=10, help="Nombre de requêtes par scénario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from app import create_app, db
+        from app.models.task import TimeRollupDaily
+
+        app = create_app("development")
+        app.config["WTF_CSRF_ENABLED"] = False
+        with app.app_context():
+            db.create_all()
+
+        print(f"Génération de {args.entries} saisies...")
+        populate(db_path, args.entries, args.projects, args.users)
+
+        with app.app_context():
+            start = time.perf_counter()
+            count = TimeRollupDaily.rebuild()
+            print(f"Cumuls reconstruits en {time.perf_counter() - start:.1f} s ({count} lignes)")
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = "1"
+            sess["_fresh"] = True
+        with app.app_context():
+            db.session.execute(db.text("UPDATE user SET role = 'admin' WHERE id = 1"))
+            db.session.commit()
+
+        year = datetime.now().year
+        scenarios = {
+            "sans filtre": "/reports",
+            "année en cours": f"/reports?start={year}-01-01&end={year}-12-31",
+            "exploration projet": f"/reports?project_id=1&start={year - 1}-01-01",
+        }
+        for label, url in scenarios.items():
+            client.get(url)  # préchauffage (compilation des templates)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                assert client.get(url).status_code == 200
+            print(f"  {label:<20} {(time.perf_counter() - start) / args.repeat * 1000:7.1f} ms")
+
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
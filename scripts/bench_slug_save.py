@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark de l'édition de tâches (POST /tasks/<slug>/edit) et de la génération de slug.
+
+Crée dans une base SQLite temporaire N tâches portant le même titre (cas des séries récurrentes :
+« Sauvegarde hebdomadaire », « sauvegarde-hebdomadaire-1 »...), puis mesure pour la dernière :
+  - une édition sans changement de titre (le slug ne doit pas être régénéré) ;
+  - une édition qui renomme la tâche (une seule requête d'unicité).
+Affiche le temps moyen et le nombre de requêtes SQL par édition.
+
+Usage:
+  python scripts/bench_slug_save.py [--duplicates N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de l'édition de tâches (slugs)")
+    parser.add_argument("--duplicates", type=int, default=200, help="Nombre de tâches portant le même titre")
+    parser.add_argument("--repeat", type=int, default=50, help="Nombre d'éditions par scénario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        from app.models.client import Client
+        from app.models.project import Project
+        from app.models.task import Task
+        from app.models.user import User
+        from sqlalchemy import event
+
+        app = create_app("development")
+        app.config["WTF_CSRF_ENABLED"] = False
+        with app.app_context():
+            db.create_all()
+            admin = User(name="Admin", email="admin@example.com", role="admin")
+            admin.set_password("x")
+            client = Client(name="Client bench")
+            db.session.add_all([admin, client])
+            db.session.flush()
+            project = Project(name="Projet bench", client_id=client.id, initial_credit=0, remaining_credit=0)
+            db.session.add(project)
+            db.session.flush()
+            for _ in range(args.duplicates):
+                db.session.add(Task(title="Sauvegarde hebdomadaire", project_id=project.id))
+            db.session.commit()
+            task = Task.query.order_by(Task.id.desc()).first()
+            task_id, admin_id = task.id, admin.id
+            print(f"{args.duplicates} tâches « Sauvegarde hebdomadaire », dernière : {task.slug}")
+
+            statements = []
+            event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        http = app.test_client()
+        with http.session_transaction() as sess:
+            sess["_user_id"] = str(admin_id)
+            sess["_fresh"] = True
+
+        def edit(title, index):
+            form = {"title": title, "description": f"Révision {index}", "status": "en cours", "priority": "normale"}
+            form.update({"estimated_time": "0.0", "user_id": "0"})
+            response = http.post(f"/tasks/{task_id}/edit", data=form)
+            assert response.status_code == 302, response.status_code
+
+        scenarios = {
+            "édition sans renommage": lambda i: edit("Sauvegarde hebdomadaire", i),
+            "renommage": lambda i: edit("Sauvegarde hebdomadaire" if i % 2 else "Sauvegarde mensuelle", i),
+        }
+        for label, run in scenarios.items():
+            run(0)  # préchauffage
+            statements.clear()
+            start = time.perf_counter()
+            for i in range(1, args.repeat + 1):
+                run(i)
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            slug_queries = sum(1 for s in statements if "task.slug" in s and "task.slug >" in s)
+            print(
+                f"  {label:<24} {elapsed:7.2f} ms  {len(statements) / args.repeat:5.1f} requêtes/édition"
+                f"  dont slug : {slug_queries / args.repeat:.1f}"
+            )
+
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Benchmark de concurrence SQLite : lectures (tableau de bord) et écritures (saisie de temps)
+mélangées, sur plusieurs threads, avec le profil SQLite de l'application.
+
+Chaque opération d'écriture reproduit log_time : insertion d'un TimeEntry puis mise à jour
+de Task.actual_minutes et du crédit du projet, dans une même transaction.
+
+Usage:
+  python scripts/bench_sqlite_concurrency.py [--threads N] [--duration S] [--write-ratio R]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+
+def seed(db, nb_projects, nb_tasks):
+    from app.models.client import Client
+    from app.models.project import Project
+    from app.models.task import Task
+    from app.models.user import User
+
+    user = User(name="Bench", email="bench@example.com", role="technicien")
+    user.set_password("bench")
+    client = Client(name="Client bench")
+    db.session.add_all([user, client])
+    db.session.flush()
+    projects = [
+        Project(name=f"Projet {i}", client_id=client.id, initial_credit=600000, remaining_credit=600000)
+        for i in range(nb_projects)
+    ]
+    db.session.add_all(projects)
+    db.session.flush()
+    db.session.add_all(
+        Task(title=f"Tâche {i}", project_id=random.choice(projects).id, status=random.choice(["à faire", "en cours"]))
+        for i in range(nb_tasks)
+    )
+    db.session.commit()
+    return user.id
+
+
+def worker(app, user_id, task_ids, deadline, write_ratio, results):
+    from app import db
+    from app.models.task import Task, TimeEntry
+    from sqlalchemy.exc import OperationalError
+
+    latencies = {"lecture": [], "écriture": []}
+    errors = 0
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            is_write = random.random() < write_ratio
+            start = time.perf_counter()
+            try:
+                if is_write:
+                    task = db.session.get(Task, random.choice(task_ids))
+                    db.session.add(TimeEntry(task_id=task.id, user_id=user_id, minutes=15))
+                    task.actual_minutes = (task.actual_minutes or 0) + 15
+                    task.project.remaining_credit -= 15
+                    db.session.commit()
+                else:
+                    Task.query.filter(Task.is_archived == False, Task.visible_on(date.today())).count()
+                    db.session.rollback()
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+                continue
+            latencies["écriture" if is_write else "lecture"].append(time.perf_counter() - start)
+        db.session.remove()
+    results.append((latencies, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrence SQLite (lectures + saisies de temps)")
+    parser.add_argument("--threads", type=int, default=8, help="Nombre de threads clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée du test en secondes")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Proportion d'écritures (0-1)")
+    parser.add_argument("--tasks", type=int, default=5000, help="Nombre de tâches à générer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        from app.models.task import Task
+
+        app = create_app("development")
+        with app.app_context():
+            db.create_all()
+            user_id = seed(db, 50, args.tasks)
+            task_ids = [row.id for row in db.session.query(Task.id)]
+            pool = db.engine.pool
+            print(f"Pool: {pool.__class__.__name__} size={pool.size()} | PRAGMA: {app.config['SQLITE_PRAGMAS']}")
+
+        results = []
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(app, user_id, task_ids, deadline, args.write_ratio, results))
+            for _ in range(args.threads)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        errors = sum(e for _, e in results)
+        print(f"\n{args.threads} threads, {args.duration:.0f} s, {args.write_ratio:.0%} d'écritures")
+        for kind in ("lecture", "écriture"):
+            samples = sorted(s for latencies, _ in results for s in latencies[kind])
+            if not samples:
+                continue
+            p95 = samples[int(len(samples) * 0.95) - 1]
+            print(
+                f"  {kind:<9} {len(samples) / args.duration:8.1f} op/s   "
+                f"p50 {statistics.median(samples) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms"
+            )
+        print(f"  erreurs 'database is locked' : {errors}")
+
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
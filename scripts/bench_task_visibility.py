@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Benchmark du filtre de visibilité des tâches (tableau de bord, kanban projet).
+
+Compare l'ancien prédicat ``scheduled_for IS NULL OR scheduled_for <= :today``
+avec la colonne indexée ``visible_from <= :today`` sur une base SQLite temporaire
+remplie de tâches fictives. Affiche le plan d'exécution (EXPLAIN QUERY PLAN)
+et le temps moyen de chaque requête.
+
+Usage:
+  python scripts/bench_task_visibility.py [--tasks N] [--projects N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+STATUSES = ["à faire", "en cours", "terminé"]
+
+QUERIES = {
+    "dashboard (count par statut)": (
+        "SELECT count(*) FROM task WHERE status = :status AND is_archived = 0 AND {predicate}",
+        {"status": "en cours"},
+    ),
+    "kanban projet": (
+        "SELECT id, title, status FROM task WHERE project_id = :project_id AND {predicate}",
+        {"project_id": 1},
+    ),
+}
+
+OLD_PREDICATE = "(scheduled_for IS NULL OR scheduled_for <= :today)"
+NEW_PREDICATE = "visible_from <= :today"
+
+
+def create_schema(db_path):
+    """Crée le schéma via l'application (mêmes tables et index que le modèle)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app import create_app, db
+
+    app = create_app("development")
+    with app.app_context():
+        db.create_all()
+        # Index historique (créé par la migration c81b6c3e4d10, absent du modèle)
+        db.session.execute(db.text("CREATE INDEX IF NOT EXISTS ix_task_scheduled_for ON task (scheduled_for)"))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def populate(db_path, nb_tasks, nb_projects, today):
+    """Insère les données en masse avec sqlite3 (beaucoup plus rapide que l'ORM)."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "INSERT INTO client (id, name, slug, created_at) VALUES (1, 'Client bench', 'client-bench', ?)",
+        (datetime.now().isoformat(" "),),
+    )
+    conn.executemany(
+        "INSERT INTO project (id, name, slug, client_id, initial_credit, remaining_credit, "
+        "time_tracking_enabled, is_favorite, created_at) VALUES (?, ?, ?, 1, 0, 0, 1, 0, ?)",
+        [(i, f"Projet {i}", f"projet-{i}", datetime.now().isoformat(" ")) for i in range(1, nb_projects + 1)],
+    )
+
+    def rows():
+        for i in range(1, nb_tasks + 1):
+            created_at = datetime.combine(today - timedelta(days=random.randint(0, 365)), datetime.min.time())
+            # ~30% d'occurrences planifiées (dont une bonne part dans le futur)
+            scheduled_for = today + timedelta(days=random.randint(-60, 180)) if random.random() < 0.3 else None
+            visible_from = scheduled_for or created_at.date()
+            created_at = created_at.isoformat(" ")
+            yield (
+                f"Tâche {i}",
+                f"tache-{i}",
+                random.choice(STATUSES),
+                "normale",
+                random.randint(1, nb_projects),
+                created_at,
+                created_at,
+                scheduled_for.isoformat() if scheduled_for else None,
+                visible_from.isoformat(),
+            )
+
+    conn.executemany(
+        "INSERT INTO task (title, slug, status, priority, project_id, created_at, updated_at, "
+        "scheduled_for, visible_from, is_archived, is_pinned) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)",
+        rows(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def run(db_path, repeat, today):
+    conn = sqlite3.connect(db_path)
+    for label, (sql, params) in QUERIES.items():
+        print(f"\n== {label} ==")
+        for name, predicate in (("avant (OR)", OLD_PREDICATE), ("après (visible_from)", NEW_PREDICATE)):
+            query = sql.format(predicate=predicate)
+            bound = {**params, "today": today.isoformat()}
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", bound).fetchall()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(query, bound).fetchall()
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            print(f"  {name:<22} {elapsed:8.2f} ms")
+            for row in plan:
+                print(f"      plan: {row[-1]}")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du filtre de visibilité des tâches")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Nombre de tâches à générer")
+    parser.add_argument("--projects", type=int, default=500, help="Nombre de projets")
+    parser.add_argument("--repeat", type=int, default=20, help="Nombre d'exécutions par requête")
+    args = parser.parse_args()
+
+    today = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        create_schema(db_path)
+        print(f"Génération de {args.tasks} tâches sur {args.projects} projets...")
+        start = time.perf_counter()
+        populate(db_path, args.tasks, args.projects, today)
+        print(f"Données générées en {time.perf_counter() - start:.1f} s")
+        run(db_path, args.repeat, today)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Script pour (re)construire l'index aveugle des commentaires (table comment_search_token)
+À exécuter après la migration qui crée la table, ou après un changement de BLIND_INDEX_KEY
+"""
+
+import os
+
+from app import create_app, db
+from app.models.search import CommentSearchToken
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Vérifier la présence de la clé de chiffrement (nécessaire pour déchiffrer les commentaires)
+encryption_key = os.environ.get("ENCRYPTION_KEY")
+if not encryption_key:
+    print("ERREUR: Aucune clé de chiffrement n'est définie dans les variables d'environnement.")
+    print("Définissez ENCRYPTION_KEY dans votre fichier .env avant de continuer.")
+    exit(1)
+
+# Créer l'application avec le contexte
+app = create_app("development")
+
+with app.app_context():
+    total = db.session.query(db.func.count()).select_from(db.metadata.tables["comment"]).scalar()
+    print(f"Trouvé {total} commentaires à indexer.")
+
+    # Les commentaires sont déchiffrés un par un, en flux, et les jetons insérés par lots
+    comment_count, token_count = CommentSearchToken.rebuild()
+    print(f"Indexation terminée : {token_count} jetons pour {comment_count} commentaires.")
+
+    if not os.environ.get("BLIND_INDEX_KEY"):
+        print("\nRappel important:")
+        print("La clé d'index est dérivée de ENCRYPTION_KEY : définissez BLIND_INDEX_KEY pour pouvoir")
+        print("changer de clé de chiffrement sans reconstruire l'index.")
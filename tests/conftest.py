@@ -13,9 +13,55 @@ from app.models.user import User
 from cryptography.fernet import Fernet
 from sqlalchemy import text
 
+try:
+    from pytest_postgresql import factories
+    from pytest_postgresql.janitor import DatabaseJanitor
+
+    # Serveur PostgreSQL lancé par pytest (binaires pg_ctl requis), uniquement avec --db=postgresql
+    postgresql_server = factories.postgresql_proc(dbname="chronotrak_test")
+except ImportError:
+    factories = None
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--db",
+        choices=["sqlite", "postgresql"],
+        default="sqlite",
+        help="Base de données des tests (postgresql : nécessite l'extra 'postgres')",
+    )
+
+
+@pytest.fixture(scope="session")
+def database_url(request):
+    """URL de la base de test : TEST_DATABASE_URL, un PostgreSQL lancé par pytest, ou SQLite (None)."""
+    if os.environ.get("TEST_DATABASE_URL"):
+        yield os.environ["TEST_DATABASE_URL"]
+        return
+    if request.config.getoption("--db") != "postgresql":
+        yield None
+        return
+    if factories is None:
+        pytest.exit("--db=postgresql nécessite pytest-postgresql et psycopg (uv sync --extra postgres)")
+
+    proc = request.getfixturevalue("postgresql_server")
+    janitor = DatabaseJanitor(
+        user=proc.user,
+        host=proc.host,
+        port=proc.port,
+        dbname=proc.dbname,
+        version=proc.version,
+        password=proc.password,
+    )
+    janitor.init()
+    try:
+        yield f"postgresql+psycopg://{proc.user}:{proc.password or ''}@{proc.host}:{proc.port}/{proc.dbname}"
+    finally:
+        janitor.drop()
+
 
 @pytest.fixture(scope="function")
-def app():
+def app(database_url, monkeypatch):
     """Crée une application Flask de test avec base de données temporaire."""
     # Générer une clé de chiffrement pour les tests
     test_encryption_key = Fernet.generate_key().decode()
@@ -26,9 +72,13 @@ def app():
     # Configuration de test
     os.environ["ENCRYPTION_KEY"] = test_encryption_key
     os.environ["FLASK_ENV"] = "testing"
+    if database_url:
+        # Lu par TestingConfig.init_app, avant la création du moteur
+        monkeypatch.setenv("TEST_DATABASE_URL", database_url)
 
     app = create_app("testing")
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    if not database_url:
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
     app.config["TESTING"] = True
     app.config["WTF_CSRF_ENABLED"] = False  # Désactiver CSRF pour les tests
     app.config["SECRET_KEY"] = "test-secret-key"
@@ -38,22 +88,26 @@ def app():
         yield app
         # Nettoyer proprement avant de supprimer les tables
         db.session.remove()
+        is_sqlite = db.engine.dialect.name == "sqlite"
         # Désactiver les contraintes FK pour SQLite avant de supprimer
         try:
-            with db.engine.connect() as conn:
-                conn.execute(text("PRAGMA foreign_keys=OFF"))
-                conn.commit()
+            if is_sqlite:
+                with db.engine.connect() as conn:
+                    conn.execute(text("PRAGMA foreign_keys=OFF"))
+                    conn.commit()
             db.drop_all()
         except Exception:
             # Si drop_all échoue, ignorer (le fichier sera supprimé de toute façon)
             pass
         finally:
             try:
-                with db.engine.connect() as conn:
-                    conn.execute(text("PRAGMA foreign_keys=ON"))
-                    conn.commit()
+                if is_sqlite:
+                    with db.engine.connect() as conn:
+                        conn.execute(text("PRAGMA foreign_keys=ON"))
+                        conn.commit()
             except Exception:
                 pass
+        db.engine.dispose()
 
     # Nettoyer le fichier temporaire
     os.close(db_fd)
@@ -0,0 +1,66 @@
+"""
+Tests de l'archivage automatique par lots (Task.archive_in_batches, commande flask auto-archive).
+"""
+
+from datetime import UTC, datetime, timedelta
+
+from app import db
+from app.models.project import Project
+from app.models.task import Task
+
+OLD = datetime.now(UTC).replace(tzinfo=None) - timedelta(weeks=3)
+RECENT = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=2)
+
+
+def _create_tasks(project):
+    """5 tâches à archiver réparties sur deux projets, 2 à conserver ; retourne l'id de la tâche sans completed_at"""
+    project = db.session.merge(project)
+    other = Project(name="Autre projet", client_id=project.client_id)
+    db.session.add(other)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(Task(title=f"Ancienne {i}", project_id=project.id, status="terminé", completed_at=OLD))
+    db.session.add(Task(title="Ancienne autre", project_id=other.id, status="terminé", completed_at=OLD))
+    legacy = Task(title="Sans date de fin", project_id=other.id, status="terminé", updated_at=OLD)
+    db.session.add(legacy)
+    db.session.add(Task(title="Récente", project_id=project.id, status="terminé", completed_at=RECENT))
+    db.session.add(Task(title="En cours", project_id=project.id, status="en cours", updated_at=OLD))
+    db.session.commit()
+    return legacy.id
+
+
+def test_archive_in_batches_reports_per_project(app, test_project):
+    """Archivage par lots de 2 : toutes les tâches éligibles, rapport par projet, completed_at renseigné."""
+    with app.app_context():
+        legacy_id = _create_tasks(test_project)
+
+        result = Task.archive_in_batches(batch_size=2)
+
+        assert result == {"archived": 5, "by_project": [("Autre projet", 2), ("Projet Test", 3)], "complete": True}
+        db.session.expire_all()
+        assert sorted(t.title for t in Task.query.filter_by(is_archived=False)) == ["En cours", "Récente"]
+        assert all(t.archived_at is not None for t in Task.query.filter_by(is_archived=True))
+        assert db.session.get(Task, legacy_id).completed_at == OLD
+        assert Task.archive_in_batches()["archived"] == 0
+
+
+def test_archive_dry_run_and_time_budget(app, test_project):
+    """--dry-run compte sans modifier ; un budget épuisé s'arrête avant le premier lot."""
+    with app.app_context():
+        _create_tasks(test_project)
+
+        assert Task.archive_in_batches(dry_run=True)["archived"] == 5
+        assert Task.archive_in_batches(time_budget=0) == {"archived": 0, "by_project": [], "complete": False}
+        assert Task.query.filter_by(is_archived=True).count() == 0
+
+
+def test_auto_archive_command(app, runner, test_project):
+    """La commande affiche le détail par projet."""
+    with app.app_context():
+        _create_tasks(test_project)
+
+    result = runner.invoke(args=["auto-archive", "--force", "--batch-size", "3"])
+
+    assert result.exit_code == 0, result.output
+    assert "✓ Projet Test : 3 tâche(s)" in result.output
+    assert "5 tâche(s) archivée(s) avec succès." in result.output
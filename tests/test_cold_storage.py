@@ -0,0 +1,278 @@
+"""
+Tests du stockage froid des tâches archivées (fichier SQLite attaché, flask cold-storage).
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from app import db
+from app.models.project import Project
+from app.models.search import SearchDocument
+from app.models.task import AttachmentBlob, ChecklistItem, Comment, Task, TaskAttachment, TimeEntry, TimeRollupDaily
+from app.utils import cold_storage
+
+ARCHIVED_LONG_AGO = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=400)
+
+
+@pytest.fixture
+def cold_db(app, tmp_path):
+    """Stockage froid attaché aux nouvelles connexions (moteurs recréés), détaché après le test"""
+    if db.engine.dialect.name != "sqlite":
+        pytest.skip("Stockage froid : SQLite uniquement")
+    app.config["COLD_STORAGE_PATH"] = str(tmp_path / "cold.db")
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    yield tmp_path / "cold.db"
+    app.config["COLD_STORAGE_PATH"] = None
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _create_task(project, user, title, archived_at=None):
+    task = Task(
+        title=title,
+        project_id=project.id,
+        status="terminé",
+        is_archived=archived_at is not None,
+        archived_at=archived_at,
+    )
+    db.session.add(task)
+    db.session.flush()
+    db.session.add(ChecklistItem(task_id=task.id, content=f"Contrôle {title}", position=0))
+    db.session.add(Comment(content=f"Commentaire {title}", task_id=task.id, user_id=user.id))
+    db.session.add(TimeEntry(task_id=task.id, user_id=user.id, minutes=45))
+    db.session.commit()
+    return task.id
+
+
+def test_freeze_moves_task_with_dependents_and_archives_reads_both(app, client, cold_db, admin_user, test_project):
+    """La tâche ancienne part dans le fichier froid ; la page des archives et les cumuls la voient encore."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Migration serveur", ARCHIVED_LONG_AGO)
+        _create_task(project, admin, "Tâche récente")
+
+        assert cold_storage.freeze(dry_run=True) == 1
+        assert cold_storage.freeze(batch_size=1) == 1
+
+        assert db.session.get(Task, old_id) is None
+        for model in (ChecklistItem, Comment, TimeEntry):
+            assert model.query.filter_by(task_id=old_id).count() == 0
+        assert SearchDocument.query.filter_by(task_id=old_id).count() == 0
+        cold_tasks = cold_storage.cold_table(Task)
+        assert db.session.execute(sa.select(cold_tasks.c.title)).scalars().all() == ["Migration serveur"]
+        # Les cumuls reconstruits comptent toujours les saisies du stockage froid
+        TimeRollupDaily.rebuild()
+        assert db.session.execute(sa.select(sa.func.sum(TimeRollupDaily.entry_count))).scalar() == 2
+
+    _login(client, admin_user)
+    response = client.get("/archives")
+    assert response.status_code == 200
+    assert "Migration serveur" in response.get_data(as_text=True)
+    assert "Migration serveur" in client.get("/archives?search=migration").get_data(as_text=True)
+    assert "Migration serveur" not in client.get("/archives?search=facture").get_data(as_text=True)
+
+
+def test_unarchive_restores_task_from_cold_storage(app, client, cold_db, admin_user, test_project):
+    """Le désarchivage restaure la tâche et ses dépendances dans la base principale, id conservé."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Audit annuel", ARCHIVED_LONG_AGO)
+        _create_task(project, admin, "Tâche récente")
+        cold_storage.freeze()
+        slug = db.session.execute(sa.select(cold_storage.cold_table(Task).c.slug)).scalar()
+
+    _login(client, admin_user)
+    response = client.post(f"/tasks/{slug}/unarchive")
+
+    assert response.get_json()["success"]
+    with app.app_context():
+        task = db.session.get(Task, old_id)
+        assert task is not None and not task.is_archived
+        assert [item.content for item in task.checklist_items] == ["Contrôle Audit annuel"]
+        assert [comment.content for comment in task.comments] == ["Commentaire Audit annuel"]
+        assert [entry.minutes for entry in task.time_entries] == [45]
+        assert SearchDocument.query.filter_by(task_id=old_id).count() == 2
+        assert db.session.execute(sa.select(sa.func.count()).select_from(cold_storage.cold_table(Task))).scalar() == 0
+
+
+def test_cold_storage_command_requires_configuration(app, runner):
+    """Sans COLD_STORAGE_PATH, la commande n'agit pas."""
+    result = runner.invoke(args=["cold-storage"])
+
+    assert result.exit_code == 0, result.output
+    assert "Stockage froid non configuré" in result.output
+
+
+def test_frozen_ids_are_never_reused_by_new_tasks(app, client, cold_db, admin_user, test_project):
+    """Plus récentes lignes supprimées après le gel : une nouvelle tâche ne reprend pas l'id gelé."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Inventaire 2024", ARCHIVED_LONG_AGO)
+        newest_id = _create_task(project, admin, "Inventaire 2025")
+        assert cold_storage.freeze() == 1
+        slug = db.session.execute(sa.select(cold_storage.cold_table(Task).c.slug)).scalar()
+        db.session.delete(db.session.get(Task, newest_id))
+        db.session.commit()
+
+        new_id = _create_task(project, admin, "Inventaire 2026")
+        assert new_id not in (old_id, newest_id)
+
+    _login(client, admin_user)
+    assert client.get(f"/tasks/{slug}").status_code == 200
+    with app.app_context():
+        assert db.session.get(Task, old_id).title == "Inventaire 2024"
+        live = db.session.get(Task, new_id)
+        assert live.title == "Inventaire 2026"
+        assert [entry.minutes for entry in live.time_entries] == [45]
+
+
+def test_thaw_never_overwrites_a_row_holding_the_same_id(app, cold_db, admin_user, test_project):
+    """Id déjà présent dans la base principale (base migrée trop tard) : rien n'est restauré ni écrasé."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Audit 2024", ARCHIVED_LONG_AGO)
+        cold_storage.freeze()
+        db.session.add(Task(id=old_id, title="Audit 2026", project_id=project.id))
+        db.session.commit()
+
+        assert cold_storage.thaw(old_id) is None
+        db.session.expire_all()
+        assert db.session.get(Task, old_id).title == "Audit 2026"
+        cold_tasks = cold_storage.cold_table(Task)
+        assert db.session.execute(sa.select(cold_tasks.c.title)).scalars().all() == ["Audit 2024"]
+
+
+def test_client_without_access_cannot_thaw_task(app, client, cold_db, admin_user, client_user, test_project):
+    """Un client sans accès au projet reçoit 404 et la tâche reste dans le stockage froid."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Contrat fournisseur", ARCHIVED_LONG_AGO)
+        cold_storage.freeze()
+        slug = db.session.execute(sa.select(cold_storage.cold_table(Task).c.slug)).scalar()
+
+    _login(client, client_user)
+    assert client.get(f"/tasks/{slug}").status_code == 404
+    with app.app_context():
+        assert db.session.get(Task, old_id) is None
+        cold_tasks = cold_storage.cold_table(Task)
+        assert db.session.execute(sa.select(cold_tasks.c.id)).scalars().all() == [old_id]
+
+
+def _interrupt_delete_from(monkeypatch, schema):
+    """Simule un arrêt entre la copie (validée) et la suppression de la source"""
+    delete = cold_storage._delete
+
+    def interrupted(connection, ids, target):
+        if target == schema:
+            raise RuntimeError("arrêt du processus")
+        delete(connection, ids, target)
+
+    monkeypatch.setattr(cold_storage, "_delete", interrupted)
+
+
+def _cold_count(model):
+    return db.session.execute(sa.select(sa.func.count()).select_from(cold_storage.cold_table(model))).scalar()
+
+
+def test_interrupted_freeze_keeps_task_and_resumes(app, cold_db, admin_user, test_project, monkeypatch):
+    """Arrêt après la copie dans cold : la tâche n'est pas perdue, listée une fois, déplacée au passage suivant."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Bilan 2024", ARCHIVED_LONG_AGO)
+
+        _interrupt_delete_from(monkeypatch, "main")
+        with pytest.raises(RuntimeError):
+            cold_storage.freeze()
+        db.session.expire_all()
+        assert db.session.get(Task, old_id) is not None
+        assert _cold_count(Task) == 1 and _cold_count(Comment) == 1
+        assert [task.id for task in cold_storage.archived_tasks_query().all()] == [old_id]
+
+        monkeypatch.undo()
+        assert cold_storage.freeze() == 1
+        db.session.expire_all()
+        assert db.session.get(Task, old_id) is None
+        assert _cold_count(Task) == 1 and _cold_count(Comment) == 1 and _cold_count(TimeEntry) == 1
+        assert [task.title for task in cold_storage.archived_tasks_query().all()] == ["Bilan 2024"]
+
+
+def test_interrupted_thaw_keeps_main_copy(app, cold_db, admin_user, test_project, monkeypatch):
+    """Arrêt après la copie dans la base principale : elle fait foi, la copie froide est supprimée ensuite."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Bilan 2023", ARCHIVED_LONG_AGO)
+        cold_storage.freeze()
+
+        _interrupt_delete_from(monkeypatch, cold_storage.COLD_SCHEMA)
+        with pytest.raises(RuntimeError):
+            cold_storage.thaw(old_id)
+        task = db.session.get(Task, old_id)
+        assert [comment.content for comment in task.comments] == ["Commentaire Bilan 2023"]
+        assert _cold_count(Task) == 1
+        assert [task.id for task in cold_storage.archived_tasks_query().all()] == [old_id]
+
+        monkeypatch.undo()
+        task.is_archived = False
+        db.session.commit()
+        assert cold_storage.freeze() == 0
+        assert _cold_count(Task) == 0 and _cold_count(Comment) == 0
+        assert [comment.content for comment in db.session.get(Task, old_id).comments] == ["Commentaire Bilan 2023"]
+
+
+def test_deleting_project_purges_its_cold_tasks(app, client, cold_db, admin_user, test_project):
+    """Projet supprimé : ses tâches gelées partent aussi, rien ne réapparaît sous un projet reprenant son id."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        old_id = _create_task(project, admin, "Rapport trimestriel", ARCHIVED_LONG_AGO)
+        db.session.add(TaskAttachment(task_id=old_id, file_id="f" * 36, name="rapport.pdf", size=10, sha256="a" * 64))
+        db.session.commit()
+        cold_storage.freeze()
+        project_id, client_id = project.id, project.client_id
+        slug = project.slug
+
+    _login(client, admin_user)
+    assert client.post(f"/projects/{slug}/delete").status_code == 302
+
+    # Nouveau projet sur le même id (project n'est pas en AUTOINCREMENT)
+    db.session.add(Project(id=project_id, name="Nouveau projet", client_id=client_id))
+    db.session.commit()
+    for model in (Task, Comment, TimeEntry, TaskAttachment):
+        assert _cold_count(model) == 0
+    assert db.session.get(AttachmentBlob, "a" * 64).ref_count == 0
+    assert cold_storage.archived_tasks_query().all() == []
+    assert cold_storage.thaw(old_id) is None
+    assert "Rapport trimestriel" not in client.get("/archives").get_data(as_text=True)
+
+
+def test_deleting_client_purges_cold_tasks_of_its_projects(app, client, cold_db, admin_user, test_project):
+    """Client supprimé (projets en cascade) : les tâches gelées de ses projets sont supprimées."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        admin = db.session.merge(admin_user)
+        _create_task(project, admin, "Clôture annuelle", ARCHIVED_LONG_AGO)
+        cold_storage.freeze()
+        slug = project.client.slug
+
+    _login(client, admin_user)
+    assert client.post(f"/clients/{slug}/delete").status_code == 302
+    assert _cold_count(Task) == 0 and _cold_count(Comment) == 0
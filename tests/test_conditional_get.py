@@ -0,0 +1,129 @@
+"""
+Tests du GET conditionnel (ETag faible, 304) du kanban projet et de la page Mes tâches.
+"""
+
+import pytest
+from app import db
+from app.models.task import Task, TimeEntry
+from flask import g, template_rendered
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    # Le contexte d'application de la fixture est réutilisé par les requêtes : oublier l'utilisateur chargé
+    g.pop("_login_user", None)
+
+
+def _revalidate(client, url, etag, rendered):
+    """GET avec If-None-Match ; retourne (réponse, nombre de templates rendus)"""
+    rendered.clear()
+    response = client.get(url, headers={"If-None-Match": etag})
+    return response, len(rendered)
+
+
+@pytest.fixture
+def rendered(app):
+    """Noms des templates rendus pendant le test"""
+    names = []
+
+    def record(sender, template, context, **extra):
+        names.append(template.name)
+
+    template_rendered.connect(record, app)
+    yield names
+    template_rendered.disconnect(record, app)
+
+
+def test_project_kanban_returns_304_until_data_changes(app, client, rendered, admin_user, test_project):
+    """Le kanban rechargé sans changement répond 304 sans rendu ; une saisie de temps l'invalide."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Mise à jour serveur", project_id=project.id, status="en cours")
+        db.session.add(task)
+        db.session.commit()
+        url, task_id = f"/projects/{project.slug}", task.id
+
+    _login(client, admin_user)
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert "Content-Security-Policy" in first.headers
+
+    response, templates = _revalidate(client, url, etag, rendered)
+    assert response.status_code == 304
+    assert templates == 0
+    assert response.data == b""
+    # La page en cache garde sa CSP : un nouveau nonce ne correspondrait plus à ses scripts inline
+    assert "Content-Security-Policy" not in response.headers
+
+    with app.app_context():
+        db.session.add(TimeEntry(task_id=task_id, user_id=admin_user.id, minutes=30))
+        db.session.commit()
+    response, templates = _revalidate(client, url, etag, rendered)
+    assert response.status_code == 200
+    assert templates > 0
+    assert response.headers["ETag"] != etag
+
+
+def test_my_tasks_etag_follows_assignments_and_user(app, client, admin_user, technician_user, test_project):
+    """Mes tâches : nouvelle tâche assignée -> 200 ; l'ETag d'un utilisateur ne vaut pas pour un autre."""
+    _login(client, admin_user)
+    etag = client.get("/my-tasks").headers["ETag"]
+    assert client.get("/my-tasks", headers={"If-None-Match": etag}).status_code == 304
+
+    with app.app_context():
+        project = db.session.merge(test_project)
+        db.session.add(Task(title="Relancer le client", project_id=project.id, user_id=admin_user.id))
+        db.session.commit()
+    response = client.get("/my-tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Relancer le client" in response.get_data(as_text=True)
+
+    _login(client, technician_user)
+    assert client.get("/my-tasks", headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+
+
+def test_my_tasks_etag_follows_project_and_client_names(app, client, admin_user, test_project):
+    """Mes tâches : renommer un projet ou son client (cartes, filtre des projets) -> 200."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        db.session.add(Task(title="Préparer la démo", project_id=project.id, user_id=admin_user.id))
+        db.session.commit()
+    _login(client, admin_user)
+    etag = client.get("/my-tasks").headers["ETag"]
+
+    # Session de l'application (partagée avec les requêtes du client de test) : le commit expire le projet chargé
+    project = db.session.merge(test_project)
+    project.name = "Projet Renommé"
+    db.session.commit()
+    response = client.get("/my-tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Projet Renommé" in response.get_data(as_text=True)
+
+    etag = response.headers["ETag"]
+    project.client.name = "Client Renommé"
+    db.session.commit()
+    response = client.get("/my-tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Client Renommé" in response.get_data(as_text=True)
+
+
+def test_conditional_get_keeps_access_checks_and_flash_messages(app, client, admin_user, client_user, test_project):
+    """Un client sans accès reçoit 403 même avec un ETag ; un message flash en attente force le rendu."""
+    with app.app_context():
+        url = f"/projects/{db.session.merge(test_project).slug}"
+
+    _login(client, admin_user)
+    etag = client.get(url).headers["ETag"]
+    with client.session_transaction() as sess:
+        sess["_flashes"] = [("success", "Projet mis à jour")]
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Projet mis à jour" in response.get_data(as_text=True)
+
+    _login(client, client_user)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 403
@@ -2,6 +2,8 @@
 Tests de configuration de l'application Flask.
 """
 
+import os
+
 from app import create_app
 
 
@@ -9,7 +11,7 @@ def test_testing_config():
     """Test que la configuration de test fonctionne correctement."""
     app = create_app("testing")
     assert app.config["TESTING"] is True
-    assert app.config["SQLALCHEMY_DATABASE_URI"] == "sqlite:///test.db"
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == os.environ.get("TEST_DATABASE_URL", "sqlite:///test.db")
     assert app.config["WTF_CSRF_ENABLED"] is True  # Par défaut activé
 
 
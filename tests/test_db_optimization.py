@@ -0,0 +1,48 @@
+"""
+Tests du profil SQLite (PRAGMA, pool, recréation des moteurs après fork).
+"""
+
+import pytest
+from app import db
+from app.utils import db_optimization
+from sqlalchemy import text
+
+
+@pytest.fixture(autouse=True)
+def sqlite_only(app):
+    """Ces tests ne concernent que le profil SQLite (ignorés avec --db=postgresql)."""
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            pytest.skip("profil SQLite uniquement")
+
+
+def test_sqlite_pragmas_applied_from_config(app):
+    """Les PRAGMA de SQLITE_PRAGMAS sont appliqués à chaque connexion."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+            foreign_keys = conn.execute(text("PRAGMA foreign_keys")).scalar()
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+
+        assert busy_timeout == app.config["SQLITE_BUSY_TIMEOUT_MS"]
+        assert foreign_keys == 1
+        assert journal_mode.lower() == "wal"
+
+
+def test_sqlite_pool_sized_from_config(app):
+    """Le pool est dimensionné par DB_POOL_SIZE (plus de modification des attributs privés)."""
+    with app.app_context():
+        assert db.engine.pool.size() == app.config["DB_POOL_SIZE"]
+
+
+def test_engines_disposed_after_fork(app):
+    """Après fork, le pool hérité du parent est remplacé par un pool neuf."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        old_pool = db.engine.pool
+
+        db_optimization._dispose_engines_after_fork()
+
+        assert db.engine.pool is not old_pool
+        assert db.engine.pool.checkedin() == 0
@@ -0,0 +1,85 @@
+"""
+Tests du routage des vues en lecture seule vers le moteur "readonly".
+"""
+
+import pytest
+from app import db
+from app.models.project import Project
+from app.utils.db_routing import READ_ONLY_BIND, read_only_database_uri
+from app.utils.decorators import read_only_db
+from flask import Flask, g
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _uri_for(database_uri, read_uri=None):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["SQLALCHEMY_READONLY_DATABASE_URI"] = read_uri
+    return read_only_database_uri(app)
+
+
+def test_read_only_uri_derived_from_sqlite_path():
+    """Le même fichier SQLite est rouvert en mode=ro ; pas de routage implicite pour PostgreSQL."""
+    url = make_url(_uri_for("sqlite:///chronotrak.db"))
+    assert url.database == "file:chronotrak.db"
+    assert dict(url.query) == {"mode": "ro", "uri": "true"}
+    assert _uri_for("sqlite:///:memory:") is None
+    assert _uri_for("postgresql+psycopg://u:p@db/chronotrak") is None
+    assert _uri_for("postgresql+psycopg://u:p@db/chronotrak", "postgresql+psycopg://u:p@replica/chronotrak") == (
+        "postgresql+psycopg://u:p@replica/chronotrak"
+    )
+
+
+def test_read_only_views_use_read_only_engine(app, test_project):
+    """Dans une vue @read_only_db, les lectures passent par le moteur readonly qui refuse les écritures."""
+    with app.app_context():
+        if READ_ONLY_BIND not in db.engines:
+            pytest.skip("pas de moteur de lecture pour ce dialecte")
+
+        @read_only_db
+        def view():
+            assert db.session.get_bind(Project) is db.engines[READ_ONLY_BIND]
+            assert Project.query.count() == 1
+            with pytest.raises(OperationalError):
+                db.session.execute(text("DELETE FROM project"))
+            db.session.rollback()
+            return "ok"
+
+        assert view() == "ok"
+        assert not g.get("db_read_only")
+        assert db.session.get_bind(Project) is db.engine
+
+
+def test_reports_page_served_from_read_only_engine(app, client, admin_user, test_project):
+    """Les requêtes de la page des rapports (cumuls) passent par le moteur de lecture, pas par le principal."""
+    with app.app_context():
+        if READ_ONLY_BIND not in db.engines:
+            pytest.skip("pas de moteur de lecture pour ce dialecte")
+        engines = {"readonly": db.engines[READ_ONLY_BIND], "primary": db.engine}
+    statements = {name: [] for name in engines}
+    listeners = {}
+    for name, engine in engines.items():
+
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            statements[name].append(statement)
+
+        listeners[name] = record
+        event.listen(engine, "before_cursor_execute", record)
+    _login(client, admin_user)
+    try:
+        response = client.get("/reports")
+    finally:
+        for name, engine in engines.items():
+            event.remove(engine, "before_cursor_execute", listeners[name])
+
+    assert response.status_code == 200
+    assert any("time_rollup" in statement for statement in statements["readonly"])
+    assert not any("time_rollup" in statement for statement in statements["primary"])
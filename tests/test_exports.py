@@ -0,0 +1,121 @@
+"""
+Tests des exports en flux (CSV/XLSX) des saisies de temps, des crédits et de l'historique.
+"""
+
+import csv
+import io
+import zipfile
+from datetime import datetime
+
+from app import db
+from app.models.project import CreditLog
+from app.models.task import Task, TimeEntry
+from app.utils.export import iter_csv, iter_xlsx
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _add_entries(project, user):
+    task = Task(title="Tâche export", project_id=project.id)
+    db.session.add(task)
+    db.session.commit()
+    db.session.add_all(
+        [
+            TimeEntry(
+                task_id=task.id, user_id=user.id, minutes=30, description="Analyse", created_at=datetime(2026, 2, 3, 9)
+            ),
+            TimeEntry(task_id=task.id, user_id=user.id, minutes=45, created_at=datetime(2026, 3, 4, 9)),
+            CreditLog(project_id=project.id, amount=600, note="Crédit initial", created_at=datetime(2026, 1, 1, 8)),
+        ]
+    )
+    db.session.commit()
+
+
+def _csv_rows(response):
+    return list(csv.reader(io.StringIO(response.get_data().decode("utf-8-sig")), delimiter=";"))
+
+
+def test_iter_csv_streams_in_chunks():
+    """Le CSV est émis par morceaux, en-tête compris, avec BOM et valeurs vides pour None."""
+    chunks = list(iter_csv(["A", "B"], ((i, None) for i in range(5)), chunk_rows=2))
+
+    assert len(chunks) == 4
+    assert chunks[0].startswith(b"\xef\xbb\xbfA;B")
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig")), delimiter=";"))
+    assert rows[1:] == [[str(i), ""] for i in range(5)]
+
+
+def test_iter_csv_neutralizes_formulas():
+    """Un texte commençant par =, +, - ou @ est préfixé d'une apostrophe ; les nombres négatifs restent tels quels."""
+    values = ['=HYPERLINK("http://x")', "+1", "-2+3", "@SUM(A1)", "Réunion", -30]
+    rows = list(csv.reader(io.StringIO(b"".join(iter_csv(["A"] * 6, [values])).decode("utf-8-sig")), delimiter=";"))
+
+    assert rows[1] == ['\'=HYPERLINK("http://x")', "'+1", "'-2+3", "'@SUM(A1)", "Réunion", "-30"]
+
+
+def test_iter_xlsx_produces_valid_workbook():
+    """Le classeur en flux est une archive valide contenant toutes les lignes échappées."""
+    rows = [(datetime(2026, 1, 2, 3, 4, 5), "<Tâche & co>", 42)] * 3
+    data = b"".join(iter_xlsx(["Date", "Titre", "Minutes"], iter(rows), chunk_rows=2))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert sheet.count("<row>") == 4
+    assert "&lt;Tâche &amp; co&gt;" in sheet
+    assert "<v>42</v>" in sheet
+    assert "2026-01-02 03:04:05" in sheet
+
+
+def test_export_time_entries_csv_filtered_by_period(app, client, admin_user, test_project, technician_user):
+    """L'export des saisies applique la période demandée."""
+    with app.app_context():
+        _add_entries(db.session.merge(test_project), db.session.merge(technician_user))
+
+    _login(client, admin_user)
+    response = client.get("/exports/time-entries?start=2026-03-01&end=2026-03-31")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == 'attachment; filename="saisies-temps.csv"'
+    rows = _csv_rows(response)
+    assert rows[0][0] == "Date"
+    assert rows[1:] == [
+        ["2026-03-04 09:00:00", "Client Test", "Projet Test", "Tâche export", "Technicien Test", "45", ""]
+    ]
+
+
+def test_export_history_merges_credits_and_time(app, client, admin_user, test_project, technician_user):
+    """L'historique fusionne crédits et temps, du plus récent au plus ancien, au format XLSX."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        _add_entries(project, db.session.merge(technician_user))
+        project_id = project.id
+
+    _login(client, admin_user)
+    response = client.get(f"/exports/history?project_id={project_id}")
+    assert [row[:2] for row in _csv_rows(response)[1:]] == [
+        ["2026-03-04 09:00:00", "Temps"],
+        ["2026-02-03 09:00:00", "Temps"],
+        ["2026-01-01 08:00:00", "Crédit"],
+    ]
+
+    response = client.get(f"/exports/history?project_id={project_id}&format=xlsx")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        assert "Crédit initial" in archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+
+def test_export_scoped_to_accessible_projects(app, client, client_user, test_project, technician_user):
+    """Un client sans accès au projet n'exporte aucune ligne ; un format inconnu est refusé."""
+    with app.app_context():
+        _add_entries(db.session.merge(test_project), db.session.merge(technician_user))
+
+    _login(client, client_user)
+
+    assert len(_csv_rows(client.get("/exports/time-entries"))) == 1
+    assert len(_csv_rows(client.get("/exports/credit-logs"))) == 1
+    assert client.get("/exports/time-entries?format=pdf").status_code == 400
@@ -0,0 +1,85 @@
+"""
+Tests des requêtes fréquentes en lambda_stmt (app/utils/hot_queries.py) et du cache des colonnes chiffrées.
+"""
+
+from datetime import timedelta
+
+from app import db
+from app.models.client import Client
+from app.models.communication import Communication
+from app.models.search import task_search_filter
+from app.models.task import Comment, Task
+from app.utils import get_utc_now, hot_queries
+from sqlalchemy import select
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def test_encrypted_models_are_cacheable_and_still_encrypt_each_value(app, test_project, admin_user):
+    """Les requêtes sur les modèles chiffrés ont une clé de cache ; chaque valeur reste chiffrée à l'exécution."""
+    for model in (Client, Comment, Communication):
+        assert select(model)._generate_cache_key() is not None
+
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Chiffrement", project_id=project.id)
+        db.session.add(task)
+        db.session.flush()
+        for content in ("Premier secret", "Second secret"):
+            db.session.add(Comment(task_id=task.id, user_id=admin_user.id, content=content))
+        db.session.commit()
+
+        raw = db.session.execute(db.text("SELECT content FROM comment ORDER BY id")).scalars().all()
+        assert all(value.startswith("gAAA") for value in raw)
+        contents = [comment.content for comment in db.session.scalars(hot_queries.task_root_comments(task.id))]
+        assert sorted(contents) == ["Premier secret", "Second secret"]
+
+
+def test_hot_queries_bind_new_values_on_each_call(app, test_project, admin_user):
+    """Le SQL en cache est réutilisé avec les valeurs de chaque appel (slug, date, listes, critère de recherche)."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        today = get_utc_now().date()
+        first = Task(title="Rédiger le devis", project_id=project.id, user_id=admin_user.id, status="à faire")
+        second = Task(title="Installer le poste", project_id=project.id, user_id=admin_user.id, status="en cours")
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        assert db.session.scalars(hot_queries.task_by_slug(first.slug)).one().id == first.id
+        assert db.session.scalars(hot_queries.task_by_slug(second.slug)).one().id == second.id
+
+        client_ids = [project.client_id]
+        assert db.session.scalar(hot_queries.count_visible_tasks(today, client_ids=client_ids)) == 2
+        assert db.session.scalar(hot_queries.count_visible_tasks(today, "en cours", client_ids)) == 1
+        assert db.session.scalar(hot_queries.count_visible_tasks(today, client_ids=[])) == 0
+        assert db.session.scalar(hot_queries.count_visible_tasks(today - timedelta(days=1))) == 0
+
+        def my_tasks(**filters):
+            return sorted(
+                t.title for t in db.session.scalars(hot_queries.user_visible_tasks(admin_user.id, today, **filters))
+            )
+
+        assert my_tasks() == ["Installer le poste", "Rédiger le devis"]
+        assert my_tasks(statuses=["à faire"]) == ["Rédiger le devis"]
+        assert my_tasks(search_criteria=task_search_filter("devis")) == ["Rédiger le devis"]
+        assert my_tasks(search_criteria=task_search_filter("installer poste")) == ["Installer le poste"]
+
+
+def test_pages_served_from_hot_queries(app, client, admin_user, test_project):
+    """Tableau de bord, kanban, détail de tâche et mes tâches s'affichent avec les requêtes en lambda_stmt."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Sauvegarde mensuelle", project_id=project.id, user_id=admin_user.id, status="en cours")
+        db.session.add(task)
+        db.session.commit()
+        project_slug, task_slug = project.slug, task.slug
+
+    _login(client, admin_user)
+    for url in ("/dashboard", f"/projects/{project_slug}", f"/tasks/{task_slug}", "/my-tasks?search=sauvegarde"):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert "Sauvegarde mensuelle" in response.get_data(as_text=True), url
@@ -0,0 +1,55 @@
+"""
+Tests unitaires pour la colonne dérivée Task.visible_from.
+"""
+
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models.task import Task
+
+
+def test_visible_from_defaults_to_created_at(app, test_project):
+    """Sans planification, visible_from vaut la date de création."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Tâche visible", project_id=project.id, created_at=datetime(2026, 3, 4, 10, 30))
+        db.session.add(task)
+        db.session.commit()
+
+        assert task.visible_from == date(2026, 3, 4)
+
+
+def test_visible_from_follows_scheduled_for(app, test_project):
+    """visible_from suit scheduled_for, y compris après modification."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Occurrence planifiée", project_id=project.id, scheduled_for=date(2026, 5, 1))
+        db.session.add(task)
+        db.session.commit()
+        assert task.visible_from == date(2026, 5, 1)
+
+        task.scheduled_for = date(2026, 6, 1)
+        db.session.commit()
+        assert task.visible_from == date(2026, 6, 1)
+
+        task.scheduled_for = None
+        db.session.commit()
+        assert task.visible_from == task.created_at.date()
+
+
+def test_visible_on_filters_future_occurrences(app, test_project):
+    """visible_on() exclut les occurrences planifiées dans le futur."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        today = date.today()
+        past = Task(title="Passée", project_id=project.id, scheduled_for=today - timedelta(days=1))
+        current = Task(title="Aujourd'hui", project_id=project.id, scheduled_for=today)
+        future = Task(title="Future", project_id=project.id, scheduled_for=today + timedelta(days=7))
+        plain = Task(title="Sans planification", project_id=project.id)
+        db.session.add_all([past, current, future, plain])
+        db.session.commit()
+
+        visible = {t.title for t in Task.query.filter(Task.visible_on(today)).all()}
+        assert visible == {"Passée", "Aujourd'hui", "Sans planification"}
+        assert future.is_visible_on(today) is False
+        assert plain.is_visible_on(today) is True
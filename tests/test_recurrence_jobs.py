@@ -0,0 +1,152 @@
+"""
+Tests des tâches récurrentes : matérialisation des occurrences en tâche de fond, synchronisation des checklists.
+"""
+
+import pytest
+from app import db
+from app.models.search import SearchDocument
+from app.models.task import ChecklistItem, RecurrenceJob, Task, TaskRecurrenceSeries, TimeEntry
+from app.utils import get_utc_now
+from app.utils.recurrence import BATCH_SIZE, enqueue_materialization, process_jobs
+from sqlalchemy import event
+
+
+@pytest.fixture(autouse=True)
+def detach_series(app):
+    yield
+    # task <-> task_recurrence_series forment un cycle de clés étrangères : le rompre avant drop_all
+    with app.app_context():
+        Task.query.update({Task.recurrence_series_id: None})
+        RecurrenceJob.query.delete()
+        TaskRecurrenceSeries.query.delete()
+        db.session.commit()
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _create_task(project, title="Tâche récurrente"):
+    task = Task(title=title, project_id=db.session.merge(project).id)
+    db.session.add(task)
+    db.session.flush()
+    db.session.add(ChecklistItem(task_id=task.id, content="Étape 1", position=0))
+    db.session.commit()
+    return task
+
+
+def test_upsert_enqueues_job_and_worker_creates_occurrences(app, client, admin_user, test_project):
+    """La requête ne crée que la série et un travail ; le traitement crée les occurrences par lots."""
+    with app.app_context():
+        task = _create_task(test_project)
+        task_slug, task_id = task.slug, task.id
+    _login(client, admin_user)
+
+    response = client.post(f"/tasks/{task_slug}/recurrence", json={"frequency": "daily"})
+
+    assert response.status_code == 200
+    assert response.get_json()["materialization"] == {"status": "pending", "created": 0, "total": None, "error": None}
+    with app.app_context():
+        series_id = db.session.get(Task, task_id).recurrence_series_id
+        assert Task.query.filter_by(recurrence_series_id=series_id).count() == 1
+
+        assert process_jobs() == 1
+
+        job = RecurrenceJob.query.one()
+        assert job.status == "done" and job.total > BATCH_SIZE and job.created_count == job.total
+        occurrences = Task.query.filter(Task.recurrence_series_id == series_id, Task.id != task_id).all()
+        assert len(occurrences) == job.total
+        assert len({t.slug for t in occurrences}) == job.total
+        assert all([item.content for item in t.checklist_items] == ["Étape 1"] for t in occurrences)
+
+    progress = client.get(f"/tasks/{task_slug}/recurrence").get_json()["materialization"]
+    assert progress["status"] == "done" and progress["created"] == progress["total"]
+
+
+def test_newer_job_replaces_pending_job(app, client, admin_user, test_project):
+    """Une modification avant traitement annule le travail en attente : un seul travail est exécuté."""
+    with app.app_context():
+        task = _create_task(test_project)
+        task_slug = task.slug
+    _login(client, admin_user)
+
+    client.post(f"/tasks/{task_slug}/recurrence", json={"frequency": "daily"})
+    client.post(f"/tasks/{task_slug}/recurrence", json={"frequency": "weekly", "byweekday": [0]})
+
+    with app.app_context():
+        assert [job.status for job in RecurrenceJob.query.order_by(RecurrenceJob.id)] == ["cancelled", "pending"]
+        assert RecurrenceJob.query.order_by(RecurrenceJob.id).all()[1].replace
+
+        assert process_jobs() == 1
+
+        series_id = Task.query.filter_by(slug=task_slug).one().recurrence_series_id
+        scheduled = [
+            t.scheduled_for for t in Task.query.filter_by(recurrence_series_id=series_id) if t.slug != task_slug
+        ]
+        assert scheduled and all(d.weekday() == 0 for d in scheduled)
+
+
+def test_process_recurrence_jobs_command(app, runner, test_project):
+    """La commande traite la file quand le thread de fond est désactivé."""
+    with app.app_context():
+        task = _create_task(test_project)
+        series = TaskRecurrenceSeries(
+            template_task_id=task.id, start_date=get_utc_now().date(), frequency="monthly", interval=1
+        )
+        db.session.add(series)
+        db.session.flush()
+        task.recurrence_series_id = series.id
+        enqueue_materialization(series)
+        db.session.commit()
+
+    result = runner.invoke(args=["process-recurrence-jobs"])
+
+    assert result.exit_code == 0, result.output
+    assert "✓ 1 travail(aux) de récurrence traité(s)." in result.output
+    with app.app_context():
+        assert RecurrenceJob.query.one().status == "done"
+
+
+def test_checklist_sync_runs_constant_number_of_queries(app, client, admin_user, test_project):
+    """Synchronisation ensembliste : items manquants ajoutés (et indexés), occurrences avec temps ignorées."""
+    with app.app_context():
+        task = _create_task(test_project)
+        task_slug, task_id = task.slug, task.id
+    _login(client, admin_user)
+    client.post(f"/tasks/{task_slug}/recurrence", json={"frequency": "daily"})
+
+    with app.app_context():
+        process_jobs()
+        db.session.add(ChecklistItem(task_id=task_id, content="Étape 2", position=1))
+        occurrences = Task.query.filter(Task.recurrence_series_id.isnot(None), Task.id != task_id).order_by(Task.id)
+        logged = occurrences.first()
+        db.session.add(TimeEntry(task_id=logged.id, user_id=admin_user.id, minutes=30))
+        db.session.commit()
+        future_count = occurrences.filter(Task.scheduled_for > logged.scheduled_for).count() + 1
+
+    statements = []
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", count_query)
+    try:
+        response = client.post(f"/tasks/{task_slug}/recurrence/checklist/sync")
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "before_cursor_execute", count_query)
+
+    data = response.get_json()
+    assert data["success"] and data["skipped_time_logged"] == 1
+    assert data["updated_tasks"] == data["added_items_total"] == future_count - 1
+    assert len(statements) < 20
+    with app.app_context():
+        logged = db.session.get(Task, logged.id)
+        assert [item.content for item in logged.checklist_items] == ["Étape 1"]
+        synced = Task.query.filter(Task.recurrence_series_id.isnot(None), Task.id != task_id).order_by(Task.id)[1]
+        assert [(item.content, item.position) for item in synced.checklist_items] == [("Étape 1", 0), ("Étape 2", 1)]
+        indexed = SearchDocument.query.filter_by(entity_type="checklist_item", task_id=synced.id).count()
+        assert indexed == 2
@@ -0,0 +1,119 @@
+"""
+Tests du moteur de (re)chiffrement (commande flask reencrypt) : clair, rotation de clé, reprise.
+"""
+
+import json
+
+import sqlalchemy as sa
+from app import db
+from app.models.client import Client
+from app.models.search import CommentSearchToken, task_search_filter
+from app.models.task import Comment, Task
+from app.utils.reencryption import key_fingerprint, reencrypt
+from cryptography.fernet import Fernet
+
+CLIENT_TABLE = sa.table("client", sa.column("id"), sa.column("name"), sa.column("slug"), sa.column("email"))
+
+
+def _insert_raw_clients(emails):
+    """Insère des clients avec une valeur brute (sans EncryptedType) dans la colonne email"""
+    db.session.execute(
+        CLIENT_TABLE.insert(),
+        [{"name": f"Client {i}", "slug": f"client-{i}", "email": email} for i, email in enumerate(emails, 1)],
+    )
+    db.session.commit()
+
+
+def _raw_emails():
+    return [email for (email,) in db.session.execute(sa.select(CLIENT_TABLE.c.email).order_by(CLIENT_TABLE.c.id))]
+
+
+def test_reencrypt_encrypts_plaintext_and_rotates_old_key(app, tmp_path):
+    """Valeurs en clair chiffrées, ancienne clé remplacée par la nouvelle, valeurs à jour inchangées."""
+    with app.app_context():
+        old_key = app.config["ENCRYPTION_KEY"]
+        new_key = Fernet.generate_key().decode()
+        old_token = Fernet(old_key).encrypt(b"ancien@example.com").decode()
+        current_token = Fernet(new_key).encrypt(b"courant@example.com").decode()
+        _insert_raw_clients(["clair@example.com", old_token, current_token, None])
+        app.config.update(ENCRYPTION_KEY=new_key, ENCRYPTION_OLD_KEYS=[old_key])
+
+        results = reencrypt(tables=["client"], chunk_size=2, workers=1, state_path=str(tmp_path / "state.json"))
+
+        stats = results["client"]
+        assert (stats["rows"], stats["encrypted"], stats["rotated"], stats["current"]) == (4, 1, 1, 1)
+        raw = _raw_emails()
+        assert raw[2] == current_token and raw[3] is None
+        new_fernet = Fernet(new_key)
+        assert [new_fernet.decrypt(value.encode()).decode() for value in raw[:2]] == [
+            "clair@example.com",
+            "ancien@example.com",
+        ]
+        # L'application lit les valeurs sans l'ancienne clé
+        app.config["ENCRYPTION_OLD_KEYS"] = []
+        db.session.expire_all()
+        assert sorted(client.email for client in Client.query if client.email) == [
+            "ancien@example.com",
+            "clair@example.com",
+            "courant@example.com",
+        ]
+        assert not (tmp_path / "state.json").exists()  # parcours complet
+
+
+def test_reencrypt_resumes_from_checkpoint(app, tmp_path):
+    """Une reprise ne retraite pas les lots déjà enregistrés dans le fichier d'état."""
+    with app.app_context():
+        _insert_raw_clients(["a@example.com", "b@example.com", "c@example.com"])
+        first_id = db.session.execute(sa.select(sa.func.min(CLIENT_TABLE.c.id))).scalar()
+        state_path = tmp_path / "state.json"
+        fingerprint = key_fingerprint(app.config["ENCRYPTION_KEY"])
+        state_path.write_text(json.dumps({"key_fingerprint": fingerprint, "tables": {"client": first_id}}))
+
+        results = reencrypt(tables=["client"], workers=1, state_path=str(state_path))
+
+        assert results["client"]["encrypted"] == 2
+        assert _raw_emails()[0] == "a@example.com"
+
+
+def test_reencrypt_command_with_process_pool(app, runner):
+    """La commande répartit le chiffrement sur un pool de processus."""
+    with app.app_context():
+        _insert_raw_clients([f"contact{i}@example.com" for i in range(10)])
+
+    result = runner.invoke(args=["reencrypt", "--table", "client", "--chunk-size", "3", "--workers", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert "10 valeur(s) (re)chiffrée(s)" in result.output
+    with app.app_context():
+        assert all(email.startswith("gAAA") for email in _raw_emails())
+
+
+def test_reencrypt_rebuilds_comment_index_whenever_its_key_changed(app, runner, test_project, admin_user):
+    """Commentaires déjà rotatés par une exécution interrompue : la reprise (--table client) reconstruit l'index."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Migration DNS", project_id=project.id)
+        db.session.add(task)
+        db.session.flush()
+        db.session.add(Comment(content="Propagation terminée", task_id=task.id, user_id=admin_user.id))
+        db.session.commit()
+        CommentSearchToken.rebuild()
+        assert not CommentSearchToken.is_stale()
+
+        old_key = app.config["ENCRYPTION_KEY"]
+        app.config.update(ENCRYPTION_KEY=Fernet.generate_key().decode(), ENCRYPTION_OLD_KEYS=[old_key])
+        # Exécution arrêtée après la table comment, avant la reconstruction de l'index
+        assert reencrypt(tables=["comment"], workers=1)["comment"]["rotated"] == 1
+        assert CommentSearchToken.is_stale()
+        assert Task.query.filter(task_search_filter("propagation")).count() == 0
+
+    result = runner.invoke(args=["reencrypt", "--table", "client", "--workers", "1"])
+
+    assert result.exit_code == 0, result.output
+    assert "Index des commentaires reconstruit" in result.output
+    with app.app_context():
+        assert not CommentSearchToken.is_stale()
+        assert [task.title for task in Task.query.filter(task_search_filter("propagation"))] == ["Migration DNS"]
+
+    result = runner.invoke(args=["reencrypt", "--table", "client", "--workers", "1"])
+    assert "Index des commentaires reconstruit" not in result.output
@@ -0,0 +1,165 @@
+"""
+Tests des cumuls de temps (time_rollup_daily/monthly) et de la page des rapports.
+"""
+
+from datetime import date, datetime
+
+from app import db
+from app.models.client import Client
+from app.models.project import Project
+from app.models.task import Task, TimeEntry, TimeRollupDaily, TimeRollupMonthly
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _rollups():
+    return {(r.day, r.project_id, r.user_id): (r.minutes, r.entry_count) for r in TimeRollupDaily.query.all()}
+
+
+def _monthly_rollups():
+    return {(r.month, r.project_id, r.user_id): (r.minutes, r.entry_count) for r in TimeRollupMonthly.query.all()}
+
+
+def _add_entry(task, user, minutes, created_at):
+    entry = TimeEntry(task_id=task.id, user_id=user.id, minutes=minutes, created_at=created_at)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def test_rollup_follows_time_entry_insert_update_delete(app, test_project, technician_user):
+    """Les cumuls suivent les ajouts, modifications et suppressions de saisies."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        user = db.session.merge(technician_user)
+        task = Task(title="Tâche cumul", project_id=project.id)
+        db.session.add(task)
+        db.session.commit()
+        key = (date(2026, 3, 2), project.id, user.id)
+
+        first = _add_entry(task, user, 30, datetime(2026, 3, 2, 9))
+        second = _add_entry(task, user, 45, datetime(2026, 3, 2, 15))
+        third = _add_entry(task, user, 15, datetime(2026, 3, 20, 15))
+        assert _rollups() == {key: (75, 2), (date(2026, 3, 20), project.id, user.id): (15, 1)}
+        assert _monthly_rollups() == {("2026-03", project.id, user.id): (90, 3)}
+
+        db.session.delete(third)
+        db.session.commit()
+        assert _rollups() == {key: (75, 2)}
+        assert _monthly_rollups() == {("2026-03", project.id, user.id): (75, 2)}
+
+        second.minutes = 60
+        db.session.commit()
+        assert _rollups() == {key: (90, 2)}
+
+        db.session.delete(first)
+        db.session.commit()
+        assert _rollups() == {key: (60, 1)}
+
+        db.session.delete(second)
+        db.session.commit()
+        assert _rollups() == {}
+        assert _monthly_rollups() == {}
+
+
+def test_rebuild_matches_incremental_rollups(app, test_project, technician_user, admin_user):
+    """La reconstruction complète donne le même résultat que la maintenance incrémentale."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        tech = db.session.merge(technician_user)
+        admin = db.session.merge(admin_user)
+        task = Task(title="Tâche reconstruction", project_id=project.id)
+        db.session.add(task)
+        db.session.commit()
+        _add_entry(task, tech, 15, datetime(2026, 1, 10, 8))
+        _add_entry(task, tech, 20, datetime(2026, 1, 10, 18))
+        _add_entry(task, admin, 60, datetime(2026, 2, 1, 12))
+        incremental = (_rollups(), _monthly_rollups())
+
+        assert TimeRollupDaily.rebuild() == 2
+        assert (_rollups(), _monthly_rollups()) == incremental
+
+
+def test_reports_filter_by_period_and_project(app, client, admin_user, test_project, technician_user):
+    """La page des rapports applique la période et l'exploration par projet."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        user = db.session.merge(technician_user)
+        other = Project(name="Projet Hors Filtre", client_id=project.client_id)
+        db.session.add(other)
+        db.session.commit()
+        task = Task(title="Tâche rapport", project_id=project.id)
+        other_task = Task(title="Autre tâche", project_id=other.id)
+        db.session.add_all([task, other_task])
+        db.session.commit()
+        _add_entry(task, user, 90, datetime(2026, 3, 5, 10))
+        _add_entry(task, user, 30, datetime(2025, 12, 5, 10))
+        _add_entry(other_task, user, 45, datetime(2026, 3, 6, 10))
+        project_id = project.id
+
+    _login(client, admin_user)
+
+    response = client.get(f"/reports?start=2026-01-01&end=2026-12-31&project_id={project_id}")
+
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Projet Test" in html
+    assert "Projet Hors Filtre" not in html
+    assert "1h30min" in html
+    assert "2025-12" not in html
+
+
+def test_reports_partial_month_uses_daily_rollups(app, client, admin_user, test_project, technician_user):
+    """Une période qui ne couvre pas des mois entiers est calculée au jour près."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        user = db.session.merge(technician_user)
+        task = Task(title="Tâche mi-mois", project_id=project.id)
+        db.session.add(task)
+        db.session.commit()
+        _add_entry(task, user, 90, datetime(2026, 3, 5, 10))
+        _add_entry(task, user, 30, datetime(2026, 3, 20, 10))
+
+    _login(client, admin_user)
+
+    html = client.get("/reports?start=2026-03-10&end=2026-03-31").get_data(as_text=True)
+
+    assert "30min" in html
+    assert "1h30min" not in html
+    assert "2h" not in html
+
+
+def test_reports_filters_stay_within_client_scope(app, client, client_user, test_project, technician_user, admin_user):
+    """Un client ne peut filtrer (ni voir le nom) d'un projet ou d'un utilisateur hors de son périmètre."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        viewer = db.session.merge(client_user)
+        viewer.clients.append(project.client)
+        other_client = Client(name="Client Confidentiel")
+        db.session.add(other_client)
+        db.session.flush()
+        secret = Project(name="Projet Confidentiel", client_id=other_client.id)
+        db.session.add(secret)
+        db.session.commit()
+        task = Task(title="Tâche visible", project_id=project.id)
+        secret_task = Task(title="Tâche confidentielle", project_id=secret.id)
+        db.session.add_all([task, secret_task])
+        db.session.commit()
+        _add_entry(task, db.session.merge(technician_user), 60, datetime(2026, 3, 5, 10))
+        _add_entry(secret_task, db.session.merge(admin_user), 30, datetime(2026, 3, 5, 10))
+        ids = project.id, secret.id, technician_user.id, admin_user.id
+
+    project_id, secret_id, technician_id, admin_id = ids
+    _login(client, client_user)
+
+    assert client.get(f"/reports?project_id={secret_id}").status_code == 404
+    assert client.get(f"/reports?user_id={admin_id}").status_code == 404
+    response = client.get(f"/reports?project_id={project_id}&user_id={technician_id}")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Projet : Projet Test" in html
+    assert "Projet Confidentiel" not in html
@@ -0,0 +1,151 @@
+"""
+Tests de la recherche plein texte (index search_document, index aveugle des commentaires, page /search).
+"""
+
+from app import db
+from app.models.client import Client
+from app.models.project import Project
+from app.models.search import CommentSearchToken, SearchDocument, task_search_filter
+from app.models.task import ChecklistItem, Comment, Task
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _matching_titles(text):
+    return sorted(task.title for task in Task.query.filter(task_search_filter(text)))
+
+
+def test_index_is_accent_insensitive_and_incremental(app, test_project):
+    """Titres, descriptions et checklists sont trouvés sans accents, et l'index suit les modifications."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Réunion d'équipe", description="Ordre du jour", project_id=project.id)
+        other = Task(title="Déploiement", project_id=project.id)
+        db.session.add_all([task, other])
+        db.session.flush()
+        db.session.add(ChecklistItem(content="Préparer le café", task_id=other.id))
+        db.session.commit()
+
+        assert _matching_titles("reunion EQUIPE") == ["Réunion d'équipe"]
+        assert _matching_titles("ordre") == ["Réunion d'équipe"]
+        assert _matching_titles("cafe") == ["Déploiement"]
+        assert _matching_titles("depl") == ["Déploiement"]  # préfixe
+        assert _matching_titles("reunion cafe") == []
+
+        task.title = "Point hebdomadaire"
+        db.session.commit()
+        assert _matching_titles("reunion") == []
+        assert _matching_titles("hebdo") == ["Point hebdomadaire"]
+
+        db.session.delete(other)
+        db.session.commit()
+        assert _matching_titles("cafe") == []
+        assert SearchDocument.query.filter_by(task_id=other.id).count() == 0
+
+
+def test_search_page_ranks_and_scopes_results(app, client, client_user, test_project):
+    """La recherche globale classe les titres avant les descriptions et respecte le périmètre client."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        other_client = Client(name="Autre société")
+        db.session.add(other_client)
+        db.session.flush()
+        hidden = Project(name="Migration cachée", client_id=other_client.id, initial_credit=0, remaining_credit=0)
+        db.session.add_all(
+            [
+                hidden,
+                Task(title="Notes", description="Suivi de la migration serveur", project_id=project.id),
+                Task(title="Migration serveur", project_id=project.id),
+            ]
+        )
+        user = db.session.merge(client_user)
+        user.clients.append(project.client)
+        db.session.commit()
+    _login(client, client_user)
+
+    response = client.get("/search?q=migration")
+
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "2 résultat(s)" in html
+    assert html.index("Migration serveur") < html.index("Notes")
+    assert "Migration cachée" not in html
+
+
+def test_project_list_search_uses_index(app, client, admin_user, test_project):
+    """Le filtre de recherche de la liste des projets passe par l'index (sans accents)."""
+    with app.app_context():
+        client_id = db.session.merge(test_project).client_id
+        db.session.add(Project(name="Évolution site", client_id=client_id, initial_credit=0, remaining_credit=0))
+        db.session.commit()
+    _login(client, admin_user)
+
+    html = client.get("/projects?search=evolution").get_data(as_text=True)
+
+    assert "Évolution site" in html
+    assert "Projet Test" not in html
+
+
+def test_rebuild_search_index(app, runner, test_project):
+    """La commande de reconstruction réindexe toutes les entités."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        db.session.add(Task(title="Sauvegarde", project_id=project.id))
+        db.session.commit()
+        db.session.execute(SearchDocument.__table__.delete())
+        db.session.commit()
+
+    result = runner.invoke(args=["rebuild-search-index"])
+
+    assert result.exit_code == 0, result.output
+    assert "3 document(s)" in result.output  # client, projet, tâche
+    with app.app_context():
+        assert _matching_titles("sauvegarde") == ["Sauvegarde"]
+
+
+def test_comment_blind_index(app, test_project, technician_user):
+    """Les commentaires chiffrés sont trouvés par jetons HMAC, sans texte clair dans l'index."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Incident", project_id=project.id)
+        db.session.add(task)
+        db.session.flush()
+        comment = Comment(content="Le serveur de préproduction est tombé", task_id=task.id, user_id=technician_user.id)
+        db.session.add(comment)
+        db.session.commit()
+
+        tokens = [token for (token,) in db.session.query(CommentSearchToken.token)]
+        assert len(tokens) == 6  # le, serveur, de, preproduction, est, tombe
+        assert not any("serveur" in token for token in tokens)
+        assert _matching_titles("PRÉPRODUCTION serveur") == ["Incident"]
+        assert _matching_titles("preprod") == []  # mots entiers uniquement
+
+        comment.content = "Redémarrage effectué"
+        db.session.commit()
+        assert _matching_titles("serveur") == []
+        assert _matching_titles("redemarrage") == ["Incident"]
+
+        db.session.delete(comment)
+        db.session.commit()
+        assert CommentSearchToken.query.count() == 0
+
+
+def test_search_page_lists_matching_comments(app, client, admin_user, test_project):
+    """La recherche globale liste les commentaires correspondants (déchiffrés pour l'affichage)."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Maintenance", project_id=project.id)
+        db.session.add(task)
+        db.session.flush()
+        db.session.add(Comment(content="Sauvegarde vérifiée", task_id=task.id, user_id=admin_user.id))
+        db.session.commit()
+    _login(client, admin_user)
+
+    html = client.get("/search?q=verifiee").get_data(as_text=True)
+
+    assert "Commentaires" in html
+    assert "Sauvegarde vérifiée" in html
@@ -0,0 +1,56 @@
+"""
+Tests du profil de démarrage (app/utils/startup.py) : CLI allégée, Flask-Migrate différé, aucune connexion.
+"""
+
+import click
+from app import create_app
+from flask import url_for
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _create_cli_app():
+    """Application créée comme par une commande cron (`flask auto-archive`)"""
+    with click.Context(click.Command("auto-archive"), info_name="auto-archive"):
+        return create_app("testing")
+
+
+def test_cli_profile_skips_web_parts_and_registers_routes_on_demand(app):
+    """Profil cli : ni blueprints ni extensions web ; le premier url_for() enregistre les routes."""
+    cli_app = _create_cli_app()
+    assert not cli_app.blueprints
+    assert not hasattr(cli_app, "login_manager")
+    assert "csrf" not in cli_app.extensions
+    assert {"task", "user", "client", "search_document"} <= set(cli_app.extensions["sqlalchemy"].metadata.tables)
+
+    cli_app.config["SERVER_NAME"] = "chronotrak.test"
+    with cli_app.app_context():
+        assert url_for("tasks.task_details", slug_or_id="ma-tache") == "http://chronotrak.test/tasks/ma-tache"
+    assert set(cli_app.blueprints) == set(app.blueprints)
+
+
+def test_migrate_is_loaded_by_db_command_only(app, runner):
+    """`flask db` charge Flask-Migrate à son exécution, pas à la création de l'application."""
+    assert "migrate" not in app.extensions
+
+    result = runner.invoke(args=["db", "--help"])
+
+    assert result.exit_code == 0, result.output
+    assert "upgrade" in result.output
+    assert "migrate" in app.extensions
+
+
+def test_create_app_opens_no_database_connection(app):
+    """Le démarrage (web ou cli) n'ouvre aucune connexion : elles le sont à la première requête."""
+    connections = []
+
+    def record(dbapi_connection, connection_record):
+        connections.append(dbapi_connection)
+
+    event.listen(Engine, "connect", record)
+    try:
+        create_app("testing")
+        _create_cli_app()
+    finally:
+        event.remove(Engine, "connect", record)
+    assert connections == []
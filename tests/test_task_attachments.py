@@ -0,0 +1,280 @@
+"""
+Tests des pièces jointes de tâches (métadonnées en base, import des anciens manifest.json).
+"""
+
+import hashlib
+import io
+import json
+import os
+
+import pytest
+from app import db
+from app.models.task import AttachmentBlob, Task, TaskAttachment
+from app.utils import task_attachments
+
+PDF_CONTENT = b"%PDF-1.4 contenu de test"
+
+
+@pytest.fixture
+def attachments_folder(app, tmp_path):
+    app.config["TASK_ATTACHMENTS_UPLOAD_FOLDER"] = str(tmp_path)
+    return tmp_path
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _create_task(project, title="Tâche PJ"):
+    task = Task(title=title, project_id=db.session.merge(project).id)
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+
+def test_save_list_and_delete_attachment(app, attachments_folder, test_project):
+    """Enregistrement avec sha256, liste depuis la base, suppression de la ligne et du fichier."""
+    with app.app_context():
+        task = _create_task(test_project)
+
+        meta = task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "../Devis client.pdf")
+
+        attachment = TaskAttachment.query.filter_by(file_id=meta["id"]).one()
+        assert (attachment.name, attachment.size) == ("Devis client.pdf", len(PDF_CONTENT))
+        assert attachment.sha256 == hashlib.sha256(PDF_CONTENT).hexdigest()
+        assert task_attachments.list_attachments(task.id) == [meta]
+        path, name = task_attachments.get_attachment_path_and_name(task.id, meta["id"])
+        assert path.read_bytes() == PDF_CONTENT and name == "Devis client.pdf"
+        assert task_attachments.get_attachment_path_and_name(task.id + 1, meta["id"]) is None
+
+        assert task_attachments.delete_attachment(task.id, meta["id"])
+        assert TaskAttachment.query.count() == 0
+        assert not path.exists()
+
+
+def test_max_attachments_per_task(app, attachments_folder, test_project):
+    """La limite par tâche est vérifiée par un comptage en base."""
+    app.config["TASK_ATTACHMENTS_MAX_FILES_PER_TASK"] = 1
+    with app.app_context():
+        task = _create_task(test_project)
+        task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "a.pdf")
+
+        with pytest.raises(ValueError, match="Nombre maximum"):
+            task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "b.pdf")
+
+
+def test_import_attachment_manifests(app, runner, attachments_folder, test_project):
+    """Les anciens manifest.json sont importés une seule fois ; les fichiers absents sont ignorés."""
+    with app.app_context():
+        task = _create_task(test_project)
+        task_dir = task_attachments.get_task_attachment_dir(task.id)
+        file_id, missing_id = "0b9f3c1e-6a55-4a43-9d7e-2f1f1f7f4c11", "5d2e8a40-1c7b-4b1e-8f6a-3e9d2c7b1a00"
+        (task_dir / file_id).write_bytes(PDF_CONTENT)
+        manifest = {
+            file_id: {"original_name": "ancien.pdf", "size": 1, "uploaded_at": "2025-01-02T03:04:05Z"},
+            missing_id: {"original_name": "disparu.pdf", "size": 1, "uploaded_at": "2025-01-02T03:04:05Z"},
+        }
+        (task_dir / task_attachments.MANIFEST_FILENAME).write_text(json.dumps(manifest))
+        task_id = task.id
+
+    result = runner.invoke(args=["import-attachment-manifests"])
+
+    assert result.exit_code == 0, result.output
+    assert "1 pièce(s) jointe(s) importée(s), 1 entrée(s) ignorée(s)" in result.output
+    with app.app_context():
+        assert task_attachments.list_attachments(task_id) == [
+            {"id": file_id, "name": "ancien.pdf", "size": len(PDF_CONTENT), "uploaded_at": "2025-01-02T03:04:05Z"}
+        ]
+        assert TaskAttachment.query.one().sha256 == hashlib.sha256(PDF_CONTENT).hexdigest()
+    assert not (task_dir / task_attachments.MANIFEST_FILENAME).exists()
+    digest = hashlib.sha256(PDF_CONTENT).hexdigest()
+    assert (attachments_folder / "blobs" / digest[:2] / digest).is_file()  # déplacé dans le stockage par contenu
+    assert not (task_dir / file_id).exists()
+    assert runner.invoke(args=["import-attachment-manifests"]).output.count("0 pièce(s)") == 1
+
+
+def test_kanban_shows_attachment_count(app, client, admin_user, attachments_folder, test_project):
+    """Le kanban du projet affiche le nombre de pièces jointes par tâche."""
+    with app.app_context():
+        task = _create_task(test_project, title="Avec fichiers")
+        for name in ("a.pdf", "b.pdf"):
+            task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), name)
+        _create_task(test_project, title="Sans fichier")
+        project_slug = db.session.merge(test_project).slug
+    _login(client, admin_user)
+
+    html = client.get(f"/projects/{project_slug}").get_data(as_text=True)
+
+    assert html.count("fa-paperclip") == 1
+    assert '<i class="fas fa-paperclip me-1"></i>2' in html
+
+
+def test_identical_uploads_share_one_blob(app, attachments_folder, test_project):
+    """Un contenu identique est stocké une fois ; le fichier est supprimé avec sa dernière référence."""
+    with app.app_context():
+        task = _create_task(test_project)
+        first = task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "a.pdf")
+        second = task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "b.pdf")
+
+        blob = db.session.get(AttachmentBlob, hashlib.sha256(PDF_CONTENT).hexdigest())
+        assert blob.ref_count == 2
+        assert len(list((attachments_folder / "blobs").glob("*/*"))) == 1
+        assert task_attachments.disk_usage()["saved_bytes"] == len(PDF_CONTENT)
+
+        task_attachments.delete_attachment(task.id, first["id"])
+        path, _ = task_attachments.get_attachment_path_and_name(task.id, second["id"])
+        assert path.read_bytes() == PDF_CONTENT
+        task_attachments.delete_attachment(task.id, second["id"])
+        assert AttachmentBlob.query.count() == 0
+        assert not path.exists()
+
+
+def test_clone_shares_attachments_and_task_deletion_releases(app, attachments_folder, test_project):
+    """Le clonage ajoute des références sans copier de fichier ; la suppression des tâches les libère."""
+    with app.app_context():
+        task = _create_task(test_project)
+        task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "a.pdf")
+        clone = task.clone()
+        db.session.add(clone)
+        db.session.commit()
+
+        assert [a["name"] for a in task_attachments.list_attachments(clone.id)] == ["a.pdf"]
+        assert AttachmentBlob.query.one().ref_count == 2
+
+        for deleted in (task, clone):
+            db.session.delete(deleted)
+            db.session.commit()
+            task_attachments.delete_task_attachments_folder(deleted.id)
+        assert AttachmentBlob.query.count() == 0
+        assert not list((attachments_folder / "blobs").glob("*/*"))
+
+
+def test_clone_of_legacy_attachment_is_downloadable(app, attachments_folder, test_project):
+    """Fichier encore dans l'ancien stockage par tâche : le clonage le place dans blobs/, les deux tâches le lisent."""
+    with app.app_context():
+        task = _create_task(test_project)
+        file_id = "7c1d9e2a-3b4f-4a5e-8c6d-1e2f3a4b5c6d"
+        (task_attachments.get_task_attachment_dir(task.id) / file_id).write_bytes(PDF_CONTENT)
+        digest = hashlib.sha256(PDF_CONTENT).hexdigest()
+        db.session.add(
+            TaskAttachment(task_id=task.id, file_id=file_id, name="ancien.pdf", size=len(PDF_CONTENT), sha256=digest)
+        )
+        db.session.commit()
+
+        clone = task.clone()
+        db.session.add(clone)
+        db.session.commit()
+
+        clone_file_id = clone.attachments[0].file_id
+        for task_id, attachment_id in ((task.id, file_id), (clone.id, clone_file_id)):
+            path, name = task_attachments.get_attachment_path_and_name(task_id, attachment_id)
+            assert path.read_bytes() == PDF_CONTENT and name == "ancien.pdf"
+        assert (attachments_folder / "blobs" / digest[:2] / digest).is_file()
+
+
+def test_attachments_gc_repairs_counts_and_removes_orphans(app, runner, attachments_folder, test_project):
+    """Le ramasse-miettes recalcule les références et supprime les fichiers inconnus anciens."""
+    with app.app_context():
+        task = _create_task(test_project)
+        task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "a.pdf")
+        db.session.execute(AttachmentBlob.__table__.update().values(ref_count=5))
+        db.session.commit()
+    orphan = attachments_folder / "blobs" / "00" / ("0" * 64)
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"orphelin")
+    os.utime(orphan, (0, 0))
+
+    result = runner.invoke(args=["attachments-gc"])
+
+    assert result.exit_code == 0, result.output
+    assert "1 compteur(s) corrigé(s), 0 contenu(s) et 1 fichier(s) orphelin(s)" in result.output
+    assert not orphan.exists()
+    with app.app_context():
+        assert AttachmentBlob.query.one().ref_count == 1
+
+
+def test_download_supports_etag_and_range(app, client, admin_user, attachments_folder, test_project):
+    """Téléchargement : ETag fort (empreinte du contenu), 304 conditionnel et requêtes Range."""
+    with app.app_context():
+        task = _create_task(test_project)
+        meta = task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "devis.pdf")
+        url = f"/tasks/{task.slug}/attachments/{meta['id']}"
+    _login(client, admin_user)
+
+    response = client.get(url)
+    assert response.data == PDF_CONTENT
+    assert response.headers["ETag"] == f'"{hashlib.sha256(PDF_CONTENT).hexdigest()}"'
+    assert "private" in response.headers["Cache-Control"]
+
+    assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    partial = client.get(url, headers={"Range": "bytes=0-3"})
+    assert (partial.status_code, partial.data) == (206, b"%PDF")
+
+
+def test_download_delegated_to_nginx(app, client, admin_user, attachments_folder, test_project):
+    """Mode x-accel-redirect : aucun contenu envoyé par l'application, nginx sert le fichier."""
+    app.config["TASK_ATTACHMENTS_DELIVERY"] = "x-accel-redirect"
+    with app.app_context():
+        task = _create_task(test_project)
+        meta = task_attachments.save_attachment(task.id, io.BytesIO(PDF_CONTENT), "devis.pdf")
+        url = f"/tasks/{task.slug}/attachments/{meta['id']}"
+    _login(client, admin_user)
+
+    response = client.get(url, headers={"Range": "bytes=0-3"})
+
+    digest = hashlib.sha256(PDF_CONTENT).hexdigest()
+    assert response.status_code == 200 and response.data == b""
+    assert response.headers["X-Accel-Redirect"] == f"/protected-attachments/blobs/{digest[:2]}/{digest}"
+    assert "X-Sendfile" not in response.headers
+    assert response.headers["Content-Disposition"] == "attachment; filename=devis.pdf"
+
+
+def test_upload_streams_files_and_rejects_invalid_early(app, client, admin_user, attachments_folder, test_project):
+    """Upload multi-fichiers : réception en une passe, fichier invalide refusé sans être écrit, un seul commit."""
+    app.config["TASK_ATTACHMENTS_MAX_FILE_SIZE"] = 1024 * 1024
+    with app.app_context():
+        task = _create_task(test_project)
+        slug, task_id = task.slug, task.id
+    _login(client, admin_user)
+    fake_pdf = b"MZ" + b"\0" * (2 * 1024 * 1024)  # exécutable renommé, au-delà de la taille maximale
+
+    response = client.post(
+        f"/tasks/{slug}/attachments",
+        data={
+            "files": [
+                (io.BytesIO(PDF_CONTENT), "devis.pdf"),
+                (io.BytesIO(b"a;b\n1;2\n"), "export.csv"),
+                (io.BytesIO(fake_pdf), "faux.pdf"),
+            ]
+        },
+        headers={"X-Requested-With": "XMLHttpRequest"},
+        content_type="multipart/form-data",
+    )
+
+    data = response.get_json()
+    assert [item["name"] for item in data["uploaded"]] == ["devis.pdf", "export.csv"]
+    assert data["errors"] == [
+        "faux.pdf: Le contenu du fichier ne correspond pas à son extension (fichier non autorisé ou corrompu)."
+    ]
+    assert not list((attachments_folder / "tmp").iterdir())  # fichiers temporaires déplacés ou supprimés
+    with app.app_context():
+        assert {a.sha256 for a in TaskAttachment.query.filter_by(task_id=task_id)} == {
+            hashlib.sha256(PDF_CONTENT).hexdigest(),
+            hashlib.sha256(b"a;b\n1;2\n").hexdigest(),
+        }
+
+
+def test_attachment_upload_stops_writing_invalid_file(app, attachments_folder):
+    """Le flux de réception cesse d'écrire sur disque dès que le fichier est invalide."""
+    app.config["TASK_ATTACHMENTS_MAX_FILE_SIZE"] = 100
+    with app.test_request_context():
+        upload = task_attachments.AttachmentUpload("gros.pdf")
+        for _ in range(10):
+            upload.write(b"%PDF" + b"x" * 60)
+
+        assert upload.finish() == "Fichier trop volumineux (max 0 Mo)."
+        assert upload.size == 640 and upload.path.stat().st_size == 64
+        upload.close()
+        assert not upload.path.exists()
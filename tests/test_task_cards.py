@@ -0,0 +1,61 @@
+"""
+Tests du cache des fragments HTML des cartes du kanban (app/utils/task_cards.py).
+"""
+
+from app import card_cache, db
+from app.models.task import Task
+from app.utils import task_cards
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def _cached_variants(task_id):
+    entry = card_cache.get(task_cards._cache_key(task_id))
+    return entry[1] if entry else None
+
+
+def test_cards_are_cached_and_rerendered_after_task_write(app, client, admin_user, test_project):
+    """La carte rendue est mise en cache ; une modification ORM l'invalide, la page montre la nouvelle version."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Préparer la démo", project_id=project.id, status="en cours", estimated_time=2)
+        db.session.add(task)
+        db.session.commit()
+        task_id, url = task.id, f"/projects/{project.slug}"
+
+    _login(client, admin_user)
+    first = client.get(url).get_data(as_text=True)
+    assert "Préparer la démo" in first
+    variants = _cached_variants(task_id)
+    assert list(variants) == [("progress", True, False)]
+    card = variants[("progress", True, False)]
+    assert card in first and card in client.get(url).get_data(as_text=True)
+
+    with app.app_context():
+        db.session.get(Task, task_id).title = "Présenter la démo"
+        db.session.commit()
+        assert _cached_variants(task_id) is None
+    page = client.get(url).get_data(as_text=True)
+    assert "Présenter la démo" in page and "Préparer la démo" not in page
+
+
+def test_stale_entry_is_never_served(app, client, admin_user, test_project):
+    """Une mise à jour sans événement ORM (UPDATE en masse) change updated_at : la carte est rendue à nouveau."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        task = Task(title="Inventaire", project_id=project.id, status="terminé")
+        db.session.add(task)
+        db.session.commit()
+        task_id, url = task.id, f"/projects/{project.slug}"
+
+    _login(client, admin_user)
+    assert "Inventaire" in client.get(url).get_data(as_text=True)
+    with app.app_context():
+        db.session.execute(db.update(Task).where(Task.id == task_id).values(title="Inventaire annuel"))
+        db.session.commit()
+        assert _cached_variants(task_id) is not None
+    assert "Inventaire annuel" in client.get(url).get_data(as_text=True)
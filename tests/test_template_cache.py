@@ -0,0 +1,26 @@
+"""
+Tests du cache de bytecode des templates Jinja (flask precompile-templates).
+"""
+
+from app.utils.template_cache import init_template_cache
+
+
+def test_precompile_templates_fills_bytecode_cache(app, runner, tmp_path):
+    """La commande compile tous les templates dans le dossier du cache de bytecode."""
+    app.config["JINJA_BYTECODE_CACHE_DIR"] = str(tmp_path)
+    init_template_cache(app)
+
+    result = runner.invoke(args=["precompile-templates"])
+
+    assert result.exit_code == 0, result.output
+    templates = app.jinja_env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    assert f"✓ {len(templates)} template(s) compilé(s)." in result.output
+    assert len(list(tmp_path.glob("__jinja2_*.cache"))) == len(templates)
+
+
+def test_precompile_templates_requires_cache_directory(runner):
+    """Sans dossier de cache (tests), la commande n'agit pas."""
+    result = runner.invoke(args=["precompile-templates"])
+
+    assert result.exit_code == 0, result.output
+    assert "Cache du bytecode des templates désactivé" in result.output
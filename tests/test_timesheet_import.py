@@ -0,0 +1,94 @@
+"""
+Tests de l'import en masse de feuilles de temps (commande flask import-timesheet et page d'administration).
+"""
+
+import io
+import json
+from datetime import date
+
+from app import db
+from app.models.project import CreditLog, Project
+from app.models.task import Task, TimeEntry, TimeRollupDaily
+from app.utils.timesheet_import import import_timesheet, iter_json_records, iter_records
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+
+def test_iter_json_records_streams_arrays_and_json_lines():
+    """Tableau JSON et JSON Lines sont lus objet par objet, même découpés en petits morceaux."""
+    records = [{"task": f"T{i}", "minutes": i, "description": "a, [b] {c}"} for i in range(1, 6)]
+
+    as_array = list(iter_json_records(io.StringIO(json.dumps(records)), chunk_size=7))
+    as_lines = list(iter_json_records(io.StringIO("\n".join(json.dumps(r) for r in records)), chunk_size=7))
+
+    assert [obj for _, obj in as_array] == records
+    assert as_lines == as_array
+
+
+def test_import_csv_updates_credit_tasks_and_rollups(app, test_project, technician_user):
+    """Un lot crée les tâches manquantes, insère saisies et crédits, puis met à jour crédit et cumuls."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        slug = project.slug
+        content = (
+            "type;project;task;user;minutes;date;description\n"
+            f"time;{slug};Migration;tech@test.com;30;2026-03-02T09:00;Analyse\n"
+            f"time;{slug};Migration;TECH@test.com;45;2026-03-02T14:00;\n"
+            f"credit;{project.id};;;120;2026-03-01;Avenant\n"
+            f"time;{slug};Migration;inconnu@test.com;15;2026-03-03;\n"
+            f"time;{slug};;tech@test.com;abc;;\n"
+        )
+
+        stats = import_timesheet(iter_records(io.BytesIO(content.encode()), "import.csv"), batch_size=2)
+
+        assert (stats["time_entries"], stats["credits"], stats["tasks_created"], stats["errors"]) == (2, 1, 1, 2)
+        assert [line for line, _ in stats["error_details"]] == [5, 6]
+        task = Task.query.filter_by(title="Migration").one()
+        assert task.slug == "migration"
+        assert task.actual_minutes == 75
+        assert TimeEntry.query.count() == 2
+        assert CreditLog.query.one().amount == 120
+        assert db.session.get(Project, project.id).remaining_credit == 600 + 120 - 75
+        rollup = TimeRollupDaily.query.one()
+        assert (rollup.day, rollup.minutes, rollup.entry_count) == (date(2026, 3, 2), 75, 2)
+
+
+def test_import_dry_run_writes_nothing(app, runner, test_project, technician_user, tmp_path):
+    """La commande en mode simulation valide le fichier sans rien enregistrer."""
+    with app.app_context():
+        slug = db.session.merge(test_project).slug
+    path = tmp_path / "import.json"
+    path.write_text(json.dumps([{"project": slug, "task": "Nouvelle", "user": "tech@test.com", "hours": "1,5"}]))
+
+    result = runner.invoke(args=["import-timesheet", str(path), "--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    assert "1 saisie(s)" in result.output
+    with app.app_context():
+        assert TimeEntry.query.count() == 0
+        assert Task.query.count() == 0
+
+
+def test_admin_upload_imports_file(app, client, admin_user, test_project, technician_user):
+    """La page d'administration importe le fichier envoyé."""
+    with app.app_context():
+        slug = db.session.merge(test_project).slug
+    payload = "\n".join(
+        json.dumps({"project": slug, "task": "Import web", "user": "tech@test.com", "minutes": m}) for m in (10, 20)
+    )
+    _login(client, admin_user)
+
+    response = client.post(
+        "/admin/timesheet-import",
+        data={"file": (io.BytesIO(payload.encode()), "saisies.jsonl")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    assert "Import terminé : 2 saisie(s)" in response.get_data(as_text=True)
+    with app.app_context():
+        assert Task.query.filter_by(title="Import web").one().actual_minutes == 30
@@ -0,0 +1,41 @@
+"""
+Tests de la copie de base (commande flask migrate-to-postgres).
+"""
+
+import os
+import tempfile
+
+from app import db
+from app.models.client import Client
+from app.models.project import Project
+from app.utils.db_transfer import copy_database
+from sqlalchemy import create_engine, text
+
+
+def test_copy_database_preserves_rows_and_encrypted_values(app, test_project):
+    """Toutes les lignes sont copiées, les colonnes chiffrées sans être re-chiffrées."""
+    db_fd, target_path = tempfile.mkstemp(suffix=".db")
+    target_engine = create_engine(f"sqlite:///{target_path}")
+    try:
+        with app.app_context():
+            client = db.session.get(Client, db.session.merge(test_project).client_id)
+            client.email = "contact@example.com"
+            db.session.commit()
+            with db.engine.connect() as conn:
+                encrypted_email = conn.execute(text("SELECT email FROM client")).scalar()
+                conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32))"))
+                conn.execute(text("INSERT INTO alembic_version VALUES ('e5b8d2a3f417')"))
+                conn.commit()
+
+            counts = copy_database(db.metadata, db.engine, target_engine, batch_size=1, log=lambda _msg: None)
+
+        assert counts["client"] == 1
+        assert counts["project"] == 1
+        with target_engine.connect() as conn:
+            assert conn.execute(text("SELECT email FROM client")).scalar() == encrypted_email
+            assert conn.execute(text("SELECT name FROM project")).scalar() == Project.query.first().name
+            assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == "e5b8d2a3f417"
+    finally:
+        target_engine.dispose()
+        os.close(db_fd)
+        os.unlink(target_path)
@@ -0,0 +1,44 @@
+"""
+Tests des expressions SQL portables (SQLite / PostgreSQL).
+"""
+
+from datetime import datetime
+
+import pytest
+from app import db
+from app.models.task import Task, TimeEntry
+from app.utils.sql_compat import truncate_date
+from sqlalchemy import DateTime, column, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def test_truncate_date_compiles_per_dialect():
+    """strftime pour SQLite, to_char(date_trunc(...)) pour PostgreSQL."""
+    query = select(truncate_date(column("created_at", DateTime), "month"))
+
+    assert "strftime('%Y-%m', created_at)" in str(query.compile(dialect=sqlite.dialect()))
+    assert "to_char(date_trunc('month', created_at), 'YYYY-MM')" in str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_truncate_date_rejects_unknown_unit():
+    """Une unité inconnue est refusée dès la construction de l'expression."""
+    with pytest.raises(ValueError):
+        truncate_date(column("created_at", DateTime), "quarter")
+
+
+def test_truncate_date_groups_time_entries_by_month(app, test_project, technician_user):
+    """Le regroupement mensuel retourne une clé 'AAAA-MM' identique quel que soit le dialecte."""
+    with app.app_context():
+        project = db.session.merge(test_project)
+        user = db.session.merge(technician_user)
+        task = Task(title="Tâche rapport", project_id=project.id)
+        db.session.add(task)
+        db.session.flush()
+        for created_at in (datetime(2026, 3, 2), datetime(2026, 3, 28), datetime(2026, 4, 1)):
+            db.session.add(TimeEntry(task_id=task.id, user_id=user.id, minutes=30, created_at=created_at))
+        db.session.commit()
+
+        month = truncate_date(TimeEntry.created_at, "month").label("month")
+        rows = db.session.query(month, db.func.sum(TimeEntry.minutes)).group_by("month").order_by("month").all()
+
+        assert [tuple(r) for r in rows] == [("2026-03", 60), ("2026-04", 30)]